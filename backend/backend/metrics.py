@@ -0,0 +1,135 @@
+"""
+Prometheus metrics, served as text on ``/metrics``.
+
+``MetricsMiddleware`` records per-route latency and query-count histograms
+(labelled with the URL name, e.g. ``api_item_list``) and an in-flight
+gauge, plus the connection pool's state when ``DB_POOL`` is on; the shop
+adds checkout and cache counters. Cache hit ratios are derived in the
+query, e.g.
+``sum(rate(cache_requests_total{result="hit"}[5m])) by (cache) / sum(rate(cache_requests_total[5m])) by (cache)``.
+
+Under gunicorn every worker keeps its own numbers. ``gunicorn.conf.py`` sets
+``PROMETHEUS_MULTIPROC_DIR`` so that workers write them to files there,
+and ``/metrics`` adds the files up, whichever worker serves the scrape.
+"""
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+from .profiling import install_query_timer, query_timer
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route', ['route', 'method'],
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_queries', 'Database queries per request by route', ['route', 'method'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200),
+)
+REQUESTS = Counter('http_requests', 'Responses by route and status', ['route', 'method', 'status'])
+IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being handled', multiprocess_mode='livesum')
+
+# Only reported when the database uses Django's connection pool (DB_POOL)
+DB_POOL_SIZE = Gauge('db_pool_connections', 'Connections held by the pool', multiprocess_mode='livesum')
+DB_POOL_AVAILABLE = Gauge('db_pool_available', 'Idle connections in the pool', multiprocess_mode='livesum')
+DB_POOL_WAITING = Gauge('db_pool_requests_waiting', 'Requests waiting for a connection', multiprocess_mode='livesum')
+
+CHECKOUT_SUCCESS = Counter('shop_checkout_success', 'Completed cart checkouts')
+CHECKOUT_FAILURE = Counter('shop_checkout_failure', 'Failed cart checkouts by reason', ['reason'])
+CACHE_REQUESTS = Counter('cache_requests', 'Cache lookups by cache and result (hit/miss)', ['cache', 'result'])
+
+
+def cache_lookup(name, hit):
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def record_pool_stats(connection):
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return
+    stats = pool.get_stats()
+    DB_POOL_SIZE.set(stats.get('pool_size', 0))
+    DB_POOL_AVAILABLE.set(stats.get('pool_available', 0))
+    DB_POOL_WAITING.set(stats.get('requests_waiting', 0))
+
+
+def route_name(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    return match.url_name or 'unnamed'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        install_query_timer()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path == '/metrics':
+            return self.get_response(request)
+
+        IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            with query_timer() as queries:
+                response = self.get_response(request)
+        finally:
+            IN_PROGRESS.dec()
+        self.observe(request, response, time.perf_counter() - start, queries.count)
+        return response
+
+    async def __acall__(self, request):
+        if request.path == '/metrics':
+            return await self.get_response(request)
+
+        IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            with query_timer() as queries:
+                response = await self.get_response(request)
+        finally:
+            IN_PROGRESS.dec()
+        self.observe(request, response, time.perf_counter() - start, queries.count)
+        return response
+
+    def observe(self, request, response, seconds, query_count):
+        route = route_name(request)
+        REQUEST_LATENCY.labels(route, request.method).observe(seconds)
+        REQUEST_QUERIES.labels(route, request.method).observe(query_count)
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        record_pool_stats(connections['default'])
+
+
+def collect():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if not settings.METRICS_ENABLED or (settings.IS_PRODUCTION and not token):
+        raise Http404
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(collect(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,291 @@
+"""
+Opt-in per-request profiling (``PROFILING_ENABLED``).
+
+``ProfilingMiddleware`` records, for every request, the number of queries
+and time spent in SQL, the view, ``serializer.data`` and the response size.
+The numbers go out in a ``Server-Timing`` header (shown in the browser's
+network panel) and as one JSON log line on the ``backend.profiling`` logger.
+
+Staff users can send the ``X-Profile`` header to have their request run
+under cProfile; ``PROFILING_SAMPLE_RATE`` does the same for a random
+fraction of all requests. The stats are dumped as ``.prof`` files to
+``PROFILING_DIR`` for ``snakeviz`` or ``python -m pstats``.
+
+When profiling is disabled the middleware raises ``MiddlewareNotUsed`` and
+Django leaves it out of the request chain entirely. Timing ``serializer.data``
+means wrapping DRF's ``BaseSerializer.data``, and counting queries means an
+execute wrapper on every database connection. The middleware that need them
+install these wrappers only when they are enabled (``install_query_timer()``
+is shared with ``backend.metrics``), and ``serializer_timer_installed()``
+does it for the length of a block, so with profiling and metrics off DRF and
+the connections are left untouched.
+
+The middleware is async capable. Under ASGI the profiler runs on the event
+loop's thread for the length of the request, so a dump may include other
+requests served concurrently.
+"""
+import cProfile
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+_original_property = BaseSerializer.data
+_original_data = _original_property.fget
+_serializer_state = ContextVar('serializer_state', default=None)
+
+
+def _timed_data(self):
+    state = _serializer_state.get()
+    # Nested serializers are part of their parent's time
+    if state is None or state['depth']:
+        return _original_data(self)
+    state['depth'] += 1
+    start = time.perf_counter()
+    try:
+        return _original_data(self)
+    finally:
+        state['seconds'] += time.perf_counter() - start
+        state['depth'] -= 1
+
+
+def install_serializer_timer():
+    """Wrap ``BaseSerializer.data`` for ``serializer_timer()``; returns False if it already was."""
+    if BaseSerializer.data.fget is _timed_data:
+        return False
+    # Outside a timer the wrapper costs one ContextVar lookup
+    BaseSerializer.data = property(_timed_data)
+    return True
+
+
+def uninstall_serializer_timer():
+    BaseSerializer.data = _original_property
+
+
+@contextmanager
+def serializer_timer_installed():
+    """``install_serializer_timer()`` for the length of the block, unless something else installed it."""
+    installed = install_serializer_timer()
+    try:
+        yield
+    finally:
+        if installed:
+            uninstall_serializer_timer()
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Accumulate time spent producing ``serializer.data`` (outermost serializer only).
+
+    Needs the wrapper from ``install_serializer_timer()``; without it the time stays 0.
+    """
+    state = {'seconds': 0.0, 'depth': 0}
+    token = _serializer_state.set(state)
+    try:
+        yield state
+    finally:
+        _serializer_state.reset(token)
+
+
+class QueryTimer:
+    """Query count and SQL time of a ``query_timer()`` block, and of the blocks enclosing it."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+
+    def record(self, seconds):
+        timer = self
+        while timer is not None:
+            timer.count += 1
+            timer.seconds += seconds
+            timer = timer.parent
+
+
+_query_timer = ContextVar('query_timer', default=None)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.record(time.perf_counter() - start)
+
+
+def _wrap_connection(sender, connection, **kwargs):
+    # A permanent wrapper reading a ContextVar, rather than execute_wrapper() per
+    # request, so queries run by the async ORM in another thread are counted too
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def install_query_timer():
+    """Wrap every database connection, present and future, for ``query_timer()``."""
+    connection_created.connect(_wrap_connection, dispatch_uid='backend.profiling.query_timer')
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(None, connection)
+
+
+@contextmanager
+def query_timer():
+    """
+    Count the queries run in this context (including ``sync_to_async`` calls made from it).
+
+    Needs the wrapper from ``install_query_timer()``; this thread's open connections get it here.
+    """
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(None, connection)
+    timer = QueryTimer(parent=_query_timer.get())
+    token = _query_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _query_timer.reset(token)
+
+
+def is_staff_request(request):
+    """Staff check that works before DRF has authenticated the request."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+    from users.authentication import CachedJWTAuthentication
+
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def dump_path(request, total_ms):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    name = f'{stamp}-{request.method}-{slug[:60]}-{total_ms:.0f}ms-{uuid.uuid4().hex[:6]}.prof'
+    return Path(settings.PROFILING_DIR) / name
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        install_query_timer()
+        install_serializer_timer()
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with query_timer() as queries, serializer_timer() as serializers:
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler = getattr(request, '_profiler', None)
+                if profiler:
+                    profiler.disable()
+        return self.finish(request, response, start, queries, serializers, profiler)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        profiler = None
+        # process_view runs in a worker thread under ASGI, so the profiler is started here, on the loop's thread
+        if await sync_to_async(self.wants_profile)(request):
+            profiler = self.start_profiler()
+        with query_timer() as queries, serializer_timer() as serializers:
+            try:
+                response = await self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+        return self.finish(request, response, start, queries, serializers, profiler)
+
+    def finish(self, request, response, start, queries, serializers, profiler):
+        end = time.perf_counter()
+
+        view_started = getattr(request, '_profiling_view_started', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': request.resolver_match.view_name if request.resolver_match else None,
+            'status': response.status_code,
+            'queries': queries.count,
+            'sql_ms': round(queries.seconds * 1000, 2),
+            'view_ms': round((end - view_started) * 1000, 2) if view_started else None,
+            'serializer_ms': round(serializers['seconds'] * 1000, 2),
+            'total_ms': round((end - start) * 1000, 2),
+            'bytes': None if response.streaming else len(response.content),
+        }
+        if profiler:
+            record['profile'] = self.dump(profiler, request, record['total_ms'])
+
+        response['Server-Timing'] = self.server_timing(record)
+        logger.info(json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Decided here rather than in __call__ so request.user is set, and the profile covers the view
+        request._profiling_view_started = time.perf_counter()
+        if not iscoroutinefunction(self) and self.wants_profile(request):
+            request._profiler = self.start_profiler()
+        return None
+
+    @staticmethod
+    def start_profiler():
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running in this thread
+            return None
+        return profiler
+
+    def wants_profile(self, request):
+        if request.META.get(self.header) and is_staff_request(request):
+            return True
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def dump(self, profiler, request, total_ms):
+        path = dump_path(request, total_ms)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        return str(path)
+
+    @staticmethod
+    def server_timing(record):
+        metrics = [
+            f'db;dur={record["sql_ms"]};desc="{record["queries"]} queries"',
+            f'serialize;dur={record["serializer_ms"]}',
+        ]
+        if record['view_ms'] is not None:
+            metrics.append(f'view;dur={record["view_ms"]}')
+        metrics.append(f'total;dur={record["total_ms"]}')
+        if record['bytes'] is not None:
+            metrics.append(f'size;desc="{record["bytes"]} bytes"')
+        return ', '.join(metrics)
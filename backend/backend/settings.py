@@ -67,7 +67,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -111,6 +111,9 @@ SIMPLE_JWT = {
 
 
 MIDDLEWARE = [
+    # First, so their timings cover the rest of the stack
+    'backend.metrics.MetricsMiddleware',
+    'backend.profiling.ProfilingMiddleware',  # a no-op unless PROFILING_ENABLED
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -141,6 +144,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# How gunicorn serves the app (see gunicorn.conf.py): 'wsgi' for sync workers,
+# 'asgi' for uvicorn workers. ASYNC_VIEWS routes the catalogue reads and the
+# payment views to their async versions in shop/async_views.py.
+SERVER_MODE = config('SERVER_MODE', default='wsgi')
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=SERVER_MODE == 'asgi', cast=bool)
 
 
 # Database Configuration - Environment Aware
@@ -192,6 +202,31 @@ else:
     elif IS_DEVELOPMENT:
         print(f"🔧 Using SQLite database: {DATABASES['default']['NAME']}")
 
+# Connection reuse. Without it every request opens a new connection, which on a
+# hosted PostgreSQL means a TCP + TLS handshake and authentication each time.
+# DB_CONN_MAX_AGE keeps a connection per worker thread open for that many seconds
+# (under ASGI every request runs in a new thread, so only the pool helps there);
+# DB_POOL (PostgreSQL only) uses Django's psycopg pool instead,
+# shared by the threads of a worker. Health checks test a reused connection first.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60 if IS_PRODUCTION else 0, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL = config('DB_POOL', default=IS_PRODUCTION, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=4, cast=int)  # per worker process
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=int)  # seconds to wait for a free connection
+
+DATABASES['default']['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+if DB_POOL and DATABASES['default']['ENGINE'].startswith('django.db.backends.postgresql'):
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': DB_POOL_TIMEOUT,
+    }
+    # The pool keeps the connections; Django refuses a pool with persistent connections
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -289,6 +324,72 @@ CORS_ALLOW_CREDENTIALS = True
 # Get your keys from https://dashboard.stripe.com/apikeys
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='pk_test_demo_key')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='sk_test_demo_key')
+STRIPE_TIMEOUT = config('STRIPE_TIMEOUT', default=10, cast=int)  # seconds per API call
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=2, cast=int)
+
+# Payment gateway: 'stripe', or 'fake' for offline development and load testing
+PAYMENT_GATEWAY = config('PAYMENT_GATEWAY', default='stripe')
+PAYMENT_INTENT_REUSE_TTL = config('PAYMENT_INTENT_REUSE_TTL', default=3600, cast=int)
+PAYMENT_STATUS_CACHE_TTL = config('PAYMENT_STATUS_CACHE_TTL', default=5, cast=int)
+FAKE_PAYMENT_LATENCY_MS = config('FAKE_PAYMENT_LATENCY_MS', default=0, cast=int)
+
+# Cache: local memory by default, Redis when REDIS_URL is set (needs the redis package)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Whether CACHES['default'] is shared by all server processes. Local memory is per
+# process, so an invalidation in one gunicorn worker never reaches the others; the
+# caches that rely on invalidation (catalogue responses, users behind JWTs) are only
+# used when the cache is shared.
+SHARED_CACHE = config('SHARED_CACHE', default=bool(REDIS_URL), cast=bool)
+
+# Seconds a rendered catalogue response (item list/detail) is kept in the cache; 0 disables it
+CATALOGUE_CACHE_TTL = config('CATALOGUE_CACHE_TTL', default=300, cast=int)
+
+# Upper bound on how long a cart summary (shop.cart) is kept; writes invalidate it sooner
+CART_SUMMARY_CACHE_TTL = config('CART_SUMMARY_CACHE_TTL', default=300, cast=int)
+
+# Sold items older than this many days are moved to ArchivedItem by manage.py archive_sold_items
+ARCHIVE_SOLD_AFTER_DAYS = config('ARCHIVE_SOLD_AFTER_DAYS', default=180, cast=int)
+
+# Seconds the user behind a JWT is cached (users.authentication); 0 loads it on every request
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+
+# Per-request profiling: Server-Timing header and a JSON log line per request.
+# Staff can send PROFILING_HEADER to get a cProfile dump of their request in PROFILING_DIR,
+# and PROFILING_SAMPLE_RATE (0-1) profiles that fraction of all requests.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_HEADER = config('PROFILING_HEADER', default='X-Profile')
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+
+# Prometheus metrics on /metrics; with METRICS_TOKEN set, scrapers must send "Authorization: Bearer <token>".
+# Off by default in production, and even when enabled there /metrics is a 404 until a token is set
+METRICS_ENABLED = config('METRICS_ENABLED', default=not IS_PRODUCTION, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'backend.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 # Production settings
 RENDER_EXTERNAL_HOSTNAME = config('RENDER_EXTERNAL_HOSTNAME', default='')
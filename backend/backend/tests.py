@@ -0,0 +1,187 @@
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from shop.models import CartItem, Item
+from . import profiling
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        self.user = User.objects.create_user(username='plain', password='pass12345')
+        Item.objects.create(title='Boots', description='', price=Decimal('10.00'), seller=self.user)
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        self.addCleanup(profiling.uninstall_serializer_timer)  # enabling the middleware installs it for good
+
+    def get(self, user=None, **headers):
+        client = APIClient()  # a new client loads the middleware chain with the current settings
+        if user:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client.get('/api/shop/items/', **headers)
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.get())
+        self.assertIs(BaseSerializer.data, profiling._original_property)
+
+    def test_query_timer_not_installed_when_disabled(self):
+        connection_created.disconnect(dispatch_uid='backend.profiling.query_timer')
+        if profiling._timed_execute in connection.execute_wrappers:
+            connection.execute_wrappers.remove(profiling._timed_execute)
+        self.addCleanup(profiling.install_query_timer)
+
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.get().status_code, 200)
+        self.assertNotIn(profiling._timed_execute, connection.execute_wrappers)
+        self.assertFalse(connection_created.disconnect(dispatch_uid='backend.profiling.query_timer'))
+
+    def test_serializer_timer_installed_only_for_the_block(self):
+        with profiling.serializer_timer_installed(), profiling.serializer_timer() as state:
+            self.assertIsNot(BaseSerializer.data, profiling._original_property)
+            self.get()
+        self.assertIs(BaseSerializer.data, profiling._original_property)
+        self.assertGreater(state['seconds'], 0)
+
+    @override_settings(PROFILING_ENABLED=True)
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('backend.profiling', 'INFO') as logs:
+            response = self.get()
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'shop:api_item_list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['serializer_ms'], 0)
+        self.assertEqual(record['bytes'], len(response.content))
+        self.assertNotIn('profile', record)
+        self.assertIn(f'db;dur={record["sql_ms"]};desc="{record["queries"]} queries"', response['Server-Timing'])
+        self.assertIn('view;dur=', response['Server-Timing'])
+
+    def test_profile_header_dumps_for_staff_only(self):
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.profile_dir), \
+                self.assertLogs('backend.profiling', 'INFO') as logs:
+            self.get(self.user, HTTP_X_PROFILE='1')
+            self.assertEqual(os.listdir(self.profile_dir), [])
+            self.get(self.staff, HTTP_X_PROFILE='1')
+
+        dumps = os.listdir(self.profile_dir)
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].endswith('.prof'))
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['profile'], os.path.join(self.profile_dir, dumps[0]))
+        self.assertGreater(pstats.Stats(os.path.join(self.profile_dir, dumps[0])).total_calls, 0)
+
+
+    def test_async_requests(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.staff)}', 'X-Profile': '1'}
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.profile_dir), \
+                self.assertLogs('backend.profiling', 'INFO') as logs:
+            response = async_to_sync(AsyncClient().get)('/api/shop/items/', headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f'db;dur={record["sql_ms"]}', response['Server-Timing'])
+        self.assertGreater(pstats.Stats(record['profile']).total_calls, 0)
+
+@override_settings(PAYMENT_GATEWAY='fake')
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def create_items(self, count):
+        return [
+            Item.objects.create(title=f'Item {i}', description='', price=Decimal('10.00') + i, seller=self.seller)
+            for i in range(count)
+        ]
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_keyed_by_url_name(self):
+        self.create_items(3)
+        before = self.sample('http_request_duration_seconds_count', route='api_item_list', method='GET')
+        queries = self.sample('http_request_queries_sum', route='api_item_list', method='GET')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/shop/items/')
+
+        self.assertEqual(self.sample('http_request_duration_seconds_count', route='api_item_list', method='GET'), before + 1)
+        self.assertEqual(
+            self.sample('http_request_queries_sum', route='api_item_list', method='GET'), queries + len(ctx.captured_queries)
+        )
+        self.assertEqual(self.sample('http_requests_in_progress'), 0)
+
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",route="api_item_list"}', body)
+
+    def test_checkout_outcomes(self):
+        success = self.sample('shop_checkout_success_total')
+        empty = self.sample('shop_checkout_failure_total', reason='empty_cart')
+        self.client.post('/api/shop/cart/pay/', {'payment_intent_id': 'pi_fake_test'}, format='json')
+        CartItem.objects.create(user=self.buyer, item=self.create_items(1)[0])
+        self.client.post('/api/shop/cart/pay/', {'payment_intent_id': 'pi_fake_test'}, format='json')
+
+        self.assertEqual(self.sample('shop_checkout_failure_total', reason='empty_cart'), empty + 1)
+        self.assertEqual(self.sample('shop_checkout_success_total'), success + 1)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_catalogue_cache_hits_and_misses(self):
+        hits = self.sample('cache_requests_total', cache='catalogue', result='hit')
+        misses = self.sample('cache_requests_total', cache='catalogue', result='miss')
+        self.client.get('/api/shop/items/')
+        self.client.get('/api/shop/items/')
+        self.assertEqual(self.sample('cache_requests_total', cache='catalogue', result='hit'), hits + 1)
+        self.assertEqual(self.sample('cache_requests_total', cache='catalogue', result='miss'), misses + 1)
+
+    def test_aggregates_worker_processes(self):
+        script = "import prometheus_client; prometheus_client.Counter('shop_checkout_success', '').inc(2)"
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', script], check=True, env=os.environ)
+            body = self.client.get('/metrics').content.decode()
+        self.assertIn('shop_checkout_success_total 4.0', body)
+
+    def test_pool_stats(self):
+        pool = mock.Mock(**{'get_stats.return_value': {'pool_size': 4, 'pool_available': 3, 'requests_waiting': 0}})
+        with mock.patch.object(connections['default'], 'pool', pool, create=True):
+            self.client.get('/api/shop/items/')
+        self.assertEqual(self.sample('db_pool_connections'), 4)
+        self.assertEqual(self.sample('db_pool_available'), 3)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    def test_never_public_in_production(self):
+        with override_settings(IS_PRODUCTION=True, METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with override_settings(IS_PRODUCTION=True, METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
@@ -0,0 +1,154 @@
+# Django Management Command benchmarking the analytics endpoints on a large dataset
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+from dashboard import rollups
+from shop.models import Item, Purchase
+
+User = get_user_model()
+
+ENDPOINTS = [
+    ('overview', '/api/dashboard/analytics/overview/'),
+    ('sales', '/api/dashboard/analytics/sales/'),
+    ('sales (365d)', '/api/dashboard/analytics/sales/?days=365'),
+    ('users', '/api/dashboard/analytics/users/'),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Let bulk_create keep the dates we generate instead of stamping auto_now_add."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = 'Load a large synthetic dataset and assert the p95 latency of the analytics endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000000, help='Items to generate (default: 1000000)')
+        parser.add_argument('--purchases', type=int, default=200000, help='Purchases to generate (default: 200000)')
+        parser.add_argument('--users', type=int, default=5000, help='Users to generate (default: 5000)')
+        parser.add_argument('--runs', type=int, default=50, help='Requests per endpoint (default: 50)')
+        parser.add_argument('--budget-ms', type=float, default=100, help='p95 latency budget in ms (default: 100)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated data')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated data instead of rolling back')
+
+    def handle(self, *args, **options):
+        if options['purchases'] > options['items']:
+            raise CommandError('--purchases cannot exceed --items')
+
+        try:
+            with transaction.atomic():
+                self.generate(options)
+                self.stdout.write('Rebuilding rollups...')
+                rollups.rebuild()
+                failures = self.measure(options)
+                if not options['keep']:
+                    raise Rollback()
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f'p95 over {options["budget_ms"]:.0f} ms budget: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All analytics endpoints within budget'))
+
+    def generate(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        categories = [key for key, _ in Item.CATEGORY_CHOICES]
+        batch_size = 10000
+
+        start = time.perf_counter()
+        password = make_password('benchmark')  # hash once, reuse for every user
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'bench_user_{i}',
+                    password=password,
+                    date_joined=now - timedelta(days=rng.randint(0, 730))
+                )
+                for i in range(options['users'])
+            ],
+            batch_size=batch_size,
+        )
+        user_ids = [user.pk for user in users]
+
+        date_fields = (Item._meta.get_field('date_added'), Purchase._meta.get_field('purchase_date'))
+        with explicit_dates(*date_fields):
+            for offset in range(0, options['items'], batch_size):
+                count = min(batch_size, options['items'] - offset)
+                items = []
+                for i in range(offset, offset + count):
+                    # Long tail of sellers: a few power sellers own most listings
+                    seller = users[int(len(users) * rng.random() ** 3)]
+                    added = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+                    is_sold = i < options['purchases']
+                    items.append(Item(
+                        title=f'Benchmark item {i}',
+                        description='',
+                        price=Decimal(rng.randint(500, 80000)) / 100,
+                        category=rng.choice(categories),
+                        seller=seller,
+                        buyer_id=rng.choice(user_ids) if is_sold else None,
+                        status='sold' if is_sold else 'on_sale',
+                        date_added=added,
+                        date_sold=added + timedelta(hours=rng.randint(1, 72)) if is_sold else None,
+                    ))
+                items = Item.objects.bulk_create(items)
+                Purchase.objects.bulk_create([
+                    Purchase.for_item(
+                        item, buyer_id=item.buyer_id, purchase_price=item.price, purchase_date=item.date_sold
+                    )
+                    for item in items if item.status == 'sold'
+                ])
+                self.stdout.write(f'  {offset + count} items...')
+
+        self.stdout.write(f'Generated data in {time.perf_counter() - start:.1f}s ({connection.vendor})')
+
+    def measure(self, options):
+        client = APIClient(SERVER_NAME=(settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.'))
+        client.force_authenticate(User.objects.get(username='bench_user_0'))
+
+        self.stdout.write('=' * 52)
+        self.stdout.write(f'{"endpoint":<16}{"p50 ms":>12}{"p95 ms":>12}{"budget":>12}')
+        failures = []
+        for label, url in ENDPOINTS:
+            client.get(url)  # warm up
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}: {response.content[:200]!r}')
+            timings.sort()
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            ok = p95 <= options['budget_ms']
+            if not ok:
+                failures.append(label)
+            self.stdout.write(
+                f'{label:<16}{statistics.median(timings):>12.1f}{p95:>12.1f}{"ok" if ok else "OVER":>12}'
+            )
+        return failures
@@ -0,0 +1,81 @@
+# Django Management Command measuring the queries and time the cached JWT user saves per authenticated request
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+ENDPOINTS = [
+    ('cart', '/api/shop/cart/'),
+    ('purchases', '/api/shop/purchases/'),
+    ('my-items', '/api/shop/my-items/'),
+    ('profile', '/api/users/profile'),
+    ('analytics', '/api/dashboard/analytics/overview/'),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and latency of authenticated endpoints with and without the cached JWT user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50, help='Requests per endpoint and mode (default: 50)')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1')
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='bench_auth_user', password='benchmark')
+                # Uncached is a TTL of 0: the user is loaded from the database as simplejwt does it
+                with override_settings(AUTH_USER_CACHE_TTL=0):
+                    uncached = self.measure(user, options)
+                # One process, so even local memory is shared by every request here
+                with override_settings(AUTH_USER_CACHE_TTL=max(settings.AUTH_USER_CACHE_TTL, 60), SHARED_CACHE=True):
+                    cached = self.measure(user, options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+        self.stdout.write('=' * 76)
+        self.stdout.write(
+            f'{"endpoint":<12}{"queries":>10}{"cached":>10}{"saved":>8}{"p50 ms":>12}{"cached ms":>12}{"saved ms":>12}'
+        )
+        for label, _ in ENDPOINTS:
+            before, after = uncached[label], cached[label]
+            self.stdout.write(
+                f'{label:<12}{before["queries"]:>10}{after["queries"]:>10}{before["queries"] - after["queries"]:>8}'
+                f'{before["p50_ms"]:>12.2f}{after["p50_ms"]:>12.2f}{before["p50_ms"] - after["p50_ms"]:>12.2f}'
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark complete'))
+
+    def measure(self, user, options):
+        client = APIClient(SERVER_NAME=(settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.'))
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        cache.clear()
+
+        results = {}
+        for label, url in ENDPOINTS:
+            client.get(url)  # warm up, and fill the user cache when it is on
+            timings = []
+            for _ in range(options['runs']):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}: {response.content[:200]!r}')
+            results[label] = {'queries': len(ctx.captured_queries), 'p50_ms': statistics.median(timings)}
+        return results
@@ -0,0 +1,156 @@
+# Django Management Command comparing requests/sec with and without database connection reuse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+# Environment overrides for each mode; see the DB_* settings
+MODES = {
+    'none': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '60'},
+    'pool': {'DB_POOL': 'True', 'DB_CONN_MAX_AGE': '0'},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = 'Serve the API with gunicorn once per connection mode and measure requests/sec for one endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/shop/items/', help='Endpoint to load (default: /api/shop/items/)')
+        parser.add_argument(
+            '--modes',
+            default=','.join(MODES),
+            help=f'Comma-separated modes out of {", ".join(MODES)} (default: all)'
+        )
+        parser.add_argument('--duration', type=float, default=15, help='Seconds of load per mode (default: 15)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Client threads (default: 16)')
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes (default: 2)')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker (default: 4)')
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+        if 'pool' in modes and connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('Connection pooling needs PostgreSQL; skipping the pool mode'))
+            modes.remove('pool')
+
+        self.stdout.write(
+            f"🔌 {options['path']} on {connection.vendor}, {options['workers']} workers x {options['threads']} threads, "
+            f"{options['concurrency']} clients, {options['duration']:.0f}s per mode"
+        )
+        rows = []
+        for mode in modes:
+            with self.server(mode, MODES[mode], options) as base_url:
+                rows.append((mode, self.load(base_url + options['path'], options)))
+
+        self.stdout.write(f"\n{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for mode, row in rows:
+            self.stdout.write(
+                f"{mode:<12}{row['rps']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['errors']:>8}"
+            )
+        if any(row['errors'] for _, row in rows):
+            raise CommandError('Some requests failed; see the errors column')
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark complete'))
+
+    @contextmanager
+    def server(self, label, overrides, options, ready_path=None):
+        """Run gunicorn with ``overrides`` in its environment; yields its base URL."""
+        self.stdout.write(f'Starting gunicorn ({label})...')
+        port = free_port()
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            env = {
+                **os.environ,
+                **overrides,
+                # Every request must reach the database, and stay off the real metrics directory
+                'CATALOGUE_CACHE_TTL': '0',
+                'PROMETHEUS_MULTIPROC_DIR': metrics_dir,
+            }
+            process = subprocess.Popen(
+                [
+                    sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                    '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']),
+                    '--threads', str(options['threads']), '--log-level', 'warning',
+                ],
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+            )
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                self.wait_until_ready(base_url + (ready_path or options['path']), process)
+                yield base_url
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    def fetch(self, url, data=None, headers=None):
+        request = urllib.request.Request(url, data=data, headers={
+            'Host': settings.ALLOWED_HOSTS[0],
+            # Counts as HTTPS when SECURE_SSL_REDIRECT is on (DEBUG=False)
+            'X-Forwarded-Proto': 'https',
+            **(headers or {}),
+        })
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            return response.status
+
+    def wait_until_ready(self, url, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'gunicorn exited with status {process.returncode}')
+            try:
+                self.fetch(url)
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f'gunicorn did not answer {url} within {timeout}s')
+
+    def load(self, url, options, **request):
+        deadline = time.monotonic() + options['duration']
+
+        def client():
+            latencies, errors = [], 0
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    self.fetch(url, **request)
+                except (urllib.error.URLError, ConnectionError):
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+            return latencies, errors
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(lambda _: client(), range(options['concurrency'])))
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(latency for batch, _ in results for latency in batch)
+        if not latencies:
+            raise CommandError(f'No successful requests to {url}')
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50_ms': statistics.median(latencies) * 1000,
+            'p95_ms': latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000,
+            'errors': sum(errors for _, errors in results),
+        }
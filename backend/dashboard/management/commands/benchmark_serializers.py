@@ -0,0 +1,96 @@
+# Django Management Command comparing DRF's serializers and JSON renderer with the shop's fast list path
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from shop.models import CartItem, Item, Purchase
+from shop.renderers import FastJSONRenderer
+from shop.serializers import CartItemSerializer, ItemSerializer, PurchaseSerializer
+
+User = get_user_model()
+
+SERIALIZERS = [('items', ItemSerializer), ('cart', CartItemSerializer), ('purchases', PurchaseSerializer)]
+
+
+def build_rows(count):
+    """Unsaved model instances with their relations attached, as select_related() would load them."""
+    now = timezone.now()
+    users = [User(pk=i + 1, username=f'bench_user_{i}', email=f'bench{i}@example.com') for i in range(20)]
+    items, cart, purchases = [], [], []
+    for i in range(count):
+        sold = i % 3 == 0
+        item = Item(
+            pk=i + 1,
+            title=f'Benchmark item {i} – vintage',
+            description='A long enough description of a benchmark item. ' * 4,
+            price=Decimal(500 + i * 7) / 100,
+            category='shoes',
+            image_url=f'https://example.com/images/{i}.jpg' if i % 2 else None,
+            seller=users[i % len(users)],
+            buyer=users[(i + 1) % len(users)] if sold else None,
+            status='sold' if sold else 'on_sale',
+            date_added=now - timedelta(minutes=i),
+            date_sold=now if sold else None,
+        )
+        items.append(item)
+        cart.append(CartItem(pk=i + 1, user=users[0], item=item, date_added=now))
+        purchases.append(Purchase.for_item(
+            item, pk=i + 1, buyer=users[0], purchase_date=now, purchase_price=item.price,
+            payment_intent_id=f'pi_bench_{i}',
+        ))
+    return {'items': items, 'cart': cart, 'purchases': purchases}
+
+
+class Command(BaseCommand):
+    help = 'Measure items/sec for the list serializers and JSON rendering, with DRF and with the fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page (default: 100)')
+        parser.add_argument('--runs', type=int, default=200, help='Pages serialized per measurement (default: 200)')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['runs'] < 1:
+            raise CommandError('--rows and --runs must be at least 1')
+        rows = build_rows(options['rows'])
+
+        self.stdout.write(f"⏱️  {options['runs']} pages of {options['rows']} rows")
+        self.stdout.write(f"{'list':<12}{'path':<8}{'serialize/s':>14}{'render/s':>14}{'total/s':>14}{'speedup':>10}")
+        for label, serializer_class in SERIALIZERS:
+            data = rows[label]
+            baseline = self.measure(
+                lambda: serializers.ListSerializer(data, child=serializer_class()).data, JSONRenderer(), options
+            )
+            fast = self.measure(lambda: serializer_class(data, many=True).data, FastJSONRenderer(), options)
+            if baseline['body'] != fast['body']:
+                raise CommandError(f'{label}: the fast path rendered different JSON')
+            for path, result in (('drf', baseline), ('fast', fast)):
+                speedup = f"{result['total'] / baseline['total']:.1f}x"
+                self.stdout.write(
+                    f"{label:<12}{path:<8}{result['serialize']:>14,.0f}{result['render']:>14,.0f}"
+                    f"{result['total']:>14,.0f}{speedup:>10}"
+                )
+        self.stdout.write(self.style.SUCCESS('✅ Output identical; benchmark complete'))
+
+    def measure(self, serialize, renderer, options):
+        """Rows per second spent in ``serialize()`` and in rendering its result."""
+        serialize_time = render_time = 0.0
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            data = serialize()
+            middle = time.perf_counter()
+            body = renderer.render(data)
+            render_time += time.perf_counter() - middle
+            serialize_time += middle - start
+        rows = options['rows'] * options['runs']
+        return {
+            'serialize': rows / serialize_time,
+            'render': rows / render_time,
+            'total': rows / (serialize_time + render_time),
+            'body': body,
+        }
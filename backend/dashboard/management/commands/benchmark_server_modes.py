@@ -0,0 +1,113 @@
+# Django Management Command comparing gunicorn's sync (WSGI) workers with uvicorn (ASGI) workers under load
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from shop.models import CartItem, Item
+from .benchmark_connections import Command as ConnectionBenchmark
+
+User = get_user_model()
+
+# Environment overrides for each mode; SERVER_MODE also picks the views (see ASYNC_VIEWS)
+MODES = {
+    'wsgi': {'SERVER_MODE': 'wsgi'},
+    'asgi': {'SERVER_MODE': 'asgi'},
+}
+
+SCENARIOS = ['catalogue', 'payment-intent']
+
+
+class Command(ConnectionBenchmark):
+    help = (
+        'Serve the API with sync workers and with uvicorn workers, and measure requests/sec for the catalogue '
+        'and for payment intents (fake gateway with simulated latency) at rising concurrency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes',
+            default=','.join(MODES),
+            help=f'Comma-separated modes out of {", ".join(MODES)} (default: all)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            default='8,32,128',
+            help='Comma-separated client thread counts (default: 8,32,128)'
+        )
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of load per run (default: 10)')
+        parser.add_argument(
+            '--latency-ms', type=int, default=200, help='Simulated payment API latency in ms (default: 200)'
+        )
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes (default: 2)')
+        parser.add_argument(
+            '--threads', type=int, default=4, help='Threads per sync worker; ignored by uvicorn (default: 4)'
+        )
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of numbers')
+
+        self.stdout.write(
+            f"🔀 {options['workers']} workers ({options['threads']} threads per sync worker), "
+            f"{options['latency_ms']}ms payment latency, {options['duration']:.0f}s per run"
+        )
+        buyer, seller = self.create_shopper()
+        requests = {
+            'catalogue': ('/api/shop/items/', {}),
+            'payment-intent': ('/api/shop/create-payment-intent/', {
+                'data': b'',
+                'headers': {'Authorization': f'Bearer {AccessToken.for_user(buyer)}'},
+            }),
+        }
+        overrides = {
+            'PAYMENT_GATEWAY': 'fake',
+            'FAKE_PAYMENT_LATENCY_MS': str(options['latency_ms']),
+            # Every request must go to the gateway
+            'PAYMENT_INTENT_REUSE_TTL': '0',
+            'PAYMENT_STATUS_CACHE_TTL': '0',
+            # Without this every catalogue request after the first is a response cache hit,
+            # and the run would compare cache lookups rather than the views and the ORM
+            'CATALOGUE_CACHE_TTL': '0',
+        }
+
+        rows = []
+        try:
+            for mode in modes:
+                with self.server(mode, {**overrides, **MODES[mode]}, options, ready_path='/api/shop/items/') as base_url:
+                    for scenario in SCENARIOS:
+                        path, request = requests[scenario]
+                        for level in levels:
+                            row = self.load(base_url + path, {**options, 'concurrency': level}, **request)
+                            rows.append((mode, scenario, level, row))
+        finally:
+            User.objects.filter(pk__in=[buyer.pk, seller.pk]).delete()
+
+        self.stdout.write(
+            f"\n{'mode':<8}{'scenario':<16}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+        )
+        for mode, scenario, level, row in rows:
+            self.stdout.write(
+                f"{mode:<8}{scenario:<16}{level:>8}{row['rps']:>10.1f}{row['p50_ms']:>10.1f}"
+                f"{row['p95_ms']:>10.1f}{row['errors']:>8}"
+            )
+        if any(row['errors'] for *_, row in rows):
+            raise CommandError('Some requests failed; see the errors column')
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark complete'))
+
+    def create_shopper(self):
+        """A throwaway buyer with one item in their cart, deleted again after the run."""
+        seller = User.objects.create_user(username='bench_server_modes_seller')
+        buyer = User.objects.create_user(username='bench_server_modes_buyer')
+        item = Item.objects.create(
+            title='Benchmark item', description='Created by benchmark_server_modes', price=Decimal('25.00'), seller=seller,
+        )
+        CartItem.objects.create(user=buyer, item=item)
+        return buyer, seller
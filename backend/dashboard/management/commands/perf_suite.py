@@ -0,0 +1,72 @@
+# Django Management Command for the endpoint performance suite
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from dashboard import perf
+
+DEFAULT_BASELINE = Path(perf.__file__).with_name('perf_baseline.json')
+
+
+class Command(BaseCommand):
+    help = 'Measure every API endpoint at several data scales in a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            default='tiny,small',
+            help=f'Comma-separated scales to run, from {", ".join(perf.SCALES)} (default: tiny,small)'
+        )
+        parser.add_argument('--runs', type=int, default=3, help='Requests per endpoint; timings are medians (default: 3)')
+        parser.add_argument('--output', default='perf_results.json', help='Where to write the results JSON')
+        parser.add_argument(
+            '--baseline',
+            nargs='?',
+            const=str(DEFAULT_BASELINE),
+            help='Compare with a baseline JSON and fail on regressions (default file: dashboard/perf_baseline.json)'
+        )
+        parser.add_argument(
+            '--time-tolerance',
+            type=float,
+            help='Also fail when wall time exceeds the baseline by this fraction (e.g. 0.5), plus 5 ms'
+        )
+        parser.add_argument('--update-baseline', action='store_true', help='Write the results to the baseline file')
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options['scales'].split(',') if scale.strip()]
+        unknown = set(scales) - set(perf.SCALES)
+        if unknown:
+            raise CommandError(f'Unknown scales: {", ".join(sorted(unknown))}')
+
+        self.stdout.write('⏱️  Running endpoint performance suite')
+        self.stdout.write(f'  {"scale":<7}{"endpoint":<26}{"http":>4}{"sql":>7}{"sql ms":>10}{"ser ms":>10}{"wall ms":>13}')
+
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = perf.run_suite(scales, runs=options['runs'], stdout=self.stdout)
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        Path(options['output']).write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+        self.stdout.write(f"Results written to {options['output']}")
+
+        baseline_path = Path(options['baseline'] or DEFAULT_BASELINE)
+        if options['update_baseline']:
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline updated: {baseline_path}'))
+            return
+
+        if options['baseline']:
+            baseline = json.loads(baseline_path.read_text())
+            regressions = perf.compare(results, baseline, time_tolerance=options['time_tolerance'])
+            if regressions:
+                self.stdout.write('\n'.join(f'  {line}' for line in regressions))
+                raise CommandError(f'{len(regressions)} performance regression(s) against {baseline_path}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
@@ -0,0 +1,68 @@
+# Django Management Command for rebuilding the analytics rollup tables
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard import rollups
+from dashboard.models import DailyItemStats, DailyUserStats, UserActivityStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the analytics rollup tables from items, purchases and users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert (default: 1000)'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare the rollups with the source tables and fail if they have drifted'
+        )
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help='Only rebuild when the rollup tables are empty, e.g. on the first deploy'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            return self.check_drift()
+        if options['if_empty'] and any(
+            model.objects.exists() for model in (DailyItemStats, DailyUserStats, UserActivityStats)
+        ):
+            self.stdout.write('Rollups already populated; skipping the rebuild')
+            return
+
+        self.stdout.write('Rebuilding analytics rollups...')
+        summary = rollups.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {summary['daily_item_stats']} daily item rows and "
+                f"{summary['user_activity_stats']} user activity rows "
+                f"(total revenue {summary['revenue']})"
+            )
+        )
+
+    def check_drift(self):
+        since = timezone.localdate() - timedelta(days=29)
+        served, live = rollups.overview(since), rollups.live_overview(since)
+        mismatches = [
+            f"  {key}: rollup={served['overview'][key]} live={value}"
+            for key, value in live['overview'].items()
+            if served['overview'][key] != value
+        ]
+        if served['categories'] != live['categories']:
+            mismatches.append('  category breakdown differs')
+        if served['top_sellers'] != live['top_sellers']:
+            mismatches.append('  top sellers differ')
+        if rollups.rollup_active_users() != rollups.live_active_users():
+            mismatches.append('  active users differ')
+
+        if mismatches:
+            self.stdout.write('\n'.join(mismatches))
+            raise CommandError('Rollups have drifted from the source tables; run rebuild_rollups')
+        self.stdout.write(self.style.SUCCESS('Rollups match the source tables'))
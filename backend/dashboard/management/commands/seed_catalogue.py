@@ -0,0 +1,70 @@
+# Django Management Command for seeding a large synthetic catalogue for load testing
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from dashboard import rollups
+from shop import response_cache, search, seeding
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Generate users, items and purchases in bulk, deterministically from a seed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100000, help='Items to create (default: 100000)')
+        parser.add_argument('--users', type=int, default=1000, help='Users to create (default: 1000)')
+        parser.add_argument('--purchases', type=int, default=20000, help='Items sold, with a purchase each (default: 20000)')
+        parser.add_argument('--workers', type=int, default=1, help='Processes generating rows (default: 1)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; same seed, same rows (default: 42)')
+        parser.add_argument('--days', type=int, default=365, help='Spread listing dates over this many days (default: 365)')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per batch and commit (default: 10000)')
+        parser.add_argument('--user-prefix', default='load_', help='Username prefix for generated users (default: load_)')
+        parser.add_argument('--password', default='loadtest123', help='Password shared by all generated users')
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Skip rebuilding the search index and analytics rollups afterwards'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--users, --workers and --batch-size must be at least 1')
+        if options['items'] < 0:
+            raise CommandError('--items must be at least 0')
+        if options['purchases'] > options['items']:
+            raise CommandError('--purchases cannot exceed --items')
+        if User.objects.filter(username__startswith=options['user_prefix']).exists():
+            raise CommandError(f"Users named {options['user_prefix']}* already exist; pass a different --user-prefix")
+
+        plan = seeding.make_plan(
+            items=options['items'],
+            users=options['users'],
+            purchases=options['purchases'],
+            seed=options['seed'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            user_prefix=options['user_prefix'],
+        )
+
+        self.stdout.write(f"🌱 Seeding {plan['users']} users, {plan['items']} items, {plan['purchases']} purchases")
+        started = time.perf_counter()
+
+        def progress(done):
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(f'  {done}/{plan["items"]} items ({rate:,.0f}/s)')
+
+        # PBKDF2 is deliberately slow, so hash once and share the result
+        seeding.run(plan, make_password(options['password']), workers=options['workers'], progress=progress)
+
+        if not options['skip_rebuild']:
+            self.stdout.write('Rebuilding search index and rollups...')
+            search.rebuild_index()
+            rollups.rebuild()
+        response_cache.invalidate_catalogue()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Seeded catalogue in {time.perf_counter() - started:.1f}s (seed {plan["seed"]})')
+        )
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('dashboard', '0002_remove_item_buyer_remove_item_seller_delete_cartitem_and_more'),
+        ('users', '0002_alter_customuser_groups_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('registrations', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyItemStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('price_bucket', models.PositiveSmallIntegerField(help_text='Index into dashboard.rollups.PRICE_RANGES')),
+                ('items_listed', models.PositiveIntegerField(default=0)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'category', 'price_bucket'), name='daily_item_stats_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserActivityStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('items_listed', models.PositiveIntegerField(default=0)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('purchases', models.PositiveIntegerField(default=0)),
+                ('activity', models.PositiveIntegerField(default=0, help_text='items_listed + purchases')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-revenue'], name='activity_revenue_idx'), models.Index(fields=['-activity'], name='activity_score_idx')],
+            },
+        ),
+    ]
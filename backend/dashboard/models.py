@@ -1,4 +1,58 @@
+from django.conf import settings
 from django.db import models
 
-# The dashboard app only handles the landing page and database population.
-# All shop-related models are in the shop app.
+# The dashboard app handles the landing page, database population and the
+# analytics rollups below. All shop-related models are in the shop app.
+#
+# The rollup tables are summaries of shop and user activity that the analytics
+# endpoints read instead of scanning Item, Purchase and User. They are updated
+# incrementally as rows are created (see dashboard.rollups) and can be rebuilt
+# from scratch with ``manage.py rebuild_rollups``.
+
+
+class DailyItemStats(models.Model):
+    """Listings and sales per day, category and price bucket."""
+    date = models.DateField()
+    category = models.CharField(max_length=20)
+    price_bucket = models.PositiveSmallIntegerField(help_text="Index into dashboard.rollups.PRICE_RANGES")
+    items_listed = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category', 'price_bucket'], name='daily_item_stats_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.category} #{self.price_bucket}"
+
+
+class DailyUserStats(models.Model):
+    """New registrations per day."""
+    date = models.DateField(unique=True)
+    registrations = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.registrations} registrations"
+
+
+class UserActivityStats(models.Model):
+    """Lifetime selling and buying totals for each user with any activity."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='activity_stats'
+    )
+    items_listed = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    purchases = models.PositiveIntegerField(default=0)
+    activity = models.PositiveIntegerField(default=0, help_text="items_listed + purchases")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-revenue'], name='activity_revenue_idx'),
+            models.Index(fields=['-activity'], name='activity_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Activity for user {self.user_id}"
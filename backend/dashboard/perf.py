@@ -0,0 +1,262 @@
+"""
+Endpoint performance suite (``manage.py perf_suite``).
+
+Seeds the catalogue at one or more scales and calls every route in
+``shop/urls.py``, ``dashboard/urls.py`` and ``users/urls.py`` through the DRF
+test client, recording per endpoint the query count, SQL time, serializer
+time and wall time. Each request runs in a transaction that is rolled back,
+so writes (checkout, signup, populate) don't change the data the next
+request sees, and the cache is cleared first so every request does its full
+work.
+
+Results are plain JSON; ``compare()`` diffs them against a stored baseline.
+Query counts are deterministic and always compared. Timings depend on the
+machine and are only compared when a tolerance is given.
+"""
+import time
+from statistics import median
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.profiling import serializer_timer, serializer_timer_installed
+from shop import search, seeding
+from shop.models import CartItem, Item, Purchase
+from . import rollups
+
+User = get_user_model()
+
+SCALES = {
+    'tiny': {'items': 200, 'users': 20, 'purchases': 40},
+    'small': {'items': 5000, 'users': 200, 'purchases': 1000},
+    'medium': {'items': 50000, 'users': 1000, 'purchases': 10000},
+}
+SCALE_ORDER = list(SCALES)
+PASSWORD = 'perfpass123'
+CART_SIZE = 5
+URLCONFS = ('shop.urls', 'dashboard.urls', 'users.urls')
+
+# The legacy HTML views render templates that are not shipped with the app
+SKIPPED_ROUTES = {'item_list', 'item_detail', 'item_create', 'item_update', 'my_items', 'purchase_history', 'cart'}
+
+
+def endpoint(label, method, path, user=None, data=None, max_scale=None):
+    """``path`` and ``data`` may be callables taking the fixture context."""
+    return {
+        'label': label,
+        'route': label.split(':')[0],
+        'method': method,
+        'path': path,
+        'user': user,
+        'data': data,
+        'max_scale': max_scale,
+    }
+
+
+ENDPOINTS = [
+    # shop
+    endpoint('api_item_list', 'get', '/api/shop/items/'),
+    endpoint('api_item_list:category', 'get', '/api/shop/items/?category=shoes&ordering=price'),
+    endpoint('api_item_list:search', 'get', '/api/shop/items/?q=leather'),
+    endpoint('api_item_list:cursor', 'get', '/api/shop/items/?pagination=cursor'),
+    endpoint('api_item_detail', 'get', lambda ctx: f"/api/shop/items/{ctx['item_id']}/"),
+    endpoint('api_item_create', 'post', '/api/shop/items/create/', user='seller', data={
+        'title': 'Perf suite boots', 'description': 'Created by the perf suite', 'price': '49.00', 'category': 'shoes',
+    }),
+    endpoint('api_item_update', 'patch', lambda ctx: f"/api/shop/items/{ctx['seller_item_id']}/update/",
+             user='seller', data={'price': '45.00'}),
+    endpoint('api_my_items', 'get', '/api/shop/my-items/', user='seller'),
+    endpoint('api_my_items:on_sale', 'get', '/api/shop/my-items/?section=on_sale', user='seller'),
+    endpoint('api_my_items:sold', 'get', '/api/shop/my-items/?section=sold', user='seller'),
+    endpoint('api_my_items:purchased', 'get', '/api/shop/my-items/?section=purchased&page_size=100', user='buyer'),
+    endpoint('api_purchase_history', 'get', '/api/shop/purchases/', user='buyer'),
+    endpoint('api_cart', 'get', '/api/shop/cart/', user='buyer'),
+    endpoint('api_cart_summary', 'get', '/api/shop/cart/summary/', user='buyer'),
+    endpoint('add_to_cart', 'post', lambda ctx: f"/api/shop/cart/add/{ctx['item_id']}/", user='buyer'),
+    endpoint('remove_from_cart', 'delete', lambda ctx: f"/api/shop/cart/remove/{ctx['cart_item_ids'][0]}/",
+             user='buyer'),
+    endpoint('api_cart_batch', 'post', '/api/shop/cart/batch/', user='buyer', data=lambda ctx: {
+        'add': [ctx['item_id']], 'remove': ctx['cart_item_ids'][:2],
+    }),
+    endpoint('create_payment_intent', 'post', '/api/shop/create-payment-intent/', user='buyer'),
+    endpoint('pay_cart', 'post', '/api/shop/cart/pay/', user='buyer', data={'payment_intent_id': 'pi_fake_perf'}),
+    # dashboard
+    endpoint('landing', 'get', '/'),
+    endpoint('populate_database', 'post', '/api/dashboard/populate-database/', max_scale='tiny'),
+    endpoint('populate_sample_data', 'post', '/api/dashboard/populate-sample/', max_scale='tiny'),
+    endpoint('analytics_overview', 'get', '/api/dashboard/analytics/overview/', user='buyer'),
+    endpoint('sales_analytics', 'get', '/api/dashboard/analytics/sales/', user='buyer'),
+    endpoint('user_analytics', 'get', '/api/dashboard/analytics/users/', user='buyer'),
+    # users
+    endpoint('home', 'get', '/api/users/'),
+    endpoint('token_obtain_pair', 'post', '/api/users/token', data=lambda ctx: {
+        'username': ctx['buyer'].username, 'password': PASSWORD,
+    }),
+    endpoint('token_refresh', 'post', '/api/users/token/refresh', data=lambda ctx: {'refresh': ctx['refresh']}),
+    endpoint('signup', 'post', '/api/users/signup', data={
+        'username': 'perf_signup', 'email': 'perf_signup@shop.aa', 'password': PASSWORD,
+    }),
+    endpoint('profile', 'get', '/api/users/profile', user='buyer'),
+    endpoint('profile:update', 'put', '/api/users/profile', user='buyer', data={'address': 'Perf street 1'}),
+    endpoint('change_password', 'post', '/api/users/change-password', user='buyer', data={
+        'old_password': PASSWORD, 'new_password': 'perfpass456',
+    }),
+]
+
+
+def route_names():
+    names = set()
+    for urlconf in URLCONFS:
+        for pattern in get_resolver(urlconf).url_patterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                names.add(pattern.name)
+            elif isinstance(pattern, URLResolver):
+                names.update(p.name for p in pattern.url_patterns if getattr(p, 'name', None))
+    return names
+
+
+def uncovered_routes():
+    """Named routes with neither an ENDPOINTS entry nor a SKIPPED_ROUTES reason."""
+    return sorted(route_names() - {spec['route'] for spec in ENDPOINTS} - SKIPPED_ROUTES)
+
+
+def seed(scale, already_seeded):
+    """Top the catalogue up to ``scale``'s volume; returns the new totals."""
+    target = SCALES[scale]
+    missing = {key: target[key] - already_seeded.get(key, 0) for key in target}
+    if missing['items'] > 0:
+        plan = seeding.make_plan(
+            items=missing['items'],
+            users=max(missing['users'], 1),
+            purchases=max(missing['purchases'], 0),
+            user_prefix=f'perf_{scale}_',
+        )
+        seeding.run(plan, make_password(PASSWORD))
+        search.rebuild_index()
+        rollups.rebuild()
+    return dict(target)
+
+
+def fixture_context():
+    """Pick the actors and rows the endpoint specs refer to."""
+    # The power seller and the most frequent buyer make for the heaviest pages
+    seller_id = Item.objects.values('seller').annotate(n=Count('id')).order_by('-n', 'seller')[0]['seller']
+    buyer_id = Purchase.objects.values('buyer').annotate(n=Count('id')).order_by('-n', 'buyer')[0]['buyer']
+    seller, buyer = User.objects.get(pk=seller_id), User.objects.get(pk=buyer_id)
+
+    on_sale = Item.objects.filter(status='on_sale').exclude(seller=buyer).order_by('id')
+    cart_ids = list(on_sale.values_list('id', flat=True)[:CART_SIZE])
+    CartItem.objects.filter(user=buyer).delete()
+    CartItem.objects.bulk_create([CartItem(user=buyer, item_id=item_id) for item_id in cart_ids])
+
+    return {
+        'seller': seller,
+        'buyer': buyer,
+        'item_id': on_sale.exclude(id__in=cart_ids).values_list('id', flat=True).first(),
+        'seller_item_id': Item.objects.filter(seller=seller).order_by('id').values_list('id', flat=True).first(),
+        'cart_item_ids': cart_ids,
+        'refresh': str(RefreshToken.for_user(buyer)),
+    }
+
+
+def measure(spec, ctx, runs):
+    client = APIClient()
+    path = spec['path'](ctx) if callable(spec['path']) else spec['path']
+    data = spec['data'](ctx) if callable(spec['data']) else spec['data']
+
+    samples = []
+    for _ in range(runs):
+        cache.clear()
+        if spec['user']:
+            # A fresh instance each run: views like change_password modify request.user in memory
+            client.force_authenticate(User.objects.get(pk=ctx[spec['user']].pk))
+        with transaction.atomic(), serializer_timer_installed(), serializer_timer() as serializers:
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, spec['method'])(path, data, format='json')
+                wall = time.perf_counter() - start
+            transaction.set_rollback(True)
+        samples.append({
+            'status': response.status_code,
+            'queries': len(queries.captured_queries),
+            'sql_ms': sum(float(query['time']) for query in queries.captured_queries) * 1000,
+            'serialize_ms': serializers['seconds'] * 1000,
+            'wall_ms': wall * 1000,
+            'bytes': len(response.content),
+        })
+
+    last = samples[-1]
+    return {
+        'method': spec['method'].upper(),
+        'path': path,
+        'status': last['status'],
+        'queries': last['queries'],
+        'bytes': last['bytes'],
+        **{key: round(median(s[key] for s in samples), 3) for key in ('sql_ms', 'serialize_ms', 'wall_ms')},
+    }
+
+
+def run_suite(scales, runs=3, stdout=None):
+    """Seed each scale in turn (smallest first) and measure every endpoint at it."""
+    missing = uncovered_routes()
+    if missing:
+        raise ValueError(f'No perf suite endpoint for routes: {", ".join(missing)}')
+
+    results = {}
+    seeded = {}
+    with override_settings(PAYMENT_GATEWAY='fake', FAKE_PAYMENT_LATENCY_MS=0):
+        for scale in sorted(scales, key=SCALE_ORDER.index):
+            seeded = seed(scale, seeded)
+            ctx = fixture_context()
+            results[scale] = {}
+            for spec in ENDPOINTS:
+                if spec['max_scale'] and SCALE_ORDER.index(scale) > SCALE_ORDER.index(spec['max_scale']):
+                    continue
+                results[scale][spec['label']] = row = measure(spec, ctx, runs)
+                if stdout:
+                    stdout.write(
+                        f"  {scale:<7}{spec['label']:<26}{row['status']:>4}{row['queries']:>6}q"
+                        f"{row['sql_ms']:>10.1f}{row['serialize_ms']:>10.1f}{row['wall_ms']:>10.1f} ms"
+                    )
+    return {
+        'meta': {'vendor': connection.vendor, 'runs': runs, 'scales': {s: SCALES[s] for s in results}},
+        'results': results,
+    }
+
+
+def compare(results, baseline, time_tolerance=None, min_time_ms=5.0):
+    """
+    Return a list of regressions of ``results`` against ``baseline``.
+
+    More queries than the baseline is always a regression, as is a status
+    code change. With ``time_tolerance`` (e.g. 0.5 for +50%), a wall time
+    above ``baseline * (1 + tolerance) + min_time_ms`` is one too.
+    """
+    regressions = []
+    for scale, endpoints in baseline['results'].items():
+        for label, expected in endpoints.items():
+            actual = results['results'].get(scale, {}).get(label)
+            where = f'{scale}/{label}'
+            if actual is None:
+                if scale in results['results']:
+                    regressions.append(f'{where}: missing from results')
+                continue
+            if actual['status'] != expected['status']:
+                regressions.append(f"{where}: status {expected['status']} -> {actual['status']}")
+            if actual['queries'] > expected['queries']:
+                regressions.append(f"{where}: queries {expected['queries']} -> {actual['queries']}")
+            if time_tolerance is not None:
+                limit = expected['wall_ms'] * (1 + time_tolerance) + min_time_ms
+                if actual['wall_ms'] > limit:
+                    regressions.append(
+                        f"{where}: wall time {expected['wall_ms']:.1f} -> {actual['wall_ms']:.1f} ms"
+                    )
+    return regressions
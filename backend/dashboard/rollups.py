@@ -0,0 +1,315 @@
+"""
+Incremental maintenance and full rebuild of the analytics rollup tables.
+
+``record_*`` functions apply the deltas for newly created rows. They are
+wired to signals in ``dashboard.signals`` and run after the surrounding
+transaction commits, so a rolled back checkout never counts. Edits and
+deletes are not tracked incrementally; ``rebuild()`` (``manage.py
+rebuild_rollups``) recomputes everything from the source tables and is the
+way to backfill or correct drift.
+
+``overview()`` is what the dashboard serves; ``live_overview()`` computes
+the same figures straight from the source tables and is used by
+``rebuild_rollups --check`` to detect drift.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from shop.models import ArchivedItem, Item, Purchase
+from .models import DailyItemStats, DailyUserStats, UserActivityStats
+
+# Listings live in Item until shop.archive moves sold ones to ArchivedItem
+LISTING_MODELS = (Item, ArchivedItem)
+
+PRICE_RANGES = [
+    {'label': '$0-$50', 'min': 0, 'max': 50},
+    {'label': '$50-$100', 'min': 50, 'max': 100},
+    {'label': '$100-$250', 'min': 100, 'max': 250},
+    {'label': '$250-$500', 'min': 250, 'max': 500},
+    {'label': '$500+', 'min': 500, 'max': None}
+]
+
+ITEM_COUNTERS = ('items_listed', 'items_sold', 'revenue')
+ACTIVITY_COUNTERS = ('items_listed', 'items_sold', 'revenue', 'purchases')
+
+
+def price_bucket(price):
+    for index, range_data in enumerate(PRICE_RANGES):
+        if range_data['max'] is None or price < range_data['max']:
+            return index
+    return len(PRICE_RANGES) - 1
+
+
+def price_bucket_expression(field):
+    """SQL equivalent of ``price_bucket`` for grouped rebuild queries."""
+    whens = [
+        When(**{f'{field}__lt': range_data['max']}, then=Value(index))
+        for index, range_data in enumerate(PRICE_RANGES)
+        if range_data['max'] is not None
+    ]
+    return Case(*whens, default=Value(len(PRICE_RANGES) - 1), output_field=IntegerField())
+
+
+def _day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def _bump(model, lookup, deltas):
+    """Add ``deltas`` to the counters of the row matching ``lookup``, creating it if needed."""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    row, _ = model.objects.get_or_create(**lookup)
+    model.objects.filter(pk=row.pk).update(**{field: F(field) + value for field, value in deltas.items()})
+
+
+def _apply(item_deltas, activity_deltas=None, registration_deltas=None):
+    for (date, category, bucket), deltas in item_deltas.items():
+        _bump(DailyItemStats, {'date': date, 'category': category, 'price_bucket': bucket}, deltas)
+    for user_id, deltas in (activity_deltas or {}).items():
+        deltas['activity'] = deltas.get('items_listed', 0) + deltas.get('purchases', 0)
+        _bump(UserActivityStats, {'user_id': user_id}, deltas)
+    for date, count in (registration_deltas or {}).items():
+        _bump(DailyUserStats, {'date': date}, {'registrations': count})
+
+
+def _counter():
+    return defaultdict(lambda: defaultdict(int))
+
+
+def record_items_listed(items):
+    item_deltas, activity_deltas = _counter(), _counter()
+    for item in items:
+        item_deltas[(_day(item.date_added), item.category, price_bucket(item.price))]['items_listed'] += 1
+        activity_deltas[item.seller_id]['items_listed'] += 1
+    transaction.on_commit(lambda: _apply(item_deltas, activity_deltas))
+
+
+def record_purchases(purchases):
+    """Sales are counted from the purchases' item snapshots (``Purchase.for_item``)."""
+    item_deltas, activity_deltas = _counter(), _counter()
+    for purchase in purchases:
+        key = (_day(purchase.purchase_date), purchase.item_category, price_bucket(purchase.purchase_price))
+        item_deltas[key]['items_sold'] += 1
+        item_deltas[key]['revenue'] += purchase.purchase_price
+        if purchase.seller_id is not None:
+            activity_deltas[purchase.seller_id]['items_sold'] += 1
+            activity_deltas[purchase.seller_id]['revenue'] += purchase.purchase_price
+        activity_deltas[purchase.buyer_id]['purchases'] += 1
+    transaction.on_commit(lambda: _apply(item_deltas, activity_deltas))
+
+
+def record_registrations(users):
+    registration_deltas = defaultdict(int)
+    for user in users:
+        registration_deltas[_day(user.date_joined)] += 1
+    transaction.on_commit(lambda: _apply({}, registration_deltas=registration_deltas))
+
+
+def rebuild(batch_size=1000):
+    """Recompute every rollup table from Item, ArchivedItem, Purchase and User with grouped queries."""
+    User = get_user_model()
+
+    item_rows = defaultdict(lambda: dict.fromkeys(ITEM_COUNTERS, 0))
+    for model in LISTING_MODELS:
+        listed = (
+            model.objects.annotate(day=TruncDate('date_added'), bucket=price_bucket_expression('price'))
+            .values('day', 'category', 'bucket')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for row in listed.iterator():
+            item_rows[(row['day'], row['category'], row['bucket'])]['items_listed'] += row['count']
+
+    sold = (
+        Purchase.objects.annotate(day=TruncDate('purchase_date'), bucket=price_bucket_expression('purchase_price'))
+        .values('day', 'item_category', 'bucket')
+        .annotate(count=Count('id'), total=Sum('purchase_price'))
+        .order_by()
+    )
+    for row in sold.iterator():
+        key = (row['day'], row['item_category'], row['bucket'])
+        item_rows[key]['items_sold'] = row['count']
+        item_rows[key]['revenue'] = row['total']
+
+    registrations = (
+        User.objects.annotate(day=TruncDate('date_joined')).values('day').annotate(count=Count('id')).order_by()
+    )
+
+    activity = defaultdict(lambda: dict.fromkeys(ACTIVITY_COUNTERS, 0))
+    for model in LISTING_MODELS:
+        for row in model.objects.values('seller').annotate(count=Count('id')).order_by().iterator():
+            activity[row['seller']]['items_listed'] += row['count']
+    seller_sales = Purchase.objects.filter(seller__isnull=False).values('seller').annotate(
+        count=Count('id'), total=Sum('purchase_price')
+    )
+    for row in seller_sales.order_by().iterator():
+        activity[row['seller']]['items_sold'] = row['count']
+        activity[row['seller']]['revenue'] = row['total']
+    for row in Purchase.objects.values('buyer').annotate(count=Count('id')).order_by().iterator():
+        activity[row['buyer']]['purchases'] = row['count']
+
+    with transaction.atomic():
+        DailyItemStats.objects.all().delete()
+        DailyUserStats.objects.all().delete()
+        UserActivityStats.objects.all().delete()
+
+        DailyItemStats.objects.bulk_create(
+            (
+                DailyItemStats(date=date, category=category, price_bucket=bucket, **counters)
+                for (date, category, bucket), counters in item_rows.items()
+            ),
+            batch_size=batch_size,
+        )
+        DailyUserStats.objects.bulk_create(
+            (DailyUserStats(date=row['day'], registrations=row['count']) for row in registrations.iterator()),
+            batch_size=batch_size,
+        )
+        UserActivityStats.objects.bulk_create(
+            (
+                UserActivityStats(
+                    user_id=user_id,
+                    activity=counters['items_listed'] + counters['purchases'],
+                    **counters
+                )
+                for user_id, counters in activity.items()
+            ),
+            batch_size=batch_size,
+        )
+
+    return {
+        'daily_item_stats': len(item_rows),
+        'user_activity_stats': len(activity),
+        'revenue': sum((row['revenue'] for row in item_rows.values()), Decimal('0')),
+    }
+
+
+def overview(since):
+    """Dashboard totals, category breakdown and top sellers, read from the rollups only."""
+    recent = Q(date__gte=since)
+    item_totals = DailyItemStats.objects.aggregate(
+        total_items=Sum('items_listed'),
+        total_purchases=Sum('items_sold'),
+        total_revenue=Sum('revenue'),
+        recent_listings=Sum('items_listed', filter=recent),
+        recent_purchases=Sum('items_sold', filter=recent)
+    )
+    user_totals = DailyUserStats.objects.aggregate(
+        total_users=Sum('registrations'),
+        recent_users=Sum('registrations', filter=recent)
+    )
+    totals = {key: value or 0 for key, value in {**item_totals, **user_totals}.items()}
+
+    categories = DailyItemStats.objects.values('category').annotate(
+        count=Sum('items_listed'),
+        sold=Sum('items_sold')
+    ).order_by('-count', 'category')
+
+    top_sellers = UserActivityStats.objects.filter(
+        items_sold__gt=0
+    ).select_related('user').order_by('-revenue', 'user_id')[:5]
+
+    return _overview_response(totals, categories, [
+        (stats.user.username, stats.items_sold, stats.revenue) for stats in top_sellers
+    ])
+
+
+def live_overview(since):
+    """The same figures as ``overview()``, computed from Item, ArchivedItem, Purchase and User."""
+    User = get_user_model()
+    since_dt = timezone.make_aware(datetime.combine(since, datetime.min.time()))
+
+    item_totals = {'total_items': 0, 'recent_listings': 0}
+    listed = defaultdict(int)
+    for model in LISTING_MODELS:
+        totals = model.objects.aggregate(
+            total_items=Count('id'),
+            recent_listings=Count('id', filter=Q(date_added__gte=since_dt))
+        )
+        for key, value in totals.items():
+            item_totals[key] += value
+        for category, count in model.objects.values_list('category').annotate(count=Count('id')).order_by():
+            listed[category] += count
+    purchase_totals = Purchase.objects.aggregate(
+        total_purchases=Count('id'),
+        total_revenue=Sum('purchase_price'),
+        recent_purchases=Count('id', filter=Q(purchase_date__gte=since_dt))
+    )
+    user_totals = User.objects.aggregate(
+        total_users=Count('id'),
+        recent_users=Count('id', filter=Q(date_joined__gte=since_dt))
+    )
+    totals = {key: value or 0 for key, value in {**item_totals, **purchase_totals, **user_totals}.items()}
+
+    # Sales are counted by purchase record, the way the rollups count them
+    sold = dict(Purchase.objects.values_list('item_category').annotate(count=Count('id')).order_by())
+    categories = [
+        {'category': category, 'count': count, 'sold': sold.get(category, 0)}
+        for category, count in sorted(listed.items(), key=lambda entry: (-entry[1], entry[0]))
+    ]
+
+    # Purchase.seller is a single reverse relation, so nothing multiplies the rows
+    top_sellers = User.objects.annotate(
+        items_sold=Count('sales'),
+        revenue=Sum('sales__purchase_price')
+    ).filter(items_sold__gt=0).order_by('-revenue', 'id')[:5]
+
+    return _overview_response(totals, categories, [
+        (user.username, user.items_sold, user.revenue) for user in top_sellers
+    ])
+
+
+def live_active_users(limit=10):
+    """Most active users (listings + purchases) computed from the source tables."""
+    User = get_user_model()
+    listed = [
+        Coalesce(Subquery(
+            model.objects.filter(seller=OuterRef('pk')).order_by().values('seller').annotate(
+                count=Count('id')
+            ).values('count')
+        ), 0)
+        for model in LISTING_MODELS
+    ]
+    bought = Purchase.objects.filter(buyer=OuterRef('pk')).order_by().values('buyer').annotate(
+        count=Count('id')
+    ).values('count')
+    # Correlated counts use the seller/buyer foreign key indexes and, unlike
+    # Count('items_for_sale') + Count('purchases'), don't multiply each other
+    users = User.objects.annotate(
+        activity=sum(listed, Coalesce(Subquery(bought), 0))
+    ).filter(activity__gt=0).order_by('-activity', 'id')[:limit]
+    return [(user.username, user.activity) for user in users]
+
+
+def rollup_active_users(limit=10):
+    stats = UserActivityStats.objects.filter(
+        activity__gt=0
+    ).select_related('user').order_by('-activity', 'user_id')[:limit]
+    return [(row.user.username, row.activity) for row in stats]
+
+
+def _overview_response(totals, categories, top_sellers):
+    return {
+        'overview': {
+            'total_items': totals['total_items'],
+            'total_users': totals['total_users'],
+            'total_purchases': totals['total_purchases'],
+            'active_listings': totals['total_items'] - totals['total_purchases'],
+            'total_revenue': float(totals['total_revenue']),
+            'recent_users': totals['recent_users'],
+            'recent_purchases': totals['recent_purchases'],
+            'recent_listings': totals['recent_listings']
+        },
+        'categories': list(categories),
+        'top_sellers': [
+            {'username': username, 'items_sold': items_sold, 'revenue': float(revenue or 0)}
+            for username, items_sold, revenue in top_sellers
+        ]
+    }
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from shop.models import Item, Purchase
+from shop.signals import purchases_created
+from . import rollups
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Item)
+def item_listed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.record_items_listed([instance])
+
+
+@receiver(post_save, sender=Purchase)
+def purchase_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.record_purchases([instance])
+
+
+@receiver(purchases_created)
+def purchases_checked_out(sender, purchases, **kwargs):
+    rollups.record_purchases(purchases)
+
+
+@receiver(post_save, sender=User)
+def user_registered(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.record_registrations([instance])
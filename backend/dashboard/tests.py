@@ -1,3 +1,272 @@
+from datetime import timedelta
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shop import seeding
+from shop.checkout import checkout_cart
+from shop.models import Item, CartItem, Purchase
+from . import perf, rollups
+from .models import DailyItemStats, DailyUserStats, UserActivityStats
+from .views import daily_totals, window_dates
+
+User = get_user_model()
+
+
+class AnalyticsTestMixin:
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def sell(self, price, days_ago=0):
+        item = Item.objects.create(
+            title='Item', description='', price=Decimal(price), seller=self.seller,
+            buyer=self.buyer, status='sold', date_sold=timezone.now()
+        )
+        purchase = Purchase.for_item(item, buyer=self.buyer, purchase_price=item.price)
+        purchase.save()
+        Purchase.objects.filter(pk=purchase.pk).update(purchase_date=timezone.now() - timedelta(days=days_ago))
+        return purchase
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        return response, len(ctx.captured_queries)
+
+
+class SalesAnalyticsTests(AnalyticsTestMixin, TestCase):
+    url = '/api/dashboard/analytics/sales/'
+
+    def test_daily_series_is_zero_filled(self):
+        self.sell('20.00')
+        self.sell('30.00')
+        self.sell('600.00', days_ago=3)
+        rollups.rebuild()
+
+        response, _ = self.get(self.url, days=7)
+        self.assertEqual(response.status_code, 200)
+        series = response.data['daily_sales']
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series[-1], {
+            'date': timezone.localdate().strftime('%Y-%m-%d'), 'sales': 2, 'revenue': 50.0
+        })
+        self.assertEqual(series[-4]['revenue'], 600.0)
+        self.assertEqual(sum(day['sales'] for day in series), 3)
+
+        counts = {bucket['label']: bucket['count'] for bucket in response.data['price_distribution']}
+        self.assertEqual(counts, {'$0-$50': 2, '$50-$100': 0, '$100-$250': 0, '$250-$500': 0, '$500+': 1})
+
+    def test_query_count_does_not_depend_on_window(self):
+        self.sell('20.00')
+        rollups.rebuild()
+        _, short = self.get(self.url, days=7)
+        _, long = self.get(self.url, days=365)
+        self.assertEqual(short, long)
+
+    def test_invalid_window(self):
+        response, _ = self.get(self.url, days='month')
+        self.assertEqual(response.status_code, 400)
+
+
+class DailyTotalsTests(AnalyticsTestMixin, TestCase):
+    def test_registrations(self):
+        User.objects.filter(username='seller').update(date_joined=timezone.now() - timedelta(days=2))
+        rollups.rebuild()
+        totals = daily_totals(DailyUserStats.objects.all(), window_dates(5), registrations=Sum('registrations'))
+        self.assertEqual([row['registrations'] for row in totals.values()], [0, 0, 1, 0, 1])
+
+
+class RollupTests(AnalyticsTestMixin, TestCase):
+    def snapshot(self):
+        return (
+            sorted(DailyItemStats.objects.values_list(
+                'date', 'category', 'price_bucket', 'items_listed', 'items_sold', 'revenue'
+            )),
+            sorted(DailyUserStats.objects.values_list('date', 'registrations')),
+            sorted(UserActivityStats.objects.values_list(
+                'user_id', 'items_listed', 'items_sold', 'revenue', 'purchases', 'activity'
+            )),
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        rollups.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username='newcomer', password='pass12345')
+            shoes = Item.objects.create(
+                title='Boots', description='', price=Decimal('120.00'), category='shoes', seller=self.seller
+            )
+            bag = Item.objects.create(
+                title='Tote', description='', price=Decimal('45.00'), category='bags', seller=self.seller
+            )
+            CartItem.objects.create(user=self.buyer, item=shoes)
+            CartItem.objects.create(user=self.buyer, item=bag)
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout_cart(self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sell('600.00')
+
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_overview_reads_rollups(self):
+        self.sell('20.00')
+        self.sell('300.00')
+        Item.objects.create(title='Hat', description='', price=Decimal('5.00'), seller=self.buyer)
+        rollups.rebuild()
+
+        response, queries = self.get('/api/dashboard/analytics/overview/')
+        self.assertEqual(response.status_code, 200)
+        overview = response.data['overview']
+        self.assertEqual(overview['total_items'], 3)
+        self.assertEqual(overview['total_purchases'], 2)
+        self.assertEqual(overview['active_listings'], 1)
+        self.assertEqual(overview['total_revenue'], 320.0)
+        self.assertEqual(overview['total_users'], 2)
+        self.assertEqual(response.data['top_sellers'], [{'username': 'seller', 'items_sold': 2, 'revenue': 320.0}])
+
+        for _ in range(5):
+            self.sell('10.00')
+        rollups.rebuild()
+        self.assertEqual(self.get('/api/dashboard/analytics/overview/')[1], queries)
+
+    def test_user_analytics(self):
+        self.sell('20.00')
+        User.objects.create_user(username='lurker', password='pass12345')
+        rollups.rebuild()
+
+        response, _ = self.get('/api/dashboard/analytics/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_stats'], {
+            'total_users': 3, 'users_with_items': 1, 'users_with_purchases': 1, 'inactive_users': 1
+        })
+        self.assertEqual([user['username'] for user in response.data['active_users']], ['seller', 'buyer'])
+
+    def test_live_overview_matches_rollups(self):
+        other = User.objects.create_user(username='other', password='pass12345')
+        self.sell('20.00')
+        self.sell('300.00', days_ago=40)
+        Item.objects.create(title='Hat', description='', price=Decimal('5.00'), category='bags', seller=other)
+        # Equal revenue: the tie must be broken the same way on both sides
+        Item.objects.create(
+            title='Cap', description='', price=Decimal('320.00'), seller=other,
+            buyer=self.buyer, status='sold', date_sold=timezone.now()
+        )
+        Purchase.for_item(
+            Item.objects.get(title='Cap'), buyer=self.buyer, purchase_price=Decimal('320.00')
+        ).save()
+        rollups.rebuild()
+
+        since = window_dates(30)[0]
+        self.assertEqual(rollups.overview(since), rollups.live_overview(since))
+        self.assertEqual(rollups.rollup_active_users(), rollups.live_active_users())
+        call_command('rebuild_rollups', '--check', stdout=StringIO())
+
+    def test_archived_items_still_count(self):
+        self.sell('20.00')
+        self.sell('300.00', days_ago=40)
+        Item.objects.create(title='Hat', description='', price=Decimal('5.00'), category='bags', seller=self.seller)
+        rollups.rebuild()
+        since = window_dates(30)[0]
+        before = (rollups.live_overview(since), rollups.live_active_users())
+
+        call_command('archive_sold_items', older_than_days=0, stdout=StringIO())
+        self.assertEqual(list(Item.objects.values_list('title', flat=True)), ['Hat'])
+        self.assertEqual((rollups.live_overview(since), rollups.live_active_users()), before)
+        call_command('rebuild_rollups', '--check', stdout=StringIO())
+
+    def test_check_reports_drift(self):
+        self.sell('20.00')
+        rollups.rebuild()
+        self.sell('50.00')  # created outside on_commit, so the rollups miss it
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rollups', '--check', stdout=StringIO())
+        call_command('rebuild_rollups', stdout=StringIO())
+        call_command('rebuild_rollups', '--check', stdout=StringIO())
+
+    def test_if_empty_only_backfills_empty_rollups(self):
+        self.sell('20.00')
+        rollups.rebuild()
+        self.sell('50.00')  # missed by the rollups, as in test_check_reports_drift
+
+        call_command('rebuild_rollups', '--if-empty', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rollups', '--check', stdout=StringIO())
+        for model in (DailyItemStats, DailyUserStats, UserActivityStats):
+            model.objects.all().delete()
+        call_command('rebuild_rollups', '--if-empty', stdout=StringIO())
+        call_command('rebuild_rollups', '--check', stdout=StringIO())
+
+
+class SeedCatalogueTests(TestCase):
+    def test_seeds_requested_volumes(self):
+        call_command(
+            'seed_catalogue', items=250, users=20, purchases=40, batch_size=100, stdout=StringIO()
+        )
+        self.assertEqual(User.objects.filter(username__startswith='load_').count(), 20)
+        self.assertEqual(Item.objects.count(), 250)
+        self.assertEqual(Item.objects.filter(status='sold', buyer__isnull=False).count(), 40)
+        self.assertEqual(Purchase.objects.count(), 40)
+        # One shared hash, and it still checks out
+        self.assertEqual(User.objects.values('password').distinct().count(), 1)
+        self.assertTrue(User.objects.get(username='load_0').check_password('loadtest123'))
+        call_command('rebuild_rollups', '--check', stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_catalogue', items=10, users=2, purchases=0, stdout=StringIO())
+
+    def test_rejects_negative_items(self):
+        with self.assertRaisesMessage(CommandError, '--items must be at least 0'):
+            call_command('seed_catalogue', items=-1, users=2, purchases=0, stdout=StringIO())
+
+    def test_batches_are_deterministic(self):
+        plan = seeding.make_plan(items=300, users=10, purchases=30, seed=3, batch_size=100)
+        self.assertEqual(seeding.generate_batch(plan, 2), seeding.generate_batch(plan, 2))
+        self.assertNotEqual(
+            seeding.generate_batch(plan, 2), seeding.generate_batch({**plan, 'seed': 4}, 2)
+        )
+        sold = sum(len(seeding.generate_batch(plan, batch)[1]) for batch in range(seeding.batch_count(plan)))
+        self.assertEqual(sold, 30)
+
+
+class PerfSuiteTests(TestCase):
+    def test_every_route_is_covered(self):
+        self.assertEqual(perf.uncovered_routes(), [])
+
+    def test_tiny_scale_matches_baseline_query_counts(self):
+        results = perf.run_suite(['tiny'], runs=1)
+        self.assertEqual(
+            {label: row['status'] for label, row in results['results']['tiny'].items() if row['status'] >= 400}, {}
+        )
+        for row in results['results']['tiny'].values():
+            self.assertGreater(row['wall_ms'], 0)
+
+        with open(perf.__file__.replace('perf.py', 'perf_baseline.json')) as handle:
+            baseline = json.load(handle)
+        self.assertEqual(perf.compare(results, baseline), [])
+
+    def test_compare_flags_regressions(self):
+        row = {'status': 200, 'queries': 3, 'wall_ms': 10.0}
+        baseline = {'results': {'tiny': {'api_cart': row, 'api_my_items': row}}}
+        results = {'results': {'tiny': {
+            'api_cart': {**row, 'queries': 4, 'wall_ms': 40.0},
+            'api_my_items': {**row, 'queries': 2, 'wall_ms': 11.0},
+        }}}
+        self.assertEqual(perf.compare(results, baseline), ['tiny/api_cart: queries 3 -> 4'])
+        self.assertEqual(perf.compare(results, baseline, time_tolerance=0.5), [
+            'tiny/api_cart: queries 3 -> 4', 'tiny/api_cart: wall time 10.0 -> 40.0 ms'
+        ])
 
-# Create your tests here.
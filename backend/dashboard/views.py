@@ -9,10 +9,54 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.db import transaction
-from shop.models import Item, CartItem, Purchase
+from shop import response_cache, search
+from .models import DailyItemStats, DailyUserStats, UserActivityStats
+from .rollups import PRICE_RANGES
+from . import rollups
 
 User = get_user_model()
 
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 365
+
+def get_window_days(request):
+    """Read ``?days=`` for the analytics window, clamped to 1..MAX_WINDOW_DAYS."""
+    try:
+        days = int(request.query_params.get('days', DEFAULT_WINDOW_DAYS))
+    except (TypeError, ValueError):
+        raise ValueError('days must be an integer')
+    return max(1, min(days, MAX_WINDOW_DAYS))
+
+
+def window_dates(days):
+    """The last ``days`` calendar dates, oldest first, ending today."""
+    today = timezone.localdate()
+    return [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+
+def daily_totals(queryset, dates, **aggregates):
+    """
+    Sum a daily rollup ``queryset`` per date in one query and return
+    ``{date: {name: value}}`` for every date in ``dates``, with days that have
+    no rows filled with 0.
+    """
+    rows = queryset.filter(date__gte=dates[0]).values('date').annotate(**aggregates).order_by()
+    by_day = {row['date']: row for row in rows}
+    return {
+        date: {name: by_day.get(date, {}).get(name) or 0 for name in aggregates}
+        for date in dates
+    }
+
+
+def price_distribution():
+    """Count listed items in every price bucket from the daily rollup."""
+    rows = DailyItemStats.objects.values('price_bucket').annotate(count=Sum('items_listed')).order_by()
+    counts = {row['price_bucket']: row['count'] for row in rows}
+    return [
+        {'label': range_data['label'], 'count': counts.get(index, 0)}
+        for index, range_data in enumerate(PRICE_RANGES)
+    ]
+
 
 def landing_page(request):
     """Landing page that serves HTML"""
@@ -28,7 +72,7 @@ def populate_database(request):
         from decimal import Decimal
         
         # Check if we have required imports
-        from shop.models import Item, CartItem, Purchase
+        from shop.models import ArchivedItem, Item, CartItem, Purchase
         from django.contrib.auth import get_user_model
         User = get_user_model()
         
@@ -40,8 +84,9 @@ def populate_database(request):
             test_users.delete()
             
             # Clear all items and their related data
-            item_count = Item.objects.count()
+            item_count = Item.objects.count() + ArchivedItem.objects.count()
             Item.objects.all().delete()
+            ArchivedItem.objects.all().delete()
             
             # Clear all cart items
             cart_count = CartItem.objects.count()
@@ -185,6 +230,11 @@ def populate_database(request):
                 if category_items:
                     Item.objects.bulk_create(category_items, batch_size=BATCH_SIZE)
         
+        # bulk_create skips signals, so refresh the search index, rollups and cache in bulk
+        search.rebuild_index()
+        rollups.rebuild()
+        response_cache.invalidate_catalogue()
+        
         # Create response message
         success_message = f'🎉 Database populated successfully! Created 6 users and {items_created} items'
             
@@ -267,6 +317,10 @@ def populate_sample_data(request):
             
             Item.objects.bulk_create(items_to_create)
         
+        search.rebuild_index()
+        rollups.rebuild()
+        response_cache.invalidate_catalogue()
+        
         return Response({
             'message': 'Sample data created successfully!',
             'users_created': 3,
@@ -285,56 +339,13 @@ def populate_sample_data(request):
 def analytics_overview(request):
     """Get overall analytics data for the dashboard"""
     try:
-        # Total counts
-        total_items = Item.objects.count()
-        total_users = User.objects.count()
-        total_purchases = Purchase.objects.count()
-        active_listings = Item.objects.filter(buyer__isnull=True).count()
-        
-        # Revenue data
-        total_revenue = Purchase.objects.aggregate(
-            total=Sum('price')
-        )['total'] or 0
-        
-        # Recent activity (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_users = User.objects.filter(date_joined__gte=thirty_days_ago).count()
-        recent_purchases = Purchase.objects.filter(purchase_date__gte=thirty_days_ago).count()
-        recent_listings = Item.objects.filter(date_added__gte=thirty_days_ago).count()
-        
-        # Category breakdown
-        category_stats = Item.objects.values('category').annotate(
-            count=Count('id'),
-            sold=Count('id', filter=Q(buyer__isnull=False))
-        ).order_by('-count')
-        
-        # Top sellers
-        top_sellers = User.objects.annotate(
-            items_sold=Count('item_seller', filter=Q(item_seller__buyer__isnull=False)),
-            revenue=Sum('item_seller__purchase__price')
-        ).filter(items_sold__gt=0).order_by('-revenue')[:5]
-        
-        return Response({
-            'overview': {
-                'total_items': total_items,
-                'total_users': total_users,
-                'total_purchases': total_purchases,
-                'active_listings': active_listings,
-                'total_revenue': float(total_revenue),
-                'recent_users': recent_users,
-                'recent_purchases': recent_purchases,
-                'recent_listings': recent_listings
-            },
-            'categories': list(category_stats),
-            'top_sellers': [
-                {
-                    'username': seller.username,
-                    'items_sold': seller.items_sold,
-                    'revenue': float(seller.revenue or 0)
-                }
-                for seller in top_sellers
-            ]
-        })
+        days = get_window_days(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # Reads the rollup tables only, never Item/Purchase/User
+        return Response(rollups.overview(window_dates(days)[0]))
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -344,52 +355,30 @@ def analytics_overview(request):
 def sales_analytics(request):
     """Get sales analytics for charts and graphs"""
     try:
-        # Sales over time (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        daily_sales = []
-        
-        for i in range(30):
-            date = thirty_days_ago + timedelta(days=i)
-            sales_count = Purchase.objects.filter(
-                purchase_date__date=date.date()
-            ).count()
-            revenue = Purchase.objects.filter(
-                purchase_date__date=date.date()
-            ).aggregate(total=Sum('price'))['total'] or 0
-            
-            daily_sales.append({
+        days = get_window_days(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # Sales over time from the daily rollup
+        totals = daily_totals(
+            DailyItemStats.objects.all(),
+            window_dates(days),
+            sales=Sum('items_sold'),
+            revenue=Sum('revenue')
+        )
+        daily_sales = [
+            {
                 'date': date.strftime('%Y-%m-%d'),
-                'sales': sales_count,
-                'revenue': float(revenue)
-            })
-        
-        # Price range distribution
-        price_ranges = [
-            {'label': '$0-$50', 'min': 0, 'max': 50},
-            {'label': '$50-$100', 'min': 50, 'max': 100},
-            {'label': '$100-$250', 'min': 100, 'max': 250},
-            {'label': '$250-$500', 'min': 250, 'max': 500},
-            {'label': '$500+', 'min': 500, 'max': None}
+                'sales': row['sales'],
+                'revenue': float(row['revenue'])
+            }
+            for date, row in totals.items()
         ]
         
-        price_distribution = []
-        for range_data in price_ranges:
-            if range_data['max']:
-                count = Item.objects.filter(
-                    price__gte=range_data['min'],
-                    price__lt=range_data['max']
-                ).count()
-            else:
-                count = Item.objects.filter(price__gte=range_data['min']).count()
-            
-            price_distribution.append({
-                'label': range_data['label'],
-                'count': count
-            })
-        
         return Response({
             'daily_sales': daily_sales,
-            'price_distribution': price_distribution
+            'price_distribution': price_distribution()
         })
     except Exception as e:
         return Response({'error': str(e)}, status=500)
@@ -400,43 +389,46 @@ def sales_analytics(request):
 def user_analytics(request):
     """Get user analytics and activity data"""
     try:
-        # User registration over time (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        daily_registrations = []
-        
-        for i in range(30):
-            date = thirty_days_ago + timedelta(days=i)
-            count = User.objects.filter(date_joined__date=date.date()).count()
-            daily_registrations.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'registrations': count
-            })
+        days = get_window_days(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # User registration over time from the daily rollup
+        totals = daily_totals(DailyUserStats.objects.all(), window_dates(days), registrations=Sum('registrations'))
+        daily_registrations = [
+            {'date': date.strftime('%Y-%m-%d'), 'registrations': row['registrations']}
+            for date, row in totals.items()
+        ]
         
         # User activity breakdown
-        total_users = User.objects.count()
-        users_with_items = User.objects.filter(item_seller__isnull=False).distinct().count()
-        users_with_purchases = User.objects.filter(purchase_buyer__isnull=False).distinct().count()
+        total_users = DailyUserStats.objects.aggregate(total=Sum('registrations'))['total'] or 0
+        activity = UserActivityStats.objects.aggregate(
+            with_items=Count('pk', filter=Q(items_listed__gt=0)),
+            with_purchases=Count('pk', filter=Q(purchases__gt=0)),
+            active=Count('pk', filter=Q(activity__gt=0))
+        )
         
         # Most active users
-        active_users = User.objects.annotate(
-            total_activity=Count('item_seller') + Count('purchase_buyer')
-        ).filter(total_activity__gt=0).order_by('-total_activity')[:10]
+        active_users = UserActivityStats.objects.filter(
+            activity__gt=0
+        ).select_related('user').order_by('-activity', 'user_id')[:10]
         
         return Response({
             'daily_registrations': daily_registrations,
             'user_stats': {
                 'total_users': total_users,
-                'users_with_items': users_with_items,
-                'users_with_purchases': users_with_purchases,
-                'inactive_users': total_users - users_with_items - users_with_purchases
+                'users_with_items': activity['with_items'],
+                'users_with_purchases': activity['with_purchases'],
+                'inactive_users': total_users - activity['active']
             },
             'active_users': [
                 {
-                    'username': user.username,
-                    'activity_score': user.total_activity,
-                    'date_joined': user.date_joined.strftime('%Y-%m-%d')
+                    'username': stats.user.username,
+                    'activity_score': stats.activity,
+                    'date_joined': stats.user.date_joined.strftime('%Y-%m-%d')
                 }
-                for user in active_users
+                for stats in active_users
             ]
         })
     except Exception as e:
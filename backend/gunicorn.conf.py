@@ -0,0 +1,29 @@
+# Gunicorn configuration, used by start.sh and render.yaml
+import os
+import shutil
+
+import decouple  # not "from decouple import config": gunicorn would read it as its own config setting
+
+# SERVER_MODE=asgi serves backend.asgi through uvicorn workers (one event loop per
+# worker, which also switches the shop to its async views); wsgi uses sync workers
+if decouple.config('SERVER_MODE', default='wsgi') == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+
+# Each worker writes its Prometheus metrics here, and /metrics adds them up
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/ostaeasy-metrics')
+
+
+def on_starting(server):
+    # Files from a previous run would otherwise be counted again
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's in-flight gauge; its counters and histograms are kept
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
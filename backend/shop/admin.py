@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Item, CartItem, Purchase
+from .models import ArchivedItem, Item, CartItem, Purchase
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
@@ -8,6 +8,13 @@ class ItemAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description']
     readonly_fields = ['date_added', 'date_sold']
 
+@admin.register(ArchivedItem)
+class ArchivedItemAdmin(admin.ModelAdmin):
+    list_display = ['title', 'price', 'seller', 'buyer', 'date_sold', 'archived_at']
+    list_filter = ['date_sold', 'archived_at']
+    search_fields = ['title', 'description']
+    readonly_fields = ['archived_at']
+
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ['user', 'item', 'date_added']
@@ -15,6 +22,6 @@ class CartItemAdmin(admin.ModelAdmin):
 
 @admin.register(Purchase)
 class PurchaseAdmin(admin.ModelAdmin):
-    list_display = ['buyer', 'item', 'purchase_price', 'purchase_date']
+    list_display = ['buyer', 'item_title', 'seller_username', 'purchase_price', 'purchase_date']
     list_filter = ['purchase_date']
     readonly_fields = ['purchase_date']
@@ -0,0 +1,139 @@
+"""
+Hot/cold split: sold items move out of ``Item`` into ``ArchivedItem``.
+
+Every listing query filters ``Item`` on ``status='on_sale'``, so sold rows
+only add to the table and its indexes. ``archive_batch()`` moves the oldest
+items sold before a cutoff (``ARCHIVE_SOLD_AFTER_DAYS`` by default), keeping
+their ids, in one short transaction per batch; ``manage.py
+archive_sold_items`` runs batches until none are left and can be stopped and
+rerun at any point. Rows locked by other transactions are skipped
+(PostgreSQL) and picked up by a later batch.
+
+Items are deleted with a single statement rather than ``QuerySet.delete()``,
+which would send ``post_delete`` for every row, so what the ``Item`` signals
+do is done here in bulk: the search index entries and cached responses of the
+batch are dropped, and carts still holding an archived item lose that line.
+Purchases keep their snapshot and point at the archived row instead.
+
+``sold_items()`` reads a seller's sold items across both tables.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import response_cache, search
+from .cart import invalidate_cart
+from .models import ArchivedItem, CartItem, Item, Purchase
+
+ARCHIVED_FIELDS = (
+    'id', 'title', 'description', 'price', 'category', 'image_url',
+    'seller_id', 'buyer_id', 'status', 'date_added', 'date_sold',
+)
+
+
+def archive_cutoff(days=None):
+    """Items sold before this are archived."""
+    if days is None:
+        days = settings.ARCHIVE_SOLD_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    return Item.objects.filter(status='sold', date_sold__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=500):
+    """Move up to ``batch_size`` of the oldest items sold before ``cutoff``; returns how many moved."""
+    with transaction.atomic():
+        rows = list(
+            archivable(cutoff)
+            .select_for_update(skip_locked=True)
+            .order_by('date_sold', 'id')
+            .values_list(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        item_ids = [row[0] for row in rows]
+
+        ArchivedItem.objects.bulk_create([ArchivedItem(**dict(zip(ARCHIVED_FIELDS, row))) for row in rows])
+        Purchase.objects.filter(item_id__in=item_ids).update(archived_item=F('item'), item=None)
+        cart_lines = CartItem.objects.filter(item_id__in=item_ids)
+        cart_users = set(cart_lines.values_list('user_id', flat=True))
+        if cart_users:
+            cart_lines.delete()
+        placeholders = ', '.join(['%s'] * len(item_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(Item._meta.db_table)} WHERE id IN ({placeholders})',
+                item_ids,
+            )
+
+        search.unindex_items(item_ids)
+        response_cache.invalidate_items(item_ids)
+        for user_id in cart_users:
+            invalidate_cart(user_id)
+    return len(rows)
+
+
+class ChainedQuerySets:
+    """
+    Read-only concatenation of querysets, sliceable and countable like one.
+
+    ``Paginator`` and the my-items combined response take it in place of a
+    queryset. Each queryset is counted at most once, and only when a slice
+    starts past its beginning.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = {}
+
+    def _count(self, index):
+        if index not in self._counts:
+            self._counts[index] = self.querysets[index].count()
+        return self._counts[index]
+
+    def count(self):
+        return sum(self._count(index) for index in range(len(self.querysets)))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('ChainedQuerySets only supports slices without a step')
+        start = key.start or 0
+        remaining = None if key.stop is None else max(key.stop - start, 0)
+        rows = []
+        for index, queryset in enumerate(self.querysets):
+            if remaining == 0:
+                break
+            if start:
+                count = self._count(index)
+                if start >= count:
+                    start -= count
+                    continue
+            part = list(queryset[start:] if remaining is None else queryset[start:start + remaining])
+            rows.extend(part)
+            if remaining is not None:
+                remaining -= len(part)
+            start = 0
+        return rows
+
+
+def sold_items(user, eager_loading=None):
+    """
+    ``user``'s sold items, the ones still in ``Item`` first, newest listing first in each table.
+
+    ``eager_loading`` (e.g. ``ItemSerializer.setup_eager_loading``) is applied to both querysets.
+    """
+    querysets = [
+        Item.objects.filter(seller=user, status='sold').order_by('-date_added'),
+        ArchivedItem.objects.filter(seller=user).order_by('-date_added'),
+    ]
+    if eager_loading is not None:
+        querysets = [eager_loading(queryset) for queryset in querysets]
+    return ChainedQuerySets(*querysets)
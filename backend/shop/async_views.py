@@ -0,0 +1,204 @@
+"""
+Async versions of the catalogue reads and the payment views.
+
+``shop/urls.py`` routes to these when ``ASYNC_VIEWS`` is on, which is the
+default when serving through ASGI (``SERVER_MODE=asgi``). DRF views are
+sync only, so these are plain Django async views that borrow the DRF
+view's queryset, filtering and pagination and produce the same JSON:
+
+* ``item_list`` / ``item_detail`` read through the response cache (when it
+  is enabled) and the async ORM and share cache entries with the sync views. Anything but a
+  JSON GET (writes, the browsable API) is handed to the sync DRF view.
+* ``create_payment_intent`` / ``pay_cart`` await the payment gateway's
+  async client, so a request waiting on Stripe doesn't hold a thread.
+
+Django's async ORM still runs each query in a thread; what the event loop
+saves is a thread per request held for the whole request.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from backend import metrics
+from users.authentication import CachedJWTAuthentication
+from . import response_cache
+from .cart import alive_cart_summary
+from .checkout import CheckoutConflict, EmptyCart, checkout_cart
+from .models import Item
+from .payments import get_gateway
+from .renderers import FastJSONRenderer
+from .serializers import ItemSerializer
+from .views import ItemDetailAPIView, ItemListCreateAPIView
+
+sync_item_list = ItemListCreateAPIView.as_view()
+sync_item_detail = ItemDetailAPIView.as_view()
+
+
+def json_response(data, status=200):
+    # Rendered here with the sync views' renderer, so the bytes (and the ETag) match theirs
+    # without the thread hop Django makes to render a DRF Response under ASGI
+    response = HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+    response.data = data  # as on DRF's Response
+    return response
+
+
+def error_response(exc):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if exc.status_code == 401:
+        response['WWW-Authenticate'] = 'Bearer realm="api"'
+    return response
+
+
+def wants_json(request):
+    # The browsable API (text/html, ?format=api) stays with the sync DRF view
+    return 'format' not in request.GET and 'text/html' not in request.headers.get('Accept', '')
+
+
+def drf_view(view_class, request, **kwargs):
+    """An instance of ``view_class`` set up for ``request``, to reuse its queryset and paginator."""
+    view = view_class()
+    view.args, view.kwargs, view.format_kwarg = (), kwargs, None
+    view.request = view.initialize_request(request, **kwargs)
+    return view
+
+
+async def authenticate(request):
+    """JWT authentication as DRF does it; returns ``(user, None)`` or ``(None, error response)``."""
+    # Like DRF's Request, honour APIClient.force_authenticate()
+    forced = getattr(request, '_force_auth_user', None)
+    if forced is not None:
+        return forced, None
+    try:
+        result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as exc:
+        return None, error_response(exc)
+    if result is None:
+        return None, error_response(NotAuthenticated())
+    return result[0], None
+
+
+async def cached_get(view_class, sync_view, request, build, **kwargs):
+    """Serve a JSON GET from the response cache, calling ``build(view)`` for the data on a miss."""
+    if request.method != 'GET' or not wants_json(request):
+        return await sync_to_async(sync_view)(request, **kwargs)
+
+    view = drf_view(view_class, request, **kwargs)
+    if not response_cache.enabled():
+        try:
+            return json_response(await build(view))
+        except APIException as exc:
+            return error_response(exc)
+
+    generations = await response_cache.aget_generations(response_cache.generation_keys(view))
+    key = response_cache.response_key(view_class.__name__, request, view.cache_query_params, generations)
+    entry = await cache.aget(key)
+    metrics.cache_lookup('catalogue', entry is not None)
+    if entry is None:
+        try:
+            data = await build(view)
+        except APIException as exc:
+            return error_response(exc)
+        entry = response_cache.make_entry(data, FastJSONRenderer().render(data))
+        await cache.aset(key, entry, settings.CATALOGUE_CACHE_TTL)
+    return response_cache.finish_response(request, json_response(entry['data']), entry)
+
+
+async def build_item_list(view):
+    queryset = view.filter_queryset(view.get_queryset())
+    paginator = view.paginator
+    rows = await paginator.apaginate_queryset(queryset, view.request, view=view)
+    return paginator.get_paginated_response(ItemSerializer(rows, many=True).data).data
+
+
+async def build_item_detail(view):
+    try:
+        item = await view.get_queryset().aget(pk=view.kwargs['pk'])
+    except Item.DoesNotExist:
+        raise NotFound('No Item matches the given query.')
+    return ItemSerializer(item).data
+
+
+@csrf_exempt
+async def item_list(request):
+    return await cached_get(ItemListCreateAPIView, sync_item_list, request, build_item_list)
+
+
+@csrf_exempt
+async def item_detail(request, pk):
+    return await cached_get(ItemDetailAPIView, sync_item_detail, request, build_item_detail, pk=pk)
+
+
+@csrf_exempt
+@require_POST
+async def create_payment_intent(request):
+    """Create a Stripe payment intent for cart items"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    try:
+        # Not the cached summary: the amount charged must match what checkout will buy
+        summary = await alive_cart_summary(user)
+        if not summary['item_count']:
+            return json_response({'error': 'Cart is empty'}, status=400)
+        if summary['unavailable_items']:
+            return json_response({
+                'error': 'Some items in your cart have already been sold',
+                'unavailable_items': summary['unavailable_items']
+            }, status=409)
+
+        total_amount = summary['total']
+        intent = await get_gateway().acreate_intent(user, summary['lines'], total_amount)
+
+        return json_response({
+            'client_secret': intent.client_secret,
+            'amount': total_amount
+        })
+    except Exception as e:
+        return json_response({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def pay_cart(request):
+    """Process payment and complete purchase"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    try:
+        payment_intent_id = json.loads(request.body).get('payment_intent_id')
+        if not payment_intent_id:
+            return json_response({'error': 'Payment intent ID required'}, status=400)
+
+        if not await get_gateway().ais_succeeded(payment_intent_id):
+            metrics.CHECKOUT_FAILURE.labels('payment_incomplete').inc()
+            return json_response({'error': 'Payment not completed'}, status=400)
+
+        try:
+            # One transaction with row locks: that part stays sync
+            purchases = await sync_to_async(checkout_cart)(user, payment_intent_id)
+        except EmptyCart:
+            metrics.CHECKOUT_FAILURE.labels('empty_cart').inc()
+            return json_response({'error': 'Cart is empty'}, status=400)
+        except CheckoutConflict as e:
+            metrics.CHECKOUT_FAILURE.labels('conflict').inc()
+            return json_response({
+                'error': 'Some items in your cart have already been sold',
+                'unavailable_items': e.item_ids
+            }, status=409)
+
+        metrics.CHECKOUT_SUCCESS.inc()
+        return json_response({
+            'message': 'Payment successful',
+            'purchased_items': [purchase.item_id for purchase in purchases]
+        })
+    except Exception as e:
+        metrics.CHECKOUT_FAILURE.labels('error').inc()
+        return json_response({'error': str(e)}, status=500)
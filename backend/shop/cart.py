@@ -0,0 +1,126 @@
+"""
+Cart summary: what the user's cart costs now and what changed since the
+items were added.
+
+``cart_summary()`` reads the cart joined to its items in one query and
+returns the total and count of the items still on sale, the ids of items
+that sold in the meantime, and items whose price differs from
+``CartItem.added_price``.
+
+Summaries are cached per user and stored with the generation counters they
+were built from (see ``response_cache``): the user's cart generation, bumped
+by ``invalidate_cart()`` on every cart write, and the per-item generations
+of the items in the cart, which any item write or checkout bumps. A cached
+summary is used only while all of those counters are unchanged, so a hit
+costs two cache reads and no query. The item counters can only be read
+after the query has said which items are in the cart; an item write landing
+in between goes unnoticed for at most ``CART_SUMMARY_CACHE_TTL`` seconds.
+
+That is fine for showing the cart but not for charging it: checkout buys
+every line at its current price. ``live_cart_summary()`` skips the cache
+and is what the payment views use, both to refuse a cart holding sold
+items and for the amount.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import response_cache
+from .models import CartItem, Item
+
+CART_GENERATION = 'cart:generation'
+SUMMARY_PREFIX = 'cart:summary'
+
+LINE_FIELDS = ('item_id', 'item__price', 'item__status', 'added_price')
+
+
+def cart_generation_key(user_id):
+    return f'{CART_GENERATION}:{user_id}'
+
+
+def summary_key(user_id):
+    return f'{SUMMARY_PREFIX}:{user_id}'
+
+
+def invalidate_cart(user_id):
+    """Call after any write to ``user_id``'s cart; ``CartItem`` has no signal handlers, to keep deletes fast."""
+    response_cache.invalidate([cart_generation_key(user_id)])
+
+
+def cart_keys(user_id):
+    return [response_cache.CATALOGUE_EPOCH, cart_generation_key(user_id)]
+
+
+def item_keys(item_ids):
+    return [response_cache.item_generation_key(item_id) for item_id in item_ids]
+
+
+def summarize(lines):
+    """Summary of ``(item_id, price, status, added_price)`` cart lines."""
+    available = [(item_id, price) for item_id, price, status, _ in lines if status == 'on_sale']
+    return {
+        'item_count': len(lines),
+        'available_count': len(available),
+        'total': sum((price for _, price in available), Decimal('0.00')),
+        'lines': available,
+        'unavailable_items': sorted(item_id for item_id, _, status, _ in lines if status != 'on_sale'),
+        'price_changes': [
+            {'item_id': item_id, 'added_price': added_price, 'price': price}
+            for item_id, price, _, added_price in sorted(lines)
+            if added_price is not None and added_price != price
+        ],
+    }
+
+
+def live_cart_summary(user):
+    """The user's cart summary straight from the database, in one query."""
+    return summarize(list(CartItem.objects.filter(user=user).values_list(*LINE_FIELDS)))
+
+
+async def alive_cart_summary(user):
+    return summarize([line async for line in CartItem.objects.filter(user=user).values_list(*LINE_FIELDS)])
+
+
+def cart_summary(user):
+    """The user's cart summary, from the cache while nothing in it changed."""
+    key = summary_key(user.pk)
+    entry = cache.get(key)
+    if entry is not None:
+        current = response_cache.get_generations(cart_keys(user.pk) + item_keys(entry['item_ids']))
+        if current == entry['generations']:
+            return entry['summary']
+
+    generations = response_cache.get_generations(cart_keys(user.pk))
+    lines = list(CartItem.objects.filter(user=user).values_list(*LINE_FIELDS))
+    item_ids = [line[0] for line in lines]
+    summary = summarize(lines)
+    generations += response_cache.get_generations(item_keys(item_ids))
+    cache.set(
+        key, {'summary': summary, 'item_ids': item_ids, 'generations': generations}, settings.CART_SUMMARY_CACHE_TTL
+    )
+    return summary
+
+
+def update_cart(user, add=(), remove=()):
+    """
+    Add and remove many items in a fixed number of queries.
+
+    Items that are not on sale are skipped and their ids returned. Adding an
+    item that is already in the cart is a no-op: rows are inserted with
+    ``ignore_conflicts`` against the ``(user, item)`` unique constraint, so
+    concurrent adds can't fail on it either.
+    """
+    with transaction.atomic():
+        prices = dict(Item.objects.filter(id__in=add, status='on_sale').values_list('id', 'price')) if add else {}
+        if prices:
+            CartItem.objects.bulk_create(
+                [CartItem(user=user, item_id=item_id, added_price=price) for item_id, price in prices.items()],
+                ignore_conflicts=True,
+            )
+        if remove:
+            CartItem.objects.filter(user=user, item_id__in=remove).delete()
+        if prices or remove:
+            invalidate_cart(user.pk)
+    return sorted(set(add) - set(prices))
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .cart import invalidate_cart
+from .models import Item, CartItem, Purchase
+from .signals import purchases_created
+
+
+class CheckoutConflict(Exception):
+    """Raised when some cart items were sold to someone else before checkout."""
+
+    def __init__(self, item_ids):
+        self.item_ids = sorted(item_ids)
+        super().__init__(f'Items no longer available: {self.item_ids}')
+
+
+class EmptyCart(Exception):
+    pass
+
+
+def checkout_cart(user, payment_intent_id=None):
+    """
+    Turn ``user``'s cart into purchases as a single transaction.
+
+    The cart's items are locked with ``SELECT ... FOR UPDATE`` (a no-op on
+    SQLite, where the write lock serialises checkouts instead) and claimed
+    with one ``UPDATE`` guarded on ``status='on_sale'``. If any item was
+    already sold, nothing is written and ``CheckoutConflict`` lists the
+    offending ids. Runs a fixed number of queries regardless of cart size.
+    Each purchase stores a snapshot of its item (see ``Purchase.for_item``),
+    read by the same locking query.
+    """
+    with transaction.atomic():
+        cart_items = CartItem.objects.filter(user=user)
+        item_ids = list(cart_items.values_list('item_id', flat=True))
+        if not item_ids:
+            raise EmptyCart()
+
+        items = list(
+            Item.objects.select_for_update(of=('self',))
+            .filter(id__in=item_ids)
+            .select_related('seller')
+            .order_by('id')
+            .only(
+                'id', 'title', 'description', 'price', 'status', 'category', 'image_url', 'date_added',
+                'seller__username', 'seller__email',
+            )
+        )
+        unavailable = {item.id for item in items if item.status != 'on_sale'}
+        if unavailable:
+            raise CheckoutConflict(unavailable)
+
+        now = timezone.now()
+        claimed = Item.objects.filter(id__in=item_ids, status='on_sale').update(
+            status='sold', buyer=user, date_sold=now
+        )
+        if claimed != len(items):
+            # Another checkout got in between the read and the update
+            won = Item.objects.filter(id__in=item_ids, buyer=user, date_sold=now).values_list('id', flat=True)
+            raise CheckoutConflict(set(item_ids) - set(won))
+
+        purchases = Purchase.objects.bulk_create([
+            Purchase.for_item(
+                item,
+                buyer=user,
+                purchase_price=item.price,
+                payment_intent_id=payment_intent_id,
+            )
+            for item in items
+        ])
+        cart_items.delete()
+        invalidate_cart(user.pk)
+        purchases_created.send(sender=Purchase, purchases=purchases)
+
+    return purchases
@@ -0,0 +1,59 @@
+# Django Management Command moving old sold items from Item to ArchivedItem in short batches
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from shop.archive import archivable, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive items sold more than ARCHIVE_SOLD_AFTER_DAYS ago, one short transaction per batch. '
+        'Safe to stop at any point and run again; it carries on with what is left.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=None,
+            help=f'Archive items sold more than this many days ago (default: {settings.ARCHIVE_SOLD_AFTER_DAYS})'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Items moved per transaction (default: 500)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between batches, to leave room for other writers (default: 0)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the items that would be archived')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['older_than_days'] is not None and options['older_than_days'] < 0:
+            raise CommandError('--older-than-days cannot be negative')
+        cutoff = archive_cutoff(options['older_than_days'])
+
+        self.stdout.write(f'📦 Archiving items sold before {cutoff:%Y-%m-%d %H:%M}')
+        if options['dry_run']:
+            self.stdout.write(f'{archivable(cutoff).count()} items would be archived')
+            return
+
+        archived = batches = 0
+        start = time.perf_counter()
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+            self.stdout.write(f'  {archived} items archived...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Archived {archived} items in {batches} batches ({elapsed:.1f}s)'
+        ))
@@ -0,0 +1,61 @@
+# Django Management Command measuring checkout throughput for different cart sizes
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from shop.checkout import checkout_cart
+from shop.models import Item, CartItem
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark checkout_cart throughput and query counts for carts of 1 to 50 items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 5, 10, 25, 50],
+            help='Cart sizes to test (default: 1 5 10 25 50)'
+        )
+        parser.add_argument('--runs', type=int, default=50, help='Checkouts per cart size (default: 50)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'🛒 Checkout benchmark ({connection.vendor})')
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'{"cart size":<12}{"queries":>10}{"p50 ms":>12}{"checkouts/s":>14}{"items/s":>12}')
+
+        # Test data lives in a transaction that is rolled back at the end
+        with transaction.atomic():
+            seller, _ = User.objects.get_or_create(username='checkout_benchmark_seller')
+            buyer, _ = User.objects.get_or_create(username='checkout_benchmark_buyer')
+
+            for size in options['sizes']:
+                timings = []
+                queries = 0
+                for _ in range(options['runs']):
+                    items = Item.objects.bulk_create([
+                        Item(title=f'Benchmark item {i}', description='', price=Decimal('10.00'), seller=seller)
+                        for i in range(size)
+                    ])
+                    CartItem.objects.bulk_create([CartItem(user=buyer, item=item) for item in items])
+
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        checkout_cart(buyer, 'pi_benchmark')
+                        timings.append(time.perf_counter() - start)
+                    queries = len(ctx.captured_queries)
+
+                per_checkout = statistics.median(timings)
+                self.stdout.write(
+                    f'{size:<12}{queries:>10}{per_checkout * 1000:>12.2f}'
+                    f'{1 / per_checkout:>14.1f}{size / per_checkout:>12.1f}'
+                )
+
+            transaction.set_rollback(True)
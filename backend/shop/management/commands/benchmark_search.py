@@ -0,0 +1,99 @@
+# Django Management Command comparing full-text search with the old icontains filter
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from shop import search
+from shop.models import Item
+
+User = get_user_model()
+
+WORDS = [
+    'vintage', 'leather', 'wool', 'denim', 'silk', 'cotton', 'linen', 'suede', 'canvas', 'cashmere',
+    'jacket', 'jeans', 'sneakers', 'boots', 'sandals', 'backpack', 'tote', 'wallet', 'scarf', 'watch',
+    'bracelet', 'necklace', 'sunglasses', 'aviator', 'hoodie', 'sweater', 'blazer', 'dress', 'coat', 'belt',
+    'black', 'brown', 'blue', 'red', 'green', 'white', 'grey', 'navy', 'beige', 'olive',
+    'excellent', 'condition', 'barely', 'used', 'brand', 'new', 'tags', 'classic', 'limited', 'edition',
+]
+
+QUERIES = ['leather', 'vintage jacket', 'red sneakers', 'sunglasses', 'wool coat navy', 'xylophone']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ranked full-text search against the icontains title/description filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100000, help='Catalogue size to test at (default: 100000)')
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per query (default: 20)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated items')
+
+    def handle(self, *args, **options):
+        # Everything happens in a transaction that is rolled back, so the catalogue is left untouched
+        with transaction.atomic():
+            missing = options['items'] - Item.objects.count()
+            if missing > 0:
+                self.stdout.write(f'Generating {missing} temporary items...')
+                self.generate_items(missing, options['seed'])
+                search.rebuild_index()
+
+            self.stdout.write(f'🔍 Search benchmark ({connection.vendor}, {Item.objects.count()} items)')
+            self.stdout.write('=' * 68)
+            self.stdout.write(f'{"query":<20}{"icontains p50/p95 ms":>24}{"full-text p50/p95 ms":>24}')
+
+            for query in QUERIES:
+                legacy = self.time_query(lambda: self.legacy_page(query), options['runs'])
+                ranked = self.time_query(lambda: self.ranked_page(query), options['runs'])
+                self.stdout.write(f'{query:<20}{self.format(legacy):>24}{self.format(ranked):>24}')
+
+            transaction.set_rollback(True)
+
+    def generate_items(self, count, seed):
+        rng = random.Random(seed)
+        seller, _ = User.objects.get_or_create(username='search_benchmark_seller')
+        categories = [key for key, _ in Item.CATEGORY_CHOICES]
+        batch = []
+        for i in range(count):
+            batch.append(Item(
+                title=' '.join(rng.choices(WORDS, k=3)).title(),
+                description=' '.join(rng.choices(WORDS, k=20)),
+                price=Decimal(rng.randint(500, 50000)) / 100,
+                category=rng.choice(categories),
+                seller=seller,
+            ))
+            if len(batch) == 5000:
+                Item.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Item.objects.bulk_create(batch)
+
+    def legacy_page(self, query):
+        # Equivalent of the previous SearchFilter: every term must match title or description
+        queryset = Item.objects.filter(status='on_sale')
+        for term in query.split():
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        queryset = queryset.order_by('-date_added')
+        return queryset.count(), list(queryset[:12])
+
+    def ranked_page(self, query):
+        queryset = search.search_items(Item.objects.filter(status='on_sale'), query)
+        if search.has_rank(queryset):
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset.count(), list(queryset[:12])
+
+    def time_query(self, run, runs):
+        run()  # warm up caches
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)]
+
+    def format(self, timing):
+        return f'{timing[0]:.1f} / {timing[1]:.1f}'
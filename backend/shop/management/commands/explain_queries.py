@@ -0,0 +1,86 @@
+# Django Management Command for checking query plans of the hot access paths
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from shop.archive import archivable, archive_cutoff
+from shop.models import ArchivedItem, Item, Purchase, CartItem
+
+User = get_user_model()
+
+# Plan fragments that show the database is reading through an index
+INDEX_MARKERS = {
+    'sqlite': ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY'),
+    'postgresql': ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN against the key shop queries and report whether they use index scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Execute the queries and include actual timings (PostgreSQL only)'
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan for every query, not just the summary'
+        )
+
+    def get_queries(self):
+        user_id = User.objects.order_by('id').values_list('id', flat=True).first() or 1
+        since = timezone.now() - timedelta(days=30)
+        on_sale = Item.objects.filter(status='on_sale')
+        return [
+            ('item list (latest)', on_sale.order_by('-date_added', '-id')[:13]),
+            ('item list (category)', on_sale.filter(category='shoes').order_by('-date_added')[:13]),
+            ('item list (by price)', on_sale.order_by('price', 'id')[:13]),
+            ('my items (on sale)', Item.objects.filter(seller_id=user_id, status='on_sale').order_by('-date_added')),
+            ('purchase history', Purchase.objects.filter(buyer_id=user_id).order_by('-purchase_date')[:13]),
+            ('recent purchases', Purchase.objects.filter(purchase_date__gte=since)),
+            ('cart', CartItem.objects.filter(user_id=user_id).order_by('date_added')),
+            ('my items (archived)', ArchivedItem.objects.filter(seller_id=user_id).order_by('-date_added')[:13]),
+            ('archive batch', archivable(archive_cutoff()).order_by('date_sold', 'id')[:500]),
+        ]
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        markers = INDEX_MARKERS.get(vendor)
+        explain_options = {}
+        if options['analyze'] and vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        self.stdout.write(f'🔍 Query plans ({vendor})')
+        self.stdout.write('=' * 40)
+
+        if markers is None:
+            self.stdout.write(self.style.WARNING(f'No index markers known for {vendor}; printing raw plans'))
+
+        missing = 0
+        for label, queryset in self.get_queries():
+            plan = queryset.explain(**explain_options)
+            if markers is None or options['verbose_plans']:
+                self.stdout.write(f'\n{label}:\n{plan}')
+            if markers is None:
+                continue
+
+            if any(marker in plan for marker in markers):
+                self.stdout.write(f'  ✅ {label}: index scan')
+            else:
+                missing += 1
+                self.stdout.write(f'  ❌ {label}: no index scan')
+                if not options['verbose_plans']:
+                    self.stdout.write(f'     {plan}')
+
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'\n{missing} queries did not use an index. '
+                'On small tables the planner may prefer a sequential scan; run ANALYZE after loading data.'
+            ))
+        elif markers is not None:
+            self.stdout.write(self.style.SUCCESS('\nAll key queries use index scans'))
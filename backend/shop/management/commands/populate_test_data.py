@@ -1,91 +1,118 @@
 # Django Management Command for Quick Database Population
-from django.core.management.base import BaseCommand
+import time
+
 from django.contrib.auth import get_user_model
-from shop.models import Item
-import random
-from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from shop import response_cache, search, seeding
 
 User = get_user_model()
 
+
 class Command(BaseCommand):
-    help = 'Quickly populate database with sample data for testing'
+    help = 'Populate the database from a named benchmark profile, or reload an exported fixture'
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            choices=sorted(seeding.PROFILES),
+            default='small',
+            help='Dataset shape to generate (default: small)'
+        )
         parser.add_argument(
             '--count',
             type=int,
-            default=10,
-            help='Number of items to create (default: 10)'
+            help="Number of items to create (default: the profile's)"
         )
         parser.add_argument(
             '--users',
             type=int,
-            default=3,
-            help='Number of users to create (default: 3)'
+            help="Number of users to create (default: the profile's)"
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed; the same profile and seed produce the same rows (default: 42)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes generating rows (default: 1)'
+        )
+        parser.add_argument(
+            '--export',
+            metavar='DIR',
+            help='Also write the generated rows to DIR as a fixture for --load'
+        )
+        parser.add_argument(
+            '--load',
+            metavar='DIR',
+            help='Load a fixture written by --export instead of generating data'
         )
 
     def handle(self, *args, **options):
-        count = options['count']
-        user_count = options['users']
-        
-        self.stdout.write(f'Creating {user_count} users and {count} items...')
-        
-        # Create users
-        users = []
-        for i in range(user_count):
-            username = f'testuser{i+1}'
-            email = f'user{i+1}@example.com'
-            user, created = User.objects.get_or_create(
-                username=username,
-                defaults={'email': email}
-            )
-            if created:
-                user.set_password('testpass123')
-                user.save()
-            users.append(user)
-        
-        # Sample data
-        sample_items = [
-            ('Gaming Laptop', 'High-performance gaming laptop with RTX graphics', 1299.99),
-            ('Wireless Headphones', 'Premium noise-cancelling wireless headphones', 299.99),
-            ('Smart Watch', 'Fitness tracking smartwatch with GPS', 199.99),
-            ('Coffee Machine', 'Professional espresso coffee machine', 599.99),
-            ('Desk Chair', 'Ergonomic office chair with lumbar support', 349.99),
-            ('Monitor 27"', '4K Ultra HD monitor for productivity', 449.99),
-            ('Keyboard', 'Mechanical RGB gaming keyboard', 129.99),
-            ('Mouse', 'Wireless gaming mouse with precision sensor', 79.99),
-            ('Webcam', 'HD webcam for video conferencing', 89.99),
-            ('Speakers', 'Bluetooth desktop speakers', 149.99),
-        ]
-        
-        categories = ['Electronics', 'Computing', 'Gaming', 'Office', 'Home']
-        
-        # Create items
-        items_to_create = []
-        for i in range(count):
-            item_data = sample_items[i % len(sample_items)]
-            name, description, base_price = item_data
-            
-            # Add variation to make items unique
-            variation = f" - Model {chr(65 + i // len(sample_items))}" if count > len(sample_items) else ""
-            price_variation = random.uniform(0.8, 1.2)
-            
-            item = Item(
-                name=f"{name}{variation}",
-                description=description,
-                price=Decimal(str(round(base_price * price_variation, 2))),
-                currency='EUR',
-                category=random.choice(categories),
-                seller=random.choice(users),
-                available=True
-            )
-            items_to_create.append(item)
-        
-        # Bulk create for performance
-        Item.objects.bulk_create(items_to_create, ignore_conflicts=True)
-        
+        started = time.perf_counter()
+        if options['load']:
+            self.load(options['load'])
+        else:
+            self.generate(options)
+
+        # Everything went in through bulk writes, which skip the model signals
+        self.stdout.write('Rebuilding search index and analytics rollups...')
+        search.rebuild_index()
+        call_command('rebuild_rollups', stdout=self.stdout)
+        response_cache.invalidate_catalogue()
+
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s'))
+        self.stdout.write('Sample credentials: <username>/testpass123')
+
+    def generate(self, options):
+        profile = seeding.PROFILES[options['profile']]
+        items = options['count'] if options['count'] is not None else profile['items']
+        users = options['users'] if options['users'] is not None else profile['users']
+        if items < 0 or users < 1:
+            raise CommandError('--count must be at least 0 and --users at least 1')
+
+        prefix = f"{options['profile']}_user"
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'The {options["profile"]} profile has already been loaded ({prefix}* users exist)')
+
+        plan = seeding.make_plan(
+            items=items,
+            users=users,
+            purchases=int(items * profile['sold_ratio']),
+            seed=options['seed'],
+            user_prefix=prefix,
+            seller_skew=profile['seller_skew'],
+            category_weights=profile.get('category_weights'),
+        )
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully created {user_count} users and {count} items!')
+            f"Creating {users} users and {items} items ({plan['purchases']} sold) "
+            f"from the {options['profile']} profile..."
+        )
+        seeding.run(
+            plan,
+            make_password('testpass123'),
+            workers=options['workers'],
+            progress=lambda done: self.stdout.write(f'  {done}/{items} items'),
         )
-        self.stdout.write(f'Users created: {", ".join([u.username for u in users])}')
-        self.stdout.write('Sample credentials: username/testpass123')
+
+        if options['export']:
+            seeding.export_fixture(plan, options['export'])
+            self.stdout.write(f"Exported fixture to {options['export']}")
+
+    def load(self, directory):
+        self.stdout.write(f'Loading fixture from {directory}...')
+        try:
+            manifest = seeding.load_fixture(
+                directory, progress=lambda table, done: self.stdout.write(f'  {table}: {done} rows')
+            )
+        except FileNotFoundError as e:
+            raise CommandError(f'Not a fixture directory: {e}')
+        except IntegrityError as e:
+            raise CommandError(f'Fixture rows clash with existing data, load it into an empty database: {e}')
+        self.stdout.write(f"Loaded {manifest['users']} users, {manifest['items']} items, {manifest['purchases']} purchases")
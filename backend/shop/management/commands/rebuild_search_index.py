@@ -0,0 +1,28 @@
+# Django Management Command for rebuilding the item full-text search index
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from shop import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all items (after bulk imports or updates)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of items to index per statement (default: 10000)'
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('postgresql', 'sqlite'):
+            self.stdout.write(self.style.WARNING(f'{vendor} has no full-text index; search uses icontains'))
+            return
+
+        self.stdout.write(f'Rebuilding search index ({vendor})...')
+        with transaction.atomic():
+            indexed = search.rebuild_index(batch_size=options['batch_size'], stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {indexed} items'))
@@ -1,46 +1,100 @@
+import re
+import time
+from collections import Counter, defaultdict
+
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
+from django.db import transaction
+from shop import response_cache
 from shop.models import Item
-import random
 
-User = get_user_model()
+# Checked in order; the first category with a keyword in the title wins
+CATEGORY_KEYWORDS = [
+    ('clothing', ['shirt', 'dress', 'jeans', 'top', 'jacket', 'coat', 'sweater', 'pants', 'skirt', 'clothing']),
+    ('bags', ['bag', 'purse', 'backpack', 'handbag', 'tote', 'wallet']),
+    ('shoes', ['shoe', 'sneaker', 'boot', 'sandal', 'heel', 'loafer']),
+    ('sunglasses', ['sunglasses', 'glasses', 'eyewear']),
+    ('accessories', ['watch', 'necklace', 'bracelet', 'ring', 'earring', 'jewelry', 'accessory']),
+]
+MATCHERS = [(category, re.compile('|'.join(map(re.escape, words)))) for category, words in CATEGORY_KEYWORDS]
+CATEGORIES = [key for key, _ in Item.CATEGORY_CHOICES]
+
+
+def classify(item_id, title, current):
+    title = title.lower()
+    for category, pattern in MATCHERS:
+        if pattern.search(title):
+            return category
+    if current in CATEGORIES:
+        return current
+    # No keyword and no valid category yet: spread these evenly, the same way every run
+    return CATEGORIES[item_id % len(CATEGORIES)]
+
 
 class Command(BaseCommand):
     help = 'Update existing items with proper categories'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Items read and updated per batch (default: 10000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the changes without writing them'
+        )
+
     def handle(self, *args, **options):
-        categories = ['clothing', 'accessories', 'bags', 'shoes', 'sunglasses']
-        
-        # Get all items
-        items = Item.objects.all()
-        
-        self.stdout.write(f"Updating {items.count()} items with categories...")
-        
-        updated_count = 0
-        for item in items:
-            # Assign a random category based on the title
-            old_category = item.category
-            
-            # Smart category assignment based on title keywords
-            title_lower = item.title.lower()
-            if any(word in title_lower for word in ['shirt', 'dress', 'jeans', 'top', 'jacket', 'coat', 'sweater', 'pants', 'skirt', 'clothing']):
-                item.category = 'clothing'
-            elif any(word in title_lower for word in ['bag', 'purse', 'backpack', 'handbag', 'tote', 'wallet']):
-                item.category = 'bags'
-            elif any(word in title_lower for word in ['shoe', 'sneaker', 'boot', 'sandal', 'heel', 'loafer']):
-                item.category = 'shoes'
-            elif any(word in title_lower for word in ['sunglasses', 'glasses', 'eyewear']):
-                item.category = 'sunglasses'
-            elif any(word in title_lower for word in ['watch', 'necklace', 'bracelet', 'ring', 'earring', 'jewelry', 'accessory']):
-                item.category = 'accessories'
-            else:
-                # Random assignment for items that don't match keywords
-                item.category = random.choice(categories)
-            
-            if item.category != old_category:
-                item.save()
-                updated_count += 1
-        
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        total = Item.objects.count()
+        self.stdout.write(f"{'Checking' if dry_run else 'Updating'} {total} items with categories...")
+
+        started = time.perf_counter()
+        changes = Counter()
+        scanned = 0
+        last_id = 0
+        while True:
+            # Keyset batches rather than one long-running cursor, so no read is open while we write
+            rows = list(
+                Item.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'title', 'category')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+
+            moves = defaultdict(list)
+            for item_id, title, current in rows:
+                category = classify(item_id, title, current)
+                if category != current:
+                    moves[category].append(item_id)
+                    changes[(current, category)] += 1
+
+            if moves and not dry_run:
+                # One UPDATE per target category, touching only the category column
+                with transaction.atomic():
+                    for category, ids in moves.items():
+                        Item.objects.filter(id__in=ids).update(category=category)
+
+            rate = scanned / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(f'  {scanned}/{total} scanned, {sum(changes.values())} changed ({rate:,.0f}/s)')
+
+        for (old, new), count in sorted(changes.items()):
+            self.stdout.write(f'  {old} -> {new}: {count}')
+        updated_count = sum(changes.values())
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {updated_count} items would change category'))
+            return
+
+        if updated_count:
+            # QuerySet.update() skips signals, so refresh what depends on category in bulk
+            call_command('rebuild_rollups', stdout=self.stdout)
+            response_cache.invalidate_all()
         self.stdout.write(
             self.style.SUCCESS(f'Successfully updated {updated_count} items with new categories')
         )
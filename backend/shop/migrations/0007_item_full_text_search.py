@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS item_search_vector_gin ON shop_item USING GIN (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE shop_item SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS shop_item_fts USING fts5('
+            "title, description, tokenize='porter unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO shop_item_fts (rowid, title, description) SELECT id, title, description FROM shop_item'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS item_search_vector_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS shop_item_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
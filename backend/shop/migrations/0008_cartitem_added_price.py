@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:44
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_added_price(apps, schema_editor):
+    # Existing cart lines start from the current price
+    CartItem = apps.get_model('shop', 'CartItem')
+    Item = apps.get_model('shop', 'Item')
+    CartItem.objects.update(added_price=Subquery(Item.objects.filter(pk=OuterRef('item_id')).values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_item_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='added_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_added_price, migrations.RunPython.noop),
+    ]
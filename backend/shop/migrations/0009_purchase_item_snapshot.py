@@ -0,0 +1,62 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_item_snapshot(apps, schema_editor):
+    # Existing purchases take the item as it is now, the closest record left of it at checkout
+    Purchase = apps.get_model('shop', 'Purchase')
+    Item = apps.get_model('shop', 'Item')
+    item = Item.objects.filter(pk=OuterRef('item_id'))
+    Purchase.objects.filter(item__isnull=False).update(
+        item_title=Subquery(item.values('title')[:1]),
+        item_category=Subquery(item.values('category')[:1]),
+        item_image_url=Subquery(item.values('image_url')[:1]),
+        seller_id=Subquery(item.values('seller_id')[:1]),
+        seller_username=Subquery(item.values('seller__username')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_cartitem_added_price'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='item_category',
+            field=models.CharField(blank=True, choices=[('clothing', 'Clothing'), ('accessories', 'Accessories'), ('bags', 'Bags'), ('shoes', 'Shoes'), ('sunglasses', 'Sunglasses')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='item_image_url',
+            field=models.URLField(blank=True, max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='item_title',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='seller',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='seller_username',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.AlterField(
+            model_name='purchase',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchase_record', to='shop.item'),
+        ),
+        migrations.RunPython(backfill_item_snapshot, migrations.RunPython.noop),
+    ]
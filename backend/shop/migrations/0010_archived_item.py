@@ -0,0 +1,57 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_purchase_item_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('price', models.DecimalField(decimal_places=2, help_text='Price in EUR (Euro)', max_digits=10)),
+                ('category', models.CharField(choices=[('clothing', 'Clothing'), ('accessories', 'Accessories'), ('bags', 'Bags'), ('shoes', 'Shoes'), ('sunglasses', 'Sunglasses')], default='clothing', max_length=20)),
+                ('image_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('status', models.CharField(choices=[('on_sale', 'On Sale'), ('sold', 'Sold')], default='sold', max_length=20)),
+                ('date_added', models.DateTimeField()),
+                ('date_sold', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date_added'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('status', 'sold')), fields=['date_sold', 'id'], name='item_sold_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='archiveditem',
+            name='buyer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_items_bought', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archiveditem',
+            name='seller',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_items_sold', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='archived_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchase_record', to='shop.archiveditem'),
+        ),
+        migrations.AddIndex(
+            model_name='archiveditem',
+            index=models.Index(fields=['seller', '-date_added'], name='archiveditem_seller_added_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:56
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_item_details(apps, schema_editor):
+    # Like 0009: take the listing as it is now, from whichever table holds it
+    Purchase = apps.get_model('shop', 'Purchase')
+    for model_name, field in (('Item', 'item'), ('ArchivedItem', 'archived_item')):
+        listing = apps.get_model('shop', model_name).objects.filter(pk=OuterRef(f'{field}_id'))
+        Purchase.objects.filter(**{f'{field}__isnull': False}).update(
+            item_description=Subquery(listing.values('description')[:1]),
+            item_date_added=Subquery(listing.values('date_added')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_archived_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='item_date_added',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='item_description',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(backfill_item_details, migrations.RunPython.noop),
+    ]
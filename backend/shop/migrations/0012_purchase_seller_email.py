@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_seller_email(apps, schema_editor):
+    # Like 0009: take the seller's email as it is now
+    Purchase = apps.get_model('shop', 'Purchase')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    seller = User.objects.filter(pk=OuterRef('seller_id'))
+    Purchase.objects.filter(seller__isnull=False).update(seller_email=Subquery(seller.values('email')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_purchase_item_description'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='seller_email',
+            field=models.EmailField(blank=True, default='', max_length=254),
+        ),
+        migrations.RunPython(backfill_seller_email, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 
@@ -28,35 +29,136 @@ class Item(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='on_sale')
     date_added = models.DateTimeField(auto_now_add=True)
     date_sold = models.DateTimeField(null=True, blank=True)
+    # Maintained by shop.signals on PostgreSQL; SQLite searches the shop_item_fts table instead
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
     
     def __str__(self):
         return self.title
     
     class Meta:
         ordering = ['-date_added']
+        indexes = [
+            models.Index(fields=['status', 'category', '-date_added'], name='item_status_cat_added_idx'),
+            models.Index(fields=['seller', 'status', '-date_added'], name='item_seller_status_idx'),
+            # Partial indexes cover only the rows public listings can return
+            models.Index(
+                fields=['-date_added', '-id'],
+                condition=models.Q(status='on_sale'),
+                name='item_on_sale_added_idx',
+            ),
+            models.Index(
+                fields=['price', 'id'],
+                condition=models.Q(status='on_sale'),
+                name='item_on_sale_price_idx',
+            ),
+            # Finds the oldest sales for shop.archive
+            models.Index(
+                fields=['date_sold', 'id'],
+                condition=models.Q(status='sold'),
+                name='item_sold_date_idx',
+            ),
+        ]
+
+
+class ArchivedItem(models.Model):
+    """
+    A sold ``Item`` moved out of the active table by ``shop.archive``.
+
+    Keeps the item's id and fields, so ``ItemSerializer`` serializes it
+    as it did the item.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Price in EUR (Euro)")
+    category = models.CharField(max_length=20, choices=Item.CATEGORY_CHOICES, default='clothing')
+    image_url = models.URLField(max_length=500, null=True, blank=True)
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_items_sold')
+    buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_items_bought', null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Item.STATUS_CHOICES, default='sold')
+    date_added = models.DateTimeField()
+    date_sold = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.title
+    
+    class Meta:
+        ordering = ['-date_added']
+        indexes = [
+            models.Index(fields=['seller', '-date_added'], name='archiveditem_seller_added_idx'),
+        ]
 
 
 class Purchase(models.Model):
     buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='purchases')
-    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='purchase_record')
+    # Null once the listing is deleted or archived; the snapshot below keeps the purchase readable
+    item = models.ForeignKey(Item, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchase_record')
+    archived_item = models.ForeignKey(
+        ArchivedItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchase_record'
+    )
     purchase_date = models.DateTimeField(auto_now_add=True)
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2)
     payment_intent_id = models.CharField(max_length=255, null=True, blank=True, help_text="Stripe payment intent ID")
+    # The item as it was at checkout, so purchase history reads this table alone
+    item_title = models.CharField(max_length=200, blank=True, default='')
+    item_description = models.TextField(blank=True, default='')
+    item_category = models.CharField(max_length=20, choices=Item.CATEGORY_CHOICES, blank=True, default='')
+    item_image_url = models.URLField(max_length=500, null=True, blank=True)
+    item_date_added = models.DateTimeField(null=True, blank=True)
+    seller = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
+    seller_username = models.CharField(max_length=150, blank=True, default='')
+    seller_email = models.EmailField(blank=True, default='')
     
     def __str__(self):
-        return f"{self.buyer.username} purchased {self.item.title}"
+        return f"{self.buyer.username} purchased {self.item_title}"
+    
+    @property
+    def listing_id(self):
+        """Id of the purchased item, whether it is still in ``Item`` or archived."""
+        return self.item_id if self.item_id is not None else self.archived_item_id
+    
+    @property
+    def item_status(self):
+        """A purchased item is always sold."""
+        return 'sold'
+    
+    @classmethod
+    def for_item(cls, item, **kwargs):
+        """An unsaved purchase of ``item`` with its snapshot filled in; reads ``item.seller``."""
+        return cls(
+            item=item,
+            item_title=item.title,
+            item_description=item.description,
+            item_category=item.category,
+            item_image_url=item.image_url,
+            item_date_added=item.date_added,
+            seller_id=item.seller_id,
+            seller_username=item.seller.username,
+            seller_email=item.seller.email,
+            **kwargs
+        )
     
     class Meta:
         ordering = ['-purchase_date']
+        indexes = [
+            models.Index(fields=['buyer', '-purchase_date'], name='purchase_buyer_date_idx'),
+            models.Index(fields=['purchase_date'], name='purchase_date_idx'),
+        ]
 
 
 class CartItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_items')
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     date_added = models.DateTimeField(auto_now_add=True)
+    # Item price when it was added, so the cart summary can flag price changes
+    added_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     
     class Meta:
         unique_together = ['user', 'item']
+        indexes = [
+            models.Index(fields=['user', 'date_added'], name='cartitem_user_added_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.item.title}"
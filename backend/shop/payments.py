@@ -0,0 +1,258 @@
+"""
+Payment gateway used by checkout.
+
+``get_gateway()`` returns the gateway named by ``settings.PAYMENT_GATEWAY``:
+``'stripe'`` talks to Stripe, ``'fake'`` is an in-process stand-in that
+needs no network access and is meant for local development and load tests.
+
+Payment intents are created with an idempotency key derived from the cart
+contents, so a retried request for the same cart returns the intent that is
+already open instead of creating a duplicate. Retrieved intent statuses are
+cached briefly so repeated ``pay_cart`` calls don't each wait on the API.
+"""
+import asyncio
+import hashlib
+import time
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from backend import metrics
+
+# Intents in these states can still be confirmed by the client
+REUSABLE_STATUSES = {'requires_payment_method', 'requires_confirmation', 'requires_action'}
+FINAL_STATUSES = {'succeeded', 'canceled'}
+
+INTENT_CACHE_PREFIX = 'payments:intent:'
+STATUS_CACHE_PREFIX = 'payments:status:'
+
+
+class PaymentError(Exception):
+    """The payment provider could not be reached or rejected the request."""
+
+
+def cart_idempotency_key(user_id, lines, currency):
+    """
+    Build a stable key from the cart contents.
+
+    ``lines`` is an iterable of ``(item_id, price)`` pairs; order does not
+    matter. Any change to the cart (or a price) produces a new key.
+    """
+    payload = ';'.join(f'{item_id}:{price}' for item_id, price in sorted(lines))
+    digest = hashlib.sha256(f'{user_id}|{currency}|{payload}'.encode()).hexdigest()
+    return f'cart-{user_id}-{digest[:32]}'
+
+
+def to_cents(amount):
+    return int(amount * 100)
+
+
+class PaymentGateway:
+    currency = 'eur'
+
+    def create_intent(self, user, lines, amount):
+        """Return an open payment intent for this cart, reusing one if the cart is unchanged."""
+        cart_key = cart_idempotency_key(user.id, lines, self.currency)
+        cached = cache.get(INTENT_CACHE_PREFIX + cart_key)
+        if cached and self.get_status(cached['id']) in REUSABLE_STATUSES:
+            return SimpleNamespace(**cached)
+
+        # A finished intent can't be reused, so create the next one under a fresh key
+        key = f'{cart_key}-{int(time.time())}' if cached else cart_key
+        intent = self._create(to_cents(amount), key, metadata={'user_id': user.id})
+        cache.set(
+            INTENT_CACHE_PREFIX + cart_key,
+            {'id': intent.id, 'client_secret': intent.client_secret},
+            settings.PAYMENT_INTENT_REUSE_TTL,
+        )
+        self._cache_status(intent.id, intent.status)
+        return intent
+
+    def get_status(self, intent_id, require_final=False):
+        """
+        Return the intent's status. Cached statuses are used as-is unless
+        ``require_final`` is set, in which case only a final status (which
+        can no longer change) is trusted and anything else is re-fetched.
+        """
+        status = cache.get(STATUS_CACHE_PREFIX + intent_id)
+        stale = status is None or (require_final and status not in FINAL_STATUSES)
+        metrics.cache_lookup('payment_status', not stale)
+        if stale:
+            status = self._retrieve(intent_id).status
+            self._cache_status(intent_id, status)
+        return status
+
+    def is_succeeded(self, intent_id):
+        return self.get_status(intent_id, require_final=True) == 'succeeded'
+
+    def _cache_status(self, intent_id, status):
+        cache.set(STATUS_CACHE_PREFIX + intent_id, status, self._status_ttl(status))
+
+    def _status_ttl(self, status):
+        return settings.PAYMENT_INTENT_REUSE_TTL if status in FINAL_STATUSES else settings.PAYMENT_STATUS_CACHE_TTL
+
+    # Async counterparts for the async views: the same caching, without holding a thread while the API answers
+
+    async def acreate_intent(self, user, lines, amount):
+        cart_key = cart_idempotency_key(user.id, lines, self.currency)
+        cached = await cache.aget(INTENT_CACHE_PREFIX + cart_key)
+        if cached and await self.aget_status(cached['id']) in REUSABLE_STATUSES:
+            return SimpleNamespace(**cached)
+
+        key = f'{cart_key}-{int(time.time())}' if cached else cart_key
+        intent = await self._acreate(to_cents(amount), key, metadata={'user_id': user.id})
+        await cache.aset(
+            INTENT_CACHE_PREFIX + cart_key,
+            {'id': intent.id, 'client_secret': intent.client_secret},
+            settings.PAYMENT_INTENT_REUSE_TTL,
+        )
+        await cache.aset(STATUS_CACHE_PREFIX + intent.id, intent.status, self._status_ttl(intent.status))
+        return intent
+
+    async def aget_status(self, intent_id, require_final=False):
+        status = await cache.aget(STATUS_CACHE_PREFIX + intent_id)
+        stale = status is None or (require_final and status not in FINAL_STATUSES)
+        metrics.cache_lookup('payment_status', not stale)
+        if stale:
+            status = (await self._aretrieve(intent_id)).status
+            await cache.aset(STATUS_CACHE_PREFIX + intent_id, status, self._status_ttl(status))
+        return status
+
+    async def ais_succeeded(self, intent_id):
+        return await self.aget_status(intent_id, require_final=True) == 'succeeded'
+
+    def _create(self, amount_in_cents, idempotency_key, metadata):
+        raise NotImplementedError
+
+    def _retrieve(self, intent_id):
+        raise NotImplementedError
+
+    async def _acreate(self, amount_in_cents, idempotency_key, metadata):
+        # Without a native async client the call still blocks, but in a worker thread
+        return await sync_to_async(self._create, thread_sensitive=False)(amount_in_cents, idempotency_key, metadata)
+
+    async def _aretrieve(self, intent_id):
+        return await sync_to_async(self._retrieve, thread_sensitive=False)(intent_id)
+
+
+class StripeGateway(PaymentGateway):
+    def __init__(self):
+        import stripe
+
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+        # requests for the sync views, httpx for the *_async calls made by the async views
+        stripe.default_http_client = stripe.RequestsClient(
+            timeout=settings.STRIPE_TIMEOUT,
+            async_fallback_client=stripe.HTTPXClient(timeout=settings.STRIPE_TIMEOUT),
+        )
+        self.stripe = stripe
+
+    def _create(self, amount_in_cents, idempotency_key, metadata):
+        try:
+            return self.stripe.PaymentIntent.create(
+                amount=amount_in_cents,
+                currency=self.currency,
+                metadata=metadata,
+                idempotency_key=idempotency_key,
+            )
+        except self.stripe.StripeError as e:
+            raise PaymentError(str(e)) from e
+
+    def _retrieve(self, intent_id):
+        try:
+            return self.stripe.PaymentIntent.retrieve(intent_id)
+        except self.stripe.StripeError as e:
+            raise PaymentError(str(e)) from e
+
+    async def _acreate(self, amount_in_cents, idempotency_key, metadata):
+        try:
+            return await self.stripe.PaymentIntent.create_async(
+                amount=amount_in_cents,
+                currency=self.currency,
+                metadata=metadata,
+                idempotency_key=idempotency_key,
+            )
+        except self.stripe.StripeError as e:
+            raise PaymentError(str(e)) from e
+
+    async def _aretrieve(self, intent_id):
+        try:
+            return await self.stripe.PaymentIntent.retrieve_async(intent_id)
+        except self.stripe.StripeError as e:
+            raise PaymentError(str(e)) from e
+
+
+class FakeGateway(PaymentGateway):
+    """
+    In-process gateway for tests and load testing.
+
+    Intents are created as ``requires_payment_method`` and any ``pi_fake_``
+    intent is reported as ``succeeded`` when retrieved, as if the client had
+    confirmed it. Intent ids are derived from the idempotency key, so no
+    state is kept and any worker process can answer for any intent.
+    ``FAKE_PAYMENT_LATENCY_MS`` adds a delay to each call to mimic the API.
+    """
+    prefix = 'pi_fake_'
+
+    def _sleep(self):
+        latency = settings.FAKE_PAYMENT_LATENCY_MS
+        if latency:
+            time.sleep(latency / 1000)
+
+    async def _asleep(self):
+        latency = settings.FAKE_PAYMENT_LATENCY_MS
+        if latency:
+            await asyncio.sleep(latency / 1000)
+
+    def _create(self, amount_in_cents, idempotency_key, metadata):
+        self._sleep()
+        return self._intent(amount_in_cents, idempotency_key, metadata)
+
+    def _retrieve(self, intent_id):
+        self._sleep()
+        return self._status(intent_id)
+
+    async def _acreate(self, amount_in_cents, idempotency_key, metadata):
+        await self._asleep()
+        return self._intent(amount_in_cents, idempotency_key, metadata)
+
+    async def _aretrieve(self, intent_id):
+        await self._asleep()
+        return self._status(intent_id)
+
+    def _intent(self, amount_in_cents, idempotency_key, metadata):
+        digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+        intent_id = self.prefix + digest[:24]
+        return SimpleNamespace(
+            id=intent_id,
+            client_secret=f'{intent_id}_secret_{digest[24:40]}',
+            amount=amount_in_cents,
+            status='requires_payment_method',
+            metadata=metadata,
+        )
+
+    def _status(self, intent_id):
+        if not intent_id.startswith(self.prefix):
+            raise PaymentError(f'No such payment_intent: {intent_id}')
+        return SimpleNamespace(id=intent_id, status='succeeded')
+
+
+GATEWAYS = {
+    'stripe': StripeGateway,
+    'fake': FakeGateway,
+}
+
+_instances = {}
+
+
+def get_gateway():
+    name = settings.PAYMENT_GATEWAY
+    if name not in _instances:
+        try:
+            _instances[name] = GATEWAYS[name]()
+        except KeyError:
+            raise PaymentError(f'Unknown PAYMENT_GATEWAY {name!r}, expected one of {sorted(GATEWAYS)}')
+    return _instances[name]
@@ -0,0 +1,38 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` that encodes with orjson, producing the same bytes.
+
+    That holds for compact, non-ASCII-escaped output (DRF's defaults) of
+    strings, ints, bools, ``None`` and whatever DRF's encoder turns into a
+    string (datetimes, UUIDs, lazy translations), which is all the shop's
+    serializers produce. orjson formats floats differently (``1e16`` rather
+    than ``1e+16``, ``null`` for NaN), so views returning floats keep
+    ``JSONRenderer``. Indented output and anything orjson rejects (very large
+    ints, non-string keys) fall back to ``JSONRenderer``.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer does: U+2028 and U+2029 are valid JSON but not valid JavaScript
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+    def default(self, obj):
+        value = self.encoder_class().default(obj)
+        if isinstance(value, float):
+            # A Decimal; left to JSONRenderer, see above
+            raise TypeError('float')
+        return value
@@ -0,0 +1,187 @@
+"""
+Response cache for the public catalogue endpoints.
+
+Serialized JSON responses of the item list and item detail views are stored in
+Django's cache framework (``CACHES['default']``), keyed on the view, the
+normalized query string and a generation counter. Writes never delete cache
+entries; they bump the counter instead, so every key built afterwards misses
+and stale entries simply expire. A counter bumped in one process must be seen
+by all of them, so the cache is only used when ``SHARED_CACHE`` is set (Redis
+through ``REDIS_URL``) and ``CATALOGUE_CACHE_TTL`` is positive:
+
+* the catalogue generation covers every list response and is bumped by any
+  item save or delete,
+* each item has its own generation covering its detail response,
+* the users generation covers every response and is bumped when a user's
+  username or email, which item responses embed for seller and buyer, may
+  have changed,
+* the epoch is part of every key; ``invalidate_all()`` bumps it after bulk
+  rewrites where bumping each item's counter would be too slow.
+
+Counters are bumped from the ``Item`` and user signals in ``shop.signals``, once
+straight away and once more when the writing transaction commits, which
+drops anything a concurrent request cached from the data it read before the
+commit. Writes that bypass signals (``bulk_create``, ``QuerySet.update``)
+must call ``invalidate_items()`` or ``invalidate_catalogue()`` themselves.
+
+Responses carry an ``ETag`` and ``Last-Modified`` so clients can revalidate
+with ``If-None-Match`` / ``If-Modified-Since`` and get a 304.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from backend import metrics
+
+CATALOGUE_GENERATION = 'catalogue:generation'
+CATALOGUE_EPOCH = 'catalogue:epoch'
+USERS_GENERATION = 'catalogue:users'
+KEY_PREFIX = 'catalogue:response'
+
+
+def enabled():
+    return settings.SHARED_CACHE and settings.CATALOGUE_CACHE_TTL > 0
+
+
+def item_generation_key(item_id):
+    return f'{CATALOGUE_GENERATION}:item:{item_id}'
+
+
+def get_generations(keys):
+    """Current value of each counter, initialising any that are missing."""
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Start from the clock rather than 0, so a counter that was evicted
+            # can't come back at a value that old entries are still stored under
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+async def aget_generations(keys):
+    generations = await cache.aget_many(keys)
+    for key in keys:
+        if key not in generations:
+            await cache.aadd(key, time.time_ns(), None)
+            generations[key] = await cache.aget(key)
+    return [generations[key] for key in keys]
+
+
+def bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Missing counter: the next read starts a fresh one
+            pass
+
+
+def invalidate(keys):
+    """Bump the counters ``keys`` now and again when the current transaction commits."""
+    bump(keys)
+    transaction.on_commit(lambda: bump(keys))
+
+
+def invalidate_catalogue():
+    invalidate([CATALOGUE_GENERATION])
+
+
+def invalidate_items(item_ids):
+    invalidate([CATALOGUE_GENERATION, *(item_generation_key(item_id) for item_id in item_ids)])
+
+
+def invalidate_users():
+    invalidate([USERS_GENERATION])
+
+
+def invalidate_all():
+    invalidate([CATALOGUE_EPOCH])
+
+
+def normalize_query(query_params, allowed):
+    """Query string reduced to ``allowed`` non-empty params in a stable order."""
+    return '&'.join(
+        f'{name}={value}'
+        for name in sorted(allowed)
+        for value in sorted(query_params.getlist(name))
+        if value != ''
+    )
+
+
+def generation_keys(view):
+    """Counters that the responses of ``view`` are keyed on."""
+    return [CATALOGUE_EPOCH, USERS_GENERATION, *view.get_cache_generations()]
+
+
+def response_key(name, request, allowed, generations):
+    """Cache key for a response of view ``name``; shared by the sync and async views."""
+    query = normalize_query(request.GET, allowed)
+    # Pagination links are absolute, so the host is part of the key
+    digest = hashlib.md5(f'{request.get_host()}{request.path}?{query}'.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{name}:{"-".join(map(str, generations))}:{digest}'
+
+
+def make_entry(data, body):
+    return {
+        'data': data,
+        'etag': f'"{hashlib.md5(body).hexdigest()}"',
+        'last_modified': int(time.time()),
+    }
+
+
+def finish_response(request, response, entry):
+    """Add the validators and cache headers of ``entry``; 304 if the client's copy is current."""
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    # Let clients keep the response but revalidate it on every use
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'], response=response
+    )
+
+
+class CachedResponseMixin:
+    """
+    Serve GET requests for a DRF view from the response cache.
+
+    Views list the query parameters that affect the response in
+    ``cache_query_params`` and may override ``get_cache_generations()``.
+    Only JSON responses with status 200 are cached, and only while
+    ``enabled()``.
+    """
+    cache_query_params = ()
+
+    def get_cache_generations(self):
+        return [CATALOGUE_GENERATION]
+
+    def get_cache_key(self, request):
+        generations = get_generations(generation_keys(self))
+        return response_key(self.__class__.__name__, request, self.cache_query_params, generations)
+
+    def get(self, request, *args, **kwargs):
+        if not enabled() or request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        metrics.cache_lookup('catalogue', entry is not None)
+        if entry is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            entry = make_entry(response.data, body)
+            cache.set(key, entry, settings.CATALOGUE_CACHE_TTL)
+
+        # Hits skip the queries and serializers; only the JSON rendering is repeated
+        return finish_response(request, Response(entry['data']), entry)
@@ -0,0 +1,169 @@
+"""
+Full-text search over item titles and descriptions.
+
+PostgreSQL keeps a weighted ``tsvector`` in ``Item.search_vector`` (GIN
+indexed) and SQLite keeps an FTS5 virtual table, ``shop_item_fts``, keyed by
+item id. Both are refreshed from the ``Item`` save/delete signals in
+``shop.signals``; writes that bypass signals (``bulk_create``,
+``QuerySet.update``) need ``manage.py rebuild_search_index`` afterwards.
+Other database backends fall back to ``icontains`` matching.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+FTS_TABLE = 'shop_item_fts'
+SEARCH_CONFIG = 'english'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_search_terms(query):
+    """Split free text into plain word tokens, dropping any query syntax."""
+    return _TOKEN_RE.findall(query or '')[:10]
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def search_items(queryset, query):
+    """
+    Filter ``queryset`` to items matching every term in ``query`` (prefix
+    matches included) and annotate each row with ``search_rank``, where a
+    higher rank is a better match.
+    """
+    terms = get_search_terms(query)
+    if not terms:
+        return queryset
+
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            config=SEARCH_CONFIG,
+            search_type='raw',
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank('search_vector', search_query)
+        )
+
+    if vendor == 'sqlite':
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        # The unary + keeps SQLite from probing FTS5 once per shop_item row, so the
+        # MATCH drives the join. bm25 is negated so that higher is better.
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE}, 2.0, 1.0)'},
+            tables=[FTS_TABLE],
+            where=[f'shop_item.id = +{FTS_TABLE}.rowid', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        )
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition)
+
+
+def has_rank(queryset):
+    """True when ``search_items`` was able to annotate ``search_rank``."""
+    return 'search_rank' in queryset.query.annotations or 'search_rank' in queryset.query.extra
+
+
+def index_item(item):
+    """Refresh the search index entry for a single item."""
+    from .models import Item
+
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        Item.objects.filter(pk=item.pk).update(search_vector=search_vector())
+    elif vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+                [item.pk, item.title, item.description],
+            )
+
+
+def unindex_item(item_id):
+    """Drop an item from the search index."""
+    unindex_items([item_id])
+
+
+def unindex_items(item_ids):
+    """Drop many items from the search index in one statement."""
+    if connection.vendor == 'sqlite' and item_ids:
+        placeholders = ', '.join(['%s'] * len(item_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', list(item_ids))
+
+
+def rebuild_index(batch_size=10000, stdout=None):
+    """Rebuild the whole index in id-ordered batches. Returns the number of items indexed."""
+    from .models import Item
+
+    vendor = connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return 0
+
+    if vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Item.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        low, high = ids[0], ids[-1]
+        if vendor == 'postgresql':
+            Item.objects.filter(id__gte=low, id__lte=high).update(search_vector=search_vector())
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                    'SELECT id, title, description FROM shop_item WHERE id BETWEEN %s AND %s',
+                    [low, high],
+                )
+        indexed += len(ids)
+        last_id = high
+        if stdout:
+            stdout.write(f'  Indexed {indexed} items...')
+    return indexed
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Ranked replacement for ``SearchFilter``. Reads ``?q=`` (or the older
+    ``?search=``) and, unless the client asked for an explicit ``ordering``,
+    orders results by relevance.
+    """
+    search_param = 'q'
+    legacy_search_param = 'search'
+    ordering_param = 'ordering'
+
+    def get_search_query(self, request):
+        params = request.query_params
+        return params.get(self.search_param) or params.get(self.legacy_search_param, '')
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not get_search_terms(query):
+            return queryset
+
+        queryset = search_items(queryset, query)
+        if has_rank(queryset) and not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset
@@ -0,0 +1,374 @@
+"""
+Synthetic catalogue generation for load testing and benchmark fixtures
+(``manage.py seed_catalogue`` and ``manage.py populate_test_data``).
+
+Rows are generated in fixed-size batches. Each batch draws from its own
+random generator seeded with ``(seed, batch number)`` and every row gets an
+explicit primary key, so the same plan produces the same rows however many
+worker processes generate them and in whatever order they finish.
+
+Worker processes only build row tuples; the parent process streams them into
+the database, with ``COPY`` on PostgreSQL and ``executemany`` elsewhere,
+committing once per batch.
+
+``export_fixture()`` writes the seeded rows to gzipped CSV files that
+``load_fixture()`` streams back through the same writer, which is much
+faster than ``loaddata`` because no model instances are built or saved.
+"""
+import csv
+import gzip
+import json
+import multiprocessing
+import random
+from datetime import timedelta
+from decimal import Decimal
+from functools import lru_cache, partial
+from pathlib import Path
+
+import django
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils import timezone
+
+from shop.models import Item, Purchase
+
+CATALOGUE = {
+    'clothing': {
+        'items': ['T-Shirt', 'Jeans', 'Hoodie', 'Jacket', 'Fleece', 'Sweater', 'Blazer', 'Dress', 'Blouse', 'Coat'],
+        'price_range': (15, 200),
+    },
+    'accessories': {
+        'items': ['Watch', 'Necklace', 'Bracelet', 'Earrings', 'Belt', 'Scarf', 'Cap', 'Gloves'],
+        'price_range': (10, 300),
+    },
+    'bags': {
+        'items': ['Tote Bag', 'Crossbody Bag', 'Backpack', 'Clutch', 'Messenger Bag', 'Handbag', 'Duffle Bag'],
+        'price_range': (25, 400),
+    },
+    'shoes': {
+        'items': ['Running Shoes', 'Sneakers', 'Boots', 'Sandals', 'Loafers', 'High Heels', 'Ankle Boots'],
+        'price_range': (30, 250),
+    },
+    'sunglasses': {
+        'items': ['Aviator Sunglasses', 'Wayfarer Sunglasses', 'Cat Eye Sunglasses', 'Round Sunglasses'],
+        'price_range': (20, 150),
+    },
+}
+BRANDS = ['Levi\'s', 'Nike', 'Adidas', 'Patagonia', 'Ray-Ban', 'Fossil', 'Zara', 'Uniqlo', 'Vintage', 'Handmade']
+MATERIALS = ['leather', 'cotton', 'wool', 'denim', 'silk', 'canvas', 'suede', 'linen', 'metal', 'acetate']
+CONDITIONS = [
+    'Brand new with tags.',
+    'Excellent condition, barely used.',
+    'Very good condition with minimal wear.',
+    'Good condition, shows light use.',
+]
+
+ITEM_FIELDS = (
+    'id', 'title', 'description', 'price', 'category', 'image_url',
+    'seller_id', 'buyer_id', 'status', 'date_added', 'date_sold',
+)
+PURCHASE_FIELDS = (
+    'id', 'buyer_id', 'item_id', 'purchase_date', 'purchase_price', 'payment_intent_id',
+    'item_title', 'item_description', 'item_category', 'item_image_url', 'item_date_added',
+    'seller_id', 'seller_username', 'seller_email',
+)
+
+# Named shapes for populate_test_data. ``seller_skew`` is the exponent of the
+# seller draw (1 = uniform, higher = more listings with a few power sellers)
+# and ``category_weights`` follow CATALOGUE's order.
+PROFILES = {
+    'small': {'items': 1000, 'users': 20, 'sold_ratio': 0.2, 'seller_skew': 2},
+    'medium': {'items': 50000, 'users': 500, 'sold_ratio': 0.25, 'seller_skew': 3},
+    'large': {'items': 1000000, 'users': 10000, 'sold_ratio': 0.2, 'seller_skew': 3},
+    'skewed': {
+        'items': 200000,
+        'users': 2000,
+        'sold_ratio': 0.4,
+        'seller_skew': 6,
+        'category_weights': [55, 20, 12, 10, 3],
+    },
+}
+
+NULL = r'\N'
+
+
+def next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+def make_plan(items, users, purchases, seed=42, days=365, batch_size=10000, user_prefix='load_', now=None,
+              seller_skew=3, category_weights=None):
+    """Everything a worker needs to generate any batch, as a picklable dict."""
+    return {
+        'items': items,
+        'users': users,
+        'purchases': purchases,
+        'seed': seed,
+        'days': days,
+        'batch_size': batch_size,
+        'user_prefix': user_prefix,
+        'seller_skew': seller_skew,
+        'category_weights': category_weights,
+        'now': now or timezone.now(),
+        'first_user_id': next_id(get_user_model()),
+        'first_item_id': next_id(Item),
+        'first_purchase_id': next_id(Purchase),
+    }
+
+
+def batch_count(plan):
+    return -(-plan['items'] // plan['batch_size'])
+
+
+def is_sold(plan, index):
+    """Spread exactly ``purchases`` sales evenly over the item indexes."""
+    return (index + 1) * plan['purchases'] // plan['items'] > index * plan['purchases'] // plan['items']
+
+
+def generate_batch(plan, batch):
+    """Return ``(item_rows, purchase_rows)`` for batch number ``batch``, in ITEM/PURCHASE_FIELDS order."""
+    rng = random.Random(f"{plan['seed']}:{batch}")
+    categories = list(CATALOGUE)
+    user_count = plan['users']
+    start = batch * plan['batch_size']
+    stop = min(start + plan['batch_size'], plan['items'])
+
+    items, purchases = [], []
+    for index in range(start, stop):
+        if plan['category_weights']:
+            category = rng.choices(categories, plan['category_weights'])[0]
+        else:
+            category = rng.choice(categories)
+        spec = CATALOGUE[category]
+        name = rng.choice(spec['items'])
+        material = rng.choice(MATERIALS)
+        low, high = spec['price_range']
+        item_id = plan['first_item_id'] + index
+        # Raising the draw to a power gives a long tail: a few power sellers own most listings
+        seller_id = plan['first_user_id'] + int(user_count * rng.random() ** plan['seller_skew'])
+        date_added = plan['now'] - timedelta(seconds=rng.randrange(plan['days'] * 86400))
+        price = Decimal(rng.randint(low * 100, high * 100)) / 100
+        title = f"{rng.choice(BRANDS)} {material} {name}"
+        image_url = f"https://picsum.photos/seed/{item_id}/400/300"
+
+        buyer_id = date_sold = None
+        status = 'on_sale'
+        if is_sold(plan, index):
+            status = 'sold'
+            buyer_id = plan['first_user_id'] + rng.randrange(user_count)
+            date_sold = min(date_added + timedelta(hours=rng.randint(1, 240)), plan['now'])
+        description = f"{material.capitalize()} {name.lower()}. {rng.choice(CONDITIONS)}"
+
+        if buyer_id is not None:
+            purchase_id = plan['first_purchase_id'] + index * plan['purchases'] // plan['items']
+            seller_username = f"{plan['user_prefix']}{seller_id - plan['first_user_id']}"
+            purchases.append((
+                purchase_id, buyer_id, item_id, date_sold, price, None,
+                title, description, category, image_url, date_added, seller_id, seller_username,
+                f"{seller_username}@shop.aa",
+            ))
+        items.append((
+            item_id,
+            title,
+            description,
+            price,
+            category,
+            image_url,
+            seller_id,
+            buyer_id,
+            status,
+            date_added,
+            date_sold,
+        ))
+    return items, purchases
+
+
+def create_users(plan, password_hash):
+    """Bulk-create the plan's users, all sharing one precomputed password hash."""
+    User = get_user_model()
+    rng = random.Random(f"{plan['seed']}:users")
+    users = (
+        User(
+            id=plan['first_user_id'] + i,
+            username=f"{plan['user_prefix']}{i}",
+            email=f"{plan['user_prefix']}{i}@shop.aa",
+            password=password_hash,
+            date_joined=plan['now'] - timedelta(seconds=rng.randrange(2 * plan['days'] * 86400)),
+        )
+        for i in range(plan['users'])
+    )
+    User.objects.bulk_create(users, batch_size=plan['batch_size'])
+
+
+class BatchWriter:
+    """Convert generated row tuples to database values and stream them into a model's table."""
+
+    def __init__(self, model, fields):
+        # The concrete connection, not the thread-local proxy: prepare() runs per value
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        by_attname = {field.attname: field for field in model._meta.concrete_fields}
+        self.fields = [by_attname[name] for name in fields]
+        quote = self.connection.ops.quote_name
+        self.sql = (
+            f'{quote(model._meta.db_table)} ({", ".join(quote(field.column) for field in self.fields)})'
+        )
+
+    def prepare(self, row):
+        return [field.get_db_prep_save(value, self.connection) for field, value in zip(self.fields, row)]
+
+    def write(self, rows):
+        """Insert rows that have already been through ``prepare()``."""
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            if self.connection.vendor == 'postgresql':
+                with cursor.cursor.copy(f'COPY {self.sql} FROM STDIN') as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                placeholders = ', '.join(['%s'] * len(self.fields))
+                cursor.executemany(
+                    f'INSERT INTO {self.sql} VALUES ({placeholders})',
+                    rows,
+                )
+
+
+@lru_cache(maxsize=None)
+def writers():
+    return BatchWriter(Item, ITEM_FIELDS), BatchWriter(Purchase, PURCHASE_FIELDS)
+
+
+def prepared_batch(plan, batch):
+    """``generate_batch()`` converted to database values, so workers take on that cost too."""
+    item_writer, purchase_writer = writers()
+    items, purchases = generate_batch(plan, batch)
+    return [item_writer.prepare(row) for row in items], [purchase_writer.prepare(row) for row in purchases]
+
+
+def write_batch(batch_rows):
+    item_writer, purchase_writer = writers()
+    items, purchases = batch_rows
+    with transaction.atomic():
+        item_writer.write(items)
+        purchase_writer.write(purchases)
+
+
+def tune_connection():
+    if connection.vendor == 'sqlite':
+        # A larger page cache (256 MB) keeps index pages resident while rows with
+        # random dates go in; SQLite's default is 2 MB
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size = -262144')
+
+
+def reset_sequences():
+    """Move PostgreSQL id sequences past the explicitly numbered rows (no-op elsewhere)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [get_user_model(), Item, Purchase])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def run(plan, password_hash, workers=1, progress=None):
+    """
+    Create the plan's users, then generate and write every item batch,
+    using ``workers`` processes to generate. ``progress(rows_done)`` is
+    called after each batch is committed.
+    """
+    with transaction.atomic():
+        create_users(plan, password_hash)
+
+    generate = partial(prepared_batch, plan)
+    batches = batch_count(plan)
+
+    def written(batch):
+        if progress:
+            progress(min((batch + 1) * plan['batch_size'], plan['items']))
+
+    if workers == 1:
+        tune_connection()
+        for batch in range(batches):
+            write_batch(generate(batch))
+            written(batch)
+    else:
+        # Workers only build rows; this process is the single writer. Batches
+        # are requested a window at a time so finished ones don't pile up in
+        # memory when the database is slower than the generators.
+        connections.close_all()
+        tune_connection()
+        window = workers * 4
+        with multiprocessing.Pool(workers, initializer=django.setup) as pool:
+            for start in range(0, batches, window):
+                batch_range = range(start, min(start + window, batches))
+                for batch, rows in zip(batch_range, pool.imap(generate, batch_range)):
+                    write_batch(rows)
+                    written(batch)
+
+    reset_sequences()
+
+
+def fixture_models():
+    return [get_user_model(), Item, Purchase]
+
+
+def export_fixture(plan, directory):
+    """
+    Write the rows ``plan`` created to ``<table>.csv.gz`` files in
+    ``directory``, plus a ``manifest.json`` describing them.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    ranges = {
+        get_user_model(): (plan['first_user_id'], plan['users']),
+        Item: (plan['first_item_id'], plan['items']),
+        Purchase: (plan['first_purchase_id'], plan['purchases']),
+    }
+    tables = {}
+    for model in fixture_models():
+        first, count = ranges[model]
+        fields = [field.attname for field in model._meta.concrete_fields if field.name != 'search_vector']
+        rows = model.objects.filter(pk__gte=first, pk__lt=first + count).order_by('pk').values_list(*fields)
+        with gzip.open(directory / f'{model._meta.db_table}.csv.gz', 'wt', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(fields)
+            for row in rows.iterator(chunk_size=plan['batch_size']):
+                writer.writerow([NULL if value is None else value for value in row])
+        tables[model._meta.db_table] = count
+
+    manifest = {key: plan[key] for key in ('items', 'users', 'purchases', 'seed', 'seller_skew', 'category_weights')}
+    manifest['tables'] = tables
+    (directory / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+
+
+def load_fixture(directory, batch_size=10000, progress=None):
+    """Stream an ``export_fixture()`` directory into the database; returns the manifest."""
+    directory = Path(directory)
+    manifest = json.loads((directory / 'manifest.json').read_text())
+    tune_connection()
+    for model in fixture_models():
+        table = model._meta.db_table
+        with gzip.open(directory / f'{table}.csv.gz', 'rt', newline='') as handle:
+            reader = csv.reader(handle)
+            writer = BatchWriter(model, next(reader))
+            batch, loaded = [], 0
+            for row in reader:
+                batch.append(writer.prepare([
+                    None if value == NULL else field.to_python(value)
+                    for field, value in zip(writer.fields, row)
+                ]))
+                if len(batch) == batch_size:
+                    with transaction.atomic():
+                        writer.write(batch)
+                    loaded += len(batch)
+                    batch = []
+                    if progress:
+                        progress(table, loaded)
+            with transaction.atomic():
+                writer.write(batch)
+            if progress and batch:
+                progress(table, loaded + len(batch))
+    reset_sequences()
+    return manifest
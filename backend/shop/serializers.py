@@ -1,17 +1,207 @@
+import datetime
+import decimal
+from operator import attrgetter
+
 from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import ISO_8601, api_settings
 from .models import Item, CartItem, Purchase
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
 
 User = get_user_model()
 
 
+def decimal_formatter(field):
+    """``DecimalField.to_representation`` with the quantum and context worked out once."""
+    if (
+        not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        or field.localize or field.normalize_output or field.decimal_places is None
+    ):
+        return None
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def format_decimal(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(quantum, rounding=rounding, context=context):f}'
+    return format_decimal
+
+
+def datetime_formatter(field, tz):
+    """``DateTimeField.to_representation`` for ISO 8601 output of aware datetimes in ``tz``."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, 'timezone') or tz is None:
+        return None
+
+    def format_datetime(value):
+        if type(value) is not datetime.datetime or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return format_datetime
+
+
+def choice_formatter(field):
+    mapping = field.choice_strings_to_values
+
+    def format_choice(value):
+        if type(value) is str and value:
+            return mapping.get(value, value)
+        return field.to_representation(value)
+    return format_choice
+
+
+_SKIP = object()
+
+
+def _identity(instance):
+    return instance
+
+
+def field_getter(field):
+    """``field.get_attribute()``, with ``SkipField`` and empty related pks as return values."""
+    def get(instance):
+        try:
+            value = field.get_attribute(instance)
+        except serializers.SkipField:
+            return _SKIP
+        if isinstance(value, PKOnlyObject) and value.pk is None:
+            return None
+        return value
+    return get
+
+
+def compile_serializer(serializer, tz):
+    """
+    Turn ``serializer.to_representation`` into a plain function of the instance.
+
+    Each readable field becomes an attribute getter and a formatter, picked
+    once, so DRF's per-field dispatch isn't repeated for every row. Field
+    types without a fast formatter keep their own ``to_representation``, and
+    fields that override ``get_attribute`` keep that too, so the output is
+    the same either way. Returns ``(function, reusable)``; the function is
+    reusable for other serializers of the same class unless it calls methods
+    of this serializer's fields, which may read its context.
+    """
+    if type(serializer).to_representation is not serializers.Serializer.to_representation:
+        return serializer.to_representation, False
+
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    # Model fields and properties are read straight off the instance; anything
+    # else (methods, dotted sources, dicts) goes through the field's own get_attribute()
+    model_fields = set()
+    if model:
+        model_fields = {name for field in model._meta.concrete_fields for name in (field.name, field.attname)}
+    plan = []
+    reusable = True
+    for field in serializer._readable_fields:
+        if type(field).get_attribute is not serializers.Field.get_attribute:
+            get, reusable = field_getter(field), False
+        elif field.source in model_fields:
+            get = attrgetter(field.source)
+        elif field.source == '*':
+            get = _identity
+        elif isinstance(getattr(model, field.source, None), property):
+            get = attrgetter(field.source)
+        else:
+            get, reusable = field_getter(field), False
+
+        if isinstance(field, serializers.Serializer):
+            format_value, nested_reusable = compile_serializer(field, tz)
+            reusable = reusable and nested_reusable
+        elif type(field) in (serializers.CharField, serializers.EmailField, serializers.URLField):
+            format_value = str
+        elif type(field) is serializers.IntegerField:
+            format_value = int
+        elif type(field) is serializers.ChoiceField:
+            format_value = choice_formatter(field)
+        elif isinstance(field, serializers.DecimalField):
+            format_value = decimal_formatter(field)
+        elif isinstance(field, serializers.DateTimeField):
+            format_value = datetime_formatter(field, tz)
+        else:
+            format_value = None
+        if format_value is None:
+            format_value, reusable = field.to_representation, False
+        plan.append((field.field_name, get, format_value))
+
+    def to_representation(instance):
+        ret = {}
+        for name, get, format_value in plan:
+            value = get(instance)
+            if value is None:
+                ret[name] = None
+            elif value is not _SKIP:
+                ret[name] = format_value(value)
+        return ret
+    return to_representation, reusable
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """
+    ``many=True`` serialization for the read-only list endpoints.
+
+    Same output as ``ListSerializer``, but the child serializer is compiled
+    (``compile_serializer``) instead of walking its fields through DRF for
+    every row, which is most of the CPU time of a 100-item page. Compiled
+    serializers are kept per class and time zone, which assumes the
+    child's fields don't change between instances of its class.
+    """
+    _compiled = {}
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        key = (type(self.child), tz)
+        to_representation = self._compiled.get(key)
+        if to_representation is None:
+            to_representation, reusable = compile_serializer(self.child, tz)
+            if reusable:
+                self._compiled[key] = to_representation
+        return [to_representation(item) for item in iterable]
+
+class EagerLoadingMixin:
+    """Lets a serializer declare the relations it walks so views can load them in bulk."""
+    select_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        return queryset
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class RequestUserSerializer(UserSerializer):
+    """
+    A user relation that is usually the requesting user, e.g. the buyer of
+    the user's own purchases: ``request.user`` is serialized in that case
+    instead of loading the same user again for every row.
+    """
+
+    def get_attribute(self, instance):
+        request = self.context.get('request')
+        user_id = getattr(instance, self.source_attrs[-1] + '_id')
+        if request is not None and user_id == request.user.pk:
+            return request.user
+        return super().get_attribute(instance)
+
+
+class ItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('seller', 'buyer')
+    
     seller = UserSerializer(read_only=True)
     buyer = UserSerializer(read_only=True)
     
@@ -19,6 +209,7 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = ['id', 'title', 'description', 'price', 'category', 'image_url', 'seller', 'buyer', 'status', 'date_added', 'date_sold']
         read_only_fields = ['seller', 'buyer', 'date_added', 'date_sold']
+        list_serializer_class = FastListSerializer
 
 
 class ItemCreateSerializer(serializers.ModelSerializer):
@@ -27,19 +218,100 @@ class ItemCreateSerializer(serializers.ModelSerializer):
         fields = ['title', 'description', 'price', 'category', 'image_url']
 
 
-class PurchaseSerializer(serializers.ModelSerializer):
-    buyer = UserSerializer(read_only=True)
-    item = ItemSerializer(read_only=True)
+class PurchasedItemSellerSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='seller_id', read_only=True)
+    username = serializers.CharField(source='seller_username', read_only=True)
+    email = serializers.EmailField(source='seller_email', read_only=True)
+
+    class Meta:
+        model = Purchase
+        fields = ['id', 'username', 'email']
+
+
+class PurchasedItemSerializer(serializers.ModelSerializer):
+    """The item as it was at checkout, in ``ItemSerializer``'s shape, read from the purchase's snapshot columns."""
+    id = serializers.IntegerField(source='listing_id', read_only=True)
+    title = serializers.CharField(source='item_title', read_only=True)
+    description = serializers.CharField(source='item_description', read_only=True)
+    price = serializers.DecimalField(source='purchase_price', max_digits=10, decimal_places=2, read_only=True)
+    category = serializers.CharField(source='item_category', read_only=True)
+    image_url = serializers.URLField(source='item_image_url', read_only=True)
+    seller = PurchasedItemSellerSerializer(source='*', read_only=True)
+    buyer = RequestUserSerializer(read_only=True)
+    status = serializers.CharField(source='item_status', read_only=True)
+    date_added = serializers.DateTimeField(source='item_date_added', read_only=True)
+    date_sold = serializers.DateTimeField(source='purchase_date', read_only=True)
+
+    class Meta:
+        model = Purchase
+        fields = [
+            'id', 'title', 'description', 'price', 'category', 'image_url', 'seller', 'buyer', 'status',
+            'date_added', 'date_sold',
+        ]
+
+
+class PurchaseSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """
+    A purchase and its item snapshot, serialized from the purchase row alone.
+
+    ``buyer`` is taken from ``request.user`` when the serializer has the request in its context.
+    """
+    buyer = RequestUserSerializer(read_only=True)
+    item = PurchasedItemSerializer(source='*', read_only=True)
     
     class Meta:
         model = Purchase
         fields = ['id', 'buyer', 'item', 'purchase_date', 'purchase_price', 'payment_intent_id']
         read_only_fields = ['buyer', 'purchase_date']
+        list_serializer_class = FastListSerializer
+
+
+class PriceChangeSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
+    added_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
 
+class CartSummarySerializer(serializers.Serializer):
+    """Output of ``shop.cart.cart_summary()``."""
+    item_count = serializers.IntegerField()
+    available_count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    unavailable_items = serializers.ListField(child=serializers.IntegerField())
+    price_changes = PriceChangeSerializer(many=True)
 
-class CartItemSerializer(serializers.ModelSerializer):
+
+class CartBatchSerializer(serializers.Serializer):
+    """Item ids to add to and remove from the cart in one request."""
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), max_length=100, required=False, default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), max_length=100, required=False, default=list
+    )
+
+    def validate(self, data):
+        both = set(data['add']) & set(data['remove'])
+        if both:
+            raise serializers.ValidationError(f'Items both added and removed: {sorted(both)}')
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError('Nothing to add or remove')
+        return data
+
+
+class MyItemsSummarySerializer(serializers.Serializer):
+    on_sale = serializers.IntegerField()
+    sold = serializers.IntegerField()
+    purchased = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('item__seller', 'item__buyer')
+    
     item = ItemSerializer(read_only=True)
     
     class Meta:
         model = CartItem
         fields = ['id', 'item', 'date_added']
+        list_serializer_class = FastListSerializer
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from .models import Item
+from . import response_cache, search
+
+User = get_user_model()
+
+# Sent by checkout after purchases are bulk-created (which skips post_save),
+# with ``purchases`` holding the new Purchase objects
+purchases_created = Signal()
+
+
+@receiver(post_save, sender=Item)
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Saves that only touch status/buyer fields leave the indexed text unchanged
+    if update_fields is not None and not {'title', 'description'} & set(update_fields):
+        return
+    search.index_item(instance)
+
+
+@receiver(post_delete, sender=Item)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex_item(instance.pk)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_cached_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        response_cache.invalidate_items([instance.pk])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_responses_with_user(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # Item responses embed the seller's and buyer's username and email; a new
+    # user isn't in any of them and a login only saves last_login
+    if raw or created:
+        return
+    if update_fields is not None and not {'username', 'email'} & set(update_fields):
+        return
+    response_cache.invalidate_users()
+
+
+@receiver(purchases_created)
+def invalidate_purchased_items(sender, purchases, **kwargs):
+    # Checkout marks items sold with QuerySet.update(), which sends no post_save
+    response_cache.invalidate_items([purchase.item_id for purchase in purchases])
@@ -1,3 +1,980 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .archive import archive_batch
+from .cart import cart_summary, invalidate_cart
+from .checkout import checkout_cart, CheckoutConflict
+from .models import ArchivedItem, Item, CartItem, Purchase
+from .payments import FakeGateway, get_gateway
+from .renderers import FastJSONRenderer
+from .serializers import CartItemSerializer, FastListSerializer, ItemSerializer, PurchaseSerializer
+from .views import MyItemsAPIView
+from . import async_views, response_cache
+
+User = get_user_model()
+
+
+class QueryBudgetMixin:
+    """Helpers for asserting that an endpoint runs a fixed number of queries."""
+
+    def create_items(self, count, seller, buyer=None, **extra):
+        items = [
+            Item(
+                title=f'Item {i}',
+                description='Test item',
+                price=Decimal('10.00') + i,
+                seller=seller,
+                buyer=buyer,
+                **extra
+            )
+            for i in range(count)
+        ]
+        items = Item.objects.bulk_create(items)
+        response_cache.invalidate_catalogue()  # bulk_create sends no post_save
+        return items
+
+    def count_queries(self, url, client=None):
+        client = client or self.client
+        cache.clear()  # measure the uncached path
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def assertQueryBudget(self, budget, url, grow, client=None):
+        """Hit ``url`` before and after ``grow()`` adds rows; the query count must not change."""
+        before = self.count_queries(url, client)
+        grow()
+        after = self.count_queries(url, client)
+        self.assertLessEqual(before, budget, f'{url} ran {before} queries, budget is {budget}')
+        self.assertEqual(before, after, f'{url} query count grew from {before} to {after}')
+
+
+class EndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.auth_client = APIClient()
+        self.auth_client.force_authenticate(self.buyer)
+
+    def _grow_purchases(self, count):
+        items = self.create_items(count, self.seller, buyer=self.buyer, status='sold')
+        Purchase.objects.bulk_create([
+            Purchase.for_item(item, buyer=self.buyer, purchase_price=item.price) for item in items
+        ])
+
+    def test_item_list(self):
+        self.create_items(2, self.seller)
+        self.assertQueryBudget(2, '/api/shop/items/?page_size=100', lambda: self.create_items(98, self.seller))
+
+    def test_item_detail(self):
+        item = self.create_items(1, self.seller, buyer=self.buyer, status='sold')[0]
+        self.assertEqual(self.count_queries(f'/api/shop/items/{item.pk}/'), 1)
+
+    def test_cart(self):
+        def grow():
+            CartItem.objects.bulk_create([
+                CartItem(user=self.buyer, item=item) for item in self.create_items(20, self.seller)
+            ])
+        grow()
+        self.assertQueryBudget(2, '/api/shop/cart/', grow, self.auth_client)
+
+    def test_purchase_history(self):
+        self._grow_purchases(2)
+        self.assertQueryBudget(2, '/api/shop/purchases/?page_size=100', lambda: self._grow_purchases(50), self.auth_client)
+
+    def test_my_items(self):
+        def grow():
+            self.create_items(10, self.buyer)
+            self.create_items(10, self.buyer, buyer=self.seller, status='sold')
+            self._grow_purchases(10)
+        grow()
+        # Sold items span Item and ArchivedItem; the summary is one query over all three tables
+        self.assertQueryBudget(5, '/api/shop/my-items/', grow, self.auth_client)
+        for section, budget in (('on_sale', 3), ('sold', 4), ('purchased', 3)):
+            self.assertQueryBudget(budget, f'/api/shop/my-items/?section={section}', grow, self.auth_client)
+
+
+class KeysetPaginationTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.client = APIClient()
+        items = self.create_items(25, self.seller)
+        # Several rows share a price so the id tie-breaker is exercised
+        for item in items[:10]:
+            item.price = Decimal('5.00')
+        Item.objects.bulk_update(items[:10], ['price'])
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            pages.append(response.data)
+            url = response.data['next']
+        return ids, pages
+
+    def test_walks_every_item_once_in_order(self):
+        for ordering in ['-date_added', 'date_added', 'price', '-price', 'title']:
+            ids, _ = self.walk(f'/api/shop/items/?pagination=cursor&page_size=4&ordering={ordering}')
+            expected = Item.objects.order_by(ordering, ordering.replace(ordering.lstrip('-'), 'id'))
+            self.assertEqual(ids, list(expected.values_list('id', flat=True)), ordering)
+
+    def test_previous_link_returns_prior_page(self):
+        _, pages = self.walk('/api/shop/items/?pagination=cursor&page_size=4&ordering=price')
+        self.assertIsNone(pages[0]['previous'])
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.data['results'], pages[1]['results'])
+
+    def test_skips_count_query(self):
+        self.assertEqual(self.count_queries('/api/shop/items/?pagination=cursor'), 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/shop/items/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_payloads(self):
+        self.create_items(3, self.seller)
+        for payload in ({'v': {}, 'id': 1}, {'v': 5, 'id': 1}, {'v': '2024-01-01T00:00:00Z', 'id': '1'}, [1, 2]):
+            token = urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get(f'/api/shop/items/?cursor={token}')
+            self.assertEqual(response.status_code, 404, payload)
+
+
+class ExplainQueriesCommandTests(TestCase):
+    def test_key_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        self.assertIn('All key queries use index scans', out.getvalue())
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.client = APIClient()
+        self.boots = Item.objects.create(
+            title='Leather boots', description='Brown boots', price=Decimal('80.00'), seller=self.seller
+        )
+        self.bag = Item.objects.create(
+            title='Canvas tote', description='Goes well with leather boots', price=Decimal('20.00'), seller=self.seller
+        )
+        Item.objects.create(title='Silk scarf', description='Blue', price=Decimal('15.00'), seller=self.seller)
+
+    def search(self, query):
+        response = self.client.get('/api/shop/items/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search('leather boots'), [self.boots.pk, self.bag.pk])
+
+    def test_prefix_match_and_legacy_param(self):
+        self.assertEqual(self.search('leath'), [self.boots.pk, self.bag.pk])
+        response = self.client.get('/api/shop/items/', {'search': 'scarf'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(self.search('"scarf* OR'), [])
+        self.assertEqual(len(self.search('---')), 3)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.boots.title = 'Suede loafers'
+        self.boots.save()
+        self.assertEqual(self.search('loafers'), [self.boots.pk])
+        self.boots.delete()
+        self.assertEqual(self.search('loafers'), [])
+
+
+@override_settings(SHARED_CACHE=True)
+class ResponseCacheTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.item = Item.objects.create(title='Lamp', description='', price=Decimal('30.00'), seller=self.seller)
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **headers)
+        return response, len(ctx.captured_queries)
+
+    def test_hits_skip_the_database(self):
+        first, queries = self.get('/api/shop/items/?category=home&page=1')
+        self.assertGreater(queries, 0)
+        second, queries = self.get('/api/shop/items/?page=1&category=home&utm_source=mail')
+        self.assertEqual(queries, 0)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+        _, queries = self.get('/api/shop/items/?category=shoes')
+        self.assertGreater(queries, 0)
+
+    def test_item_writes_invalidate(self):
+        self.get('/api/shop/items/')
+        self.get(f'/api/shop/items/{self.item.pk}/')
+        self.item.title = 'Desk lamp'
+        self.item.save()
+        self.assertEqual(self.get('/api/shop/items/')[0].data['results'][0]['title'], 'Desk lamp')
+        self.assertEqual(self.get(f'/api/shop/items/{self.item.pk}/')[0].data['title'], 'Desk lamp')
+
+        other = Item.objects.create(title='Rug', description='', price=Decimal('60.00'), seller=self.seller)
+        self.get(f'/api/shop/items/{other.pk}/')
+        # Other items' detail responses stay cached
+        self.assertEqual(self.get(f'/api/shop/items/{self.item.pk}/')[1], 0)
+
+        self.item.delete()
+        self.assertEqual(self.get('/api/shop/items/')[0].data['count'], 1)
+
+    def test_user_updates_invalidate(self):
+        self.get('/api/shop/items/')
+        self.get(f'/api/shop/items/{self.item.pk}/')
+        self.seller.last_login = timezone.now()
+        self.seller.save(update_fields=['last_login'])
+        self.assertEqual(self.get(f'/api/shop/items/{self.item.pk}/')[1], 0)
+
+        self.seller.username = 'renamed'
+        self.seller.email = 'renamed@example.com'
+        self.seller.save()
+        seller = {'id': self.seller.pk, 'username': 'renamed', 'email': 'renamed@example.com'}
+        self.assertEqual(self.get('/api/shop/items/')[0].data['results'][0]['seller'], seller)
+        self.assertEqual(self.get(f'/api/shop/items/{self.item.pk}/')[0].data['seller'], seller)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_needs_a_shared_cache(self):
+        self.get('/api/shop/items/')
+        response, queries = self.get('/api/shop/items/')
+        self.assertGreater(queries, 0)
+        self.assertNotIn('ETag', response)
+        with override_settings(SHARED_CACHE=True, CATALOGUE_CACHE_TTL=0):
+            self.get('/api/shop/items/')
+            self.assertGreater(self.get('/api/shop/items/')[1], 0)
+
+    @override_settings(PAYMENT_GATEWAY='fake')
+    def test_checkout_invalidates(self):
+        self.get('/api/shop/items/')
+        self.get(f'/api/shop/items/{self.item.pk}/')
+        CartItem.objects.create(user=self.buyer, item=self.item)
+        checkout_cart(self.buyer)
+        self.assertEqual(self.get('/api/shop/items/')[0].data['count'], 0)
+        self.assertEqual(self.get(f'/api/shop/items/{self.item.pk}/')[0].data['status'], 'sold')
+
+    def test_conditional_requests(self):
+        response, _ = self.get('/api/shop/items/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response, queries = self.get('/api/shop/items/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 0)
+        self.assertEqual(response.content, b'')
+
+        last_modified = response['Last-Modified']
+        response, _ = self.get('/api/shop/items/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        self.item.save()
+        response, _ = self.get('/api/shop/items/', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_errors_and_other_formats_are_not_cached(self):
+        self.assertEqual(self.get('/api/shop/items/999999/')[0].status_code, 404)
+        self.assertGreater(self.get('/api/shop/items/999999/')[1], 0)
+        response, _ = self.get('/api/shop/items/', HTTP_ACCEPT='text/html')
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(PAYMENT_GATEWAY='fake')
+class CheckoutTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.rival = User.objects.create_user(username='rival', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def fill_cart(self, user, items):
+        CartItem.objects.bulk_create([CartItem(user=user, item=item) for item in items])
+
+    def pay(self):
+        return self.client.post('/api/shop/cart/pay/', {'payment_intent_id': 'pi_fake_test'}, format='json')
+
+    def test_marks_items_sold_and_records_purchases(self):
+        items = self.create_items(3, self.seller)
+        self.fill_cart(self.buyer, items)
+        response = self.pay()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['purchased_items']), sorted(item.pk for item in items))
+        self.assertFalse(CartItem.objects.filter(user=self.buyer).exists())
+        for item in Item.objects.filter(pk__in=[item.pk for item in items]):
+            self.assertEqual((item.status, item.buyer_id), ('sold', self.buyer.pk))
+            self.assertIsNotNone(item.date_sold)
+        self.assertEqual(Purchase.objects.filter(buyer=self.buyer, payment_intent_id='pi_fake_test').count(), 3)
+
+    def test_already_sold_item_is_a_conflict(self):
+        items = self.create_items(2, self.seller)
+        self.fill_cart(self.buyer, items)
+        self.fill_cart(self.rival, items[:1])
+        checkout_cart(self.rival)
+
+        response = self.pay()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['unavailable_items'], [items[0].pk])
+        # Nothing from the failed checkout is written
+        self.assertFalse(Purchase.objects.filter(buyer=self.buyer).exists())
+        self.assertEqual(Item.objects.get(pk=items[1].pk).status, 'on_sale')
+        self.assertEqual(CartItem.objects.filter(user=self.buyer).count(), 2)
+
+    def test_history_keeps_the_item_as_it_was_at_checkout(self):
+        items = self.create_items(2, self.seller, category='bags', image_url='https://example.com/a.jpg')
+        User.objects.filter(pk=self.seller.pk).update(email='seller@example.com')
+        self.fill_cart(self.buyer, items)
+        self.assertEqual(self.pay().status_code, 200)
+        Item.objects.filter(pk=items[0].pk).update(title='Renamed', price=Decimal('99.00'))
+        User.objects.filter(pk=self.seller.pk).update(email='renamed@example.com')
+        Item.objects.get(pk=items[1].pk).delete()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/shop/purchases/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in ctx.captured_queries if 'JOIN' in query['sql']])
+        history = sorted(response.json()['results'], key=lambda purchase: purchase['item']['title'])
+        buyer = {'id': self.buyer.pk, 'username': 'buyer', 'email': ''}
+        seller = {'id': self.seller.pk, 'username': 'seller', 'email': 'seller@example.com'}
+        date_added = serializers.DateTimeField().to_representation
+        self.assertEqual([purchase['buyer'] for purchase in history], [buyer, buyer])
+        self.assertEqual([purchase['item'] for purchase in history], [
+            {
+                'id': items[0].pk, 'title': 'Item 0', 'description': 'Test item', 'price': '10.00',
+                'category': 'bags', 'image_url': 'https://example.com/a.jpg',
+                'seller': seller, 'buyer': buyer, 'status': 'sold',
+                'date_added': date_added(items[0].date_added), 'date_sold': history[0]['purchase_date'],
+            },
+            {
+                'id': None, 'title': 'Item 1', 'description': 'Test item', 'price': '11.00',
+                'category': 'bags', 'image_url': 'https://example.com/a.jpg',
+                'seller': seller, 'buyer': buyer, 'status': 'sold',
+                'date_added': date_added(items[1].date_added), 'date_sold': history[1]['purchase_date'],
+            },
+        ])
+
+    def test_history_item_has_the_item_endpoint_shape(self):
+        item = self.create_items(1, self.seller)[0]
+        self.fill_cart(self.buyer, [item])
+        self.assertEqual(self.pay().status_code, 200)
+        purchased = self.client.get('/api/shop/purchases/').json()['results'][0]['item']
+        listed = ItemSerializer(Item.objects.get(pk=item.pk)).data
+        self.assertEqual(purchased.keys(), listed.keys())
+        for relation in ('seller', 'buyer'):
+            self.assertEqual(purchased[relation].keys(), listed[relation].keys(), relation)
+
+    def test_empty_cart(self):
+        self.assertEqual(self.pay().status_code, 400)
+
+    def test_query_count_does_not_grow_with_cart(self):
+        counts = []
+        for size in (1, 20):
+            self.fill_cart(self.buyer, self.create_items(size, self.seller))
+            with CaptureQueriesContext(connection) as ctx:
+                checkout_cart(self.buyer)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+@skipUnless(connection.features.has_select_for_update, 'needs row locks')
+class ConcurrentCheckoutTests(QueryBudgetMixin, TransactionTestCase):
+    def test_only_one_buyer_wins(self):
+        seller = User.objects.create_user(username='seller', password='pass12345')
+        item = self.create_items(1, seller)[0]
+        buyers = [User.objects.create_user(username=f'buyer{i}', password='pass12345') for i in range(4)]
+        CartItem.objects.bulk_create([CartItem(user=buyer, item=item) for buyer in buyers])
+
+        barrier = threading.Barrier(len(buyers))
+        results = []
+
+        def attempt(buyer):
+            barrier.wait()
+            try:
+                checkout_cart(buyer)
+                results.append('ok')
+            except CheckoutConflict:
+                results.append('conflict')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(buyer,)) for buyer in buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), ['conflict'] * 3 + ['ok'])
+        self.assertEqual(Purchase.objects.filter(item=item).count(), 1)
+
+
+@override_settings(PAYMENT_GATEWAY='fake')
+class PaymentGatewayTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.items = self.create_items(2, self.seller)
+        CartItem.objects.bulk_create([CartItem(user=self.buyer, item=item) for item in self.items])
+
+    def create_intent(self):
+        response = self.client.post('/api/shop/create-payment-intent/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_unchanged_cart_reuses_open_intent(self):
+        gateway = get_gateway()
+        # The view is async when ASYNC_VIEWS is on
+        with mock.patch.object(FakeGateway, '_create', wraps=gateway._create) as create, \
+                mock.patch.object(FakeGateway, '_acreate', wraps=gateway._acreate) as acreate:
+            first = self.create_intent()
+            second = self.create_intent()
+        self.assertEqual(first['client_secret'], second['client_secret'])
+        self.assertEqual(first['amount'], Decimal('21.00'))
+        self.assertEqual(create.call_count + acreate.call_count, 1)
+
+    def test_changed_cart_gets_new_intent(self):
+        first = self.create_intent()
+        self.client.delete(f'/api/shop/cart/remove/{self.items[0].pk}/')
+        self.assertNotEqual(first['client_secret'], self.create_intent()['client_secret'])
+
+    @override_settings(SHARED_CACHE=True)
+    def test_amount_ignores_cached_summary(self):
+        self.client.get('/api/shop/cart/summary/')
+        # update() sends no signals, so the cached summary still says 21.00
+        Item.objects.filter(pk=self.items[0].pk).update(price=Decimal('15.00'))
+        self.assertEqual(self.client.get('/api/shop/cart/summary/').data['total'], '21.00')
+        self.assertEqual(self.create_intent()['amount'], Decimal('26.00'))
+
+    def test_succeeded_status_is_cached(self):
+        gateway = get_gateway()
+        with mock.patch.object(FakeGateway, '_retrieve', wraps=gateway._retrieve) as retrieve:
+            self.assertTrue(gateway.is_succeeded('pi_fake_abc'))
+            self.assertTrue(gateway.is_succeeded('pi_fake_abc'))
+        self.assertEqual(retrieve.call_count, 1)
+
+    def test_pending_status_is_rechecked_before_checkout(self):
+        intent_id = self.create_intent()['client_secret'].split('_secret_')[0]
+        # The create call cached 'requires_payment_method'; pay_cart must not trust it
+        response = self.client.post('/api/shop/cart/pay/', {'payment_intent_id': intent_id}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PAYMENT_GATEWAY='fake')
+@override_settings(SHARED_CACHE=True)
+class AsyncViewTests(QueryBudgetMixin, TestCase):
+    """The async views must answer exactly like the DRF views they stand in for under ASGI."""
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.factory = RequestFactory()
+        self.items = self.create_items(5, self.seller, category='shoes')
+
+    def call(self, view, method, url, **kwargs):
+        request = getattr(self.factory, method)(url, **kwargs)
+        return async_to_sync(view)(request, **kwargs.pop('view_kwargs', {}))
+
+    def test_catalogue_reads_match_the_sync_views(self):
+        urls = [
+            '/api/shop/items/',
+            '/api/shop/items/?category=shoes&ordering=price&page_size=2&page=2',
+            '/api/shop/items/?q=item',
+            '/api/shop/items/?pagination=cursor&page_size=2',
+            '/api/shop/items/?page=99',
+        ]
+        for url in urls:
+            cache.clear()
+            expected = self.client.get(url)
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.call(async_views.item_list, 'get', url)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content), url)
+            if response.status_code == 200:
+                self.assertEqual(len(ctx.captured_queries), self.count_queries(url), url)
+
+        item = self.items[0]
+        for pk in (item.pk, 999999):
+            cache.clear()
+            expected = self.client.get(f'/api/shop/items/{pk}/')
+            cache.clear()
+            response = async_to_sync(async_views.item_detail)(self.factory.get(f'/api/shop/items/{pk}/'), pk=pk)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_catalogue_reads_without_the_cache(self):
+        pk = self.items[0].pk
+        for view, url, kwargs in [
+            (async_views.item_list, '/api/shop/items/?ordering=price', {}),
+            (async_views.item_detail, f'/api/shop/items/{pk}/', {'pk': pk}),
+            (async_views.item_detail, '/api/shop/items/999999/', {'pk': 999999}),
+        ]:
+            expected = self.client.get(url)
+            response = async_to_sync(view)(self.factory.get(url), **kwargs)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content), url)
+            self.assertNotIn('ETag', response)
+
+    def test_shares_cache_entries_with_the_sync_views(self):
+        expected = self.client.get('/api/shop/items/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.call(async_views.item_list, 'get', '/api/shop/items/', HTTP_IF_NONE_MATCH=expected['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_writes_go_to_the_drf_view(self):
+        token = AccessToken.for_user(self.seller)
+        response = self.call(
+            async_views.item_list, 'post', '/api/shop/items/',
+            data={'title': 'Boots', 'description': 'Leather', 'price': '20.00', 'category': 'shoes'},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Item.objects.filter(title='Boots', seller=self.seller).exists())
+
+    def test_payment_views(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.buyer)}'}
+        self.assertEqual(self.call(async_views.create_payment_intent, 'post', '/').status_code, 401)
+        self.assertEqual(self.call(async_views.create_payment_intent, 'post', '/', **auth).status_code, 400)
+
+        CartItem.objects.bulk_create([CartItem(user=self.buyer, item=item) for item in self.items[:2]])
+        invalidate_cart(self.buyer.pk)  # cart writes outside the views must say so
+        response = self.call(async_views.create_payment_intent, 'post', '/', **auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['amount'], 21.0)
+
+        with mock.patch.object(FakeGateway, '_aretrieve', wraps=get_gateway()._aretrieve) as retrieve:
+            response = self.call(
+                async_views.pay_cart, 'post', '/', data={'payment_intent_id': 'pi_fake_test'},
+                content_type='application/json', **auth,
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(retrieve.call_count, 1)
+        self.assertEqual(Purchase.objects.filter(buyer=self.buyer).count(), 2)
+
+
+class FastSerializationTests(QueryBudgetMixin, TestCase):
+    """The fast list path must render the same bytes as DRF's serializers and JSONRenderer."""
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345', email='s@example.com')
+        self.buyer = User.objects.create_user(username='b\u00fcyer', password='pass12345')
+        self.items = self.create_items(4, self.seller, category='bags')
+        Item.objects.filter(pk=self.items[0].pk).update(
+            title='Line\u2028separator \u00e9 "quoted" \x01', price=Decimal('10'), image_url='https://example.com/a.jpg',
+            status='sold', buyer=self.buyer, date_sold=timezone.now(),
+        )
+        CartItem.objects.bulk_create([CartItem(user=self.buyer, item=item) for item in self.items[1:]])
+        Purchase.for_item(
+            Item.objects.get(pk=self.items[0].pk), buyer=self.buyer, purchase_price=Decimal('9.5')
+        ).save()
+
+    def assertSameJSON(self, serializer_class, queryset, **kwargs):
+        rows = list(serializer_class.setup_eager_loading(queryset))
+        expected = JSONRenderer().render(serializers.ListSerializer(rows, child=serializer_class(), **kwargs).data)
+        self.assertEqual(FastJSONRenderer().render(serializer_class(rows, many=True, **kwargs).data), expected)
+
+    def test_matches_drf_output(self):
+        for tz in ('UTC', 'Europe/Helsinki'):
+            with timezone.override(tz):
+                self.assertSameJSON(ItemSerializer, Item.objects.all())
+                self.assertSameJSON(CartItemSerializer, CartItem.objects.all())
+                self.assertSameJSON(PurchaseSerializer, Purchase.objects.all())
+
+    def test_purchase_buyer_is_the_requesting_user(self):
+        request = RequestFactory().get('/')
+        request.user = self.buyer
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertSameJSON(PurchaseSerializer, Purchase.objects.all(), context={'request': request})
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_endpoints_use_the_fast_path(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        for url, serializer_class, queryset in [
+            ('/api/shop/cart/', CartItemSerializer, CartItem.objects.order_by('date_added')),
+            ('/api/shop/purchases/', PurchaseSerializer, Purchase.objects.all()),
+        ]:
+            response = self.client.get(url)
+            with mock.patch.object(FastListSerializer, 'to_representation', side_effect=AssertionError):
+                data = serializers.ListSerializer(
+                    list(serializer_class.setup_eager_loading(queryset)), child=serializer_class()
+                ).data
+            results = json.loads(response.content)
+            self.assertEqual(results.get('results', results), json.loads(JSONRenderer().render(data)))
+            self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+
+    def test_renderer_falls_back_for_decimals_and_odd_keys(self):
+        for data in ({'amount': Decimal('21.00')}, {1: 'a'}, {'big': 2 ** 70}):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+@override_settings(PAYMENT_GATEWAY='fake')
+class CartSummaryTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.rival = User.objects.create_user(username='rival', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.items = self.create_items(3, self.seller)
+        for item in self.items:
+            self.client.post(f'/api/shop/cart/add/{item.pk}/')
+
+    def summary(self):
+        response = self.client.get('/api/shop/cart/summary/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_summary(self):
+        self.assertEqual(self.summary(), {
+            'item_count': 3, 'available_count': 3, 'total': '33.00', 'unavailable_items': [], 'price_changes': [],
+        })
+
+    def test_one_query_then_cached(self):
+        with CaptureQueriesContext(connection) as ctx:
+            cart_summary(self.buyer)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        with CaptureQueriesContext(connection) as ctx:
+            cart_summary(self.buyer)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_cart_changes_invalidate(self):
+        self.summary()
+        self.client.delete(f'/api/shop/cart/remove/{self.items[0].pk}/')
+        self.assertEqual(self.summary()['item_count'], 2)
+        self.client.post(f'/api/shop/cart/add/{self.items[0].pk}/')
+        self.assertEqual(self.summary()['item_count'], 3)
+
+    def test_price_change_is_reported(self):
+        self.summary()
+        item = self.items[1]
+        item.price = Decimal('15.50')
+        item.save()
+        summary = self.summary()
+        self.assertEqual(summary['total'], '37.50')
+        self.assertEqual(summary['price_changes'], [{'item_id': item.pk, 'added_price': '11.00', 'price': '15.50'}])
+
+    def test_items_sold_to_someone_else(self):
+        self.summary()
+        CartItem.objects.create(user=self.rival, item=self.items[0])
+        checkout_cart(self.rival)
+        summary = self.summary()
+        self.assertEqual(summary['unavailable_items'], [self.items[0].pk])
+        self.assertEqual((summary['available_count'], summary['total']), (2, '23.00'))
+
+        response = self.client.post('/api/shop/create-payment-intent/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['unavailable_items'], [self.items[0].pk])
+
+
+class CartBatchTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.items = self.create_items(12, self.seller)
+
+    def batch(self, add=(), remove=(), expected_status=200):
+        response = self.client.post('/api/shop/cart/batch/', {'add': list(add), 'remove': list(remove)}, format='json')
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def test_adds_and_removes(self):
+        sold = self.create_items(1, self.seller, status='sold')[0]
+        ids = [item.pk for item in self.items]
+        self.batch(add=ids[:3])
+        data = self.batch(add=[ids[0], ids[3], sold.pk, 999999], remove=[ids[1]])
+
+        self.assertEqual(data['unavailable_items'], [sold.pk, 999999])
+        self.assertEqual(sorted(line['item']['id'] for line in data['cart']), [ids[0], ids[2], ids[3]])
+        self.assertEqual(data['summary']['item_count'], 3)
+        self.assertEqual(data['summary']['total'], '35.00')
+        self.assertEqual(
+            sorted(CartItem.objects.filter(user=self.buyer).values_list('item_id', flat=True)), [ids[0], ids[2], ids[3]]
+        )
+        self.assertEqual(data['cart'], self.client.get('/api/shop/cart/').json()['results'])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def count(add, remove):
+            with CaptureQueriesContext(connection) as ctx:
+                self.batch(add=add, remove=remove)
+            return len(ctx.captured_queries)
+
+        ids = [item.pk for item in self.items]
+        small = count(ids[:1], [])
+        self.assertEqual(count(ids[1:], []), small)
+        self.assertEqual(count(ids[:1], ids[1:]) - 1, small)  # plus the DELETE
+
+    def test_invalid_batches(self):
+        self.batch(expected_status=400)
+        self.batch(add=[self.items[0].pk], remove=[self.items[0].pk], expected_status=400)
+        self.batch(add=['abc'], expected_status=400)
+
+    def test_updates_the_cart_summary(self):
+        self.assertEqual(cart_summary(self.buyer)['item_count'], 0)
+        self.batch(add=[self.items[0].pk])
+        self.assertEqual(cart_summary(self.buyer)['item_count'], 1)
+        self.batch(remove=[self.items[0].pk])
+        self.assertEqual(cart_summary(self.buyer)['item_count'], 0)
+
+
+class MyItemsTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        self.on_sale = self.create_items(15, self.seller)
+        self.sold = self.create_items(3, self.seller, buyer=self.buyer, status='sold')
+        self.bought = self.create_items(2, self.buyer, buyer=self.seller, status='sold')
+        Purchase.objects.bulk_create(
+            [Purchase.for_item(item, buyer=self.buyer, purchase_price=item.price) for item in self.sold]
+            + [Purchase.for_item(item, buyer=self.seller, purchase_price=item.price) for item in self.bought]
+        )
+
+    def get(self, url, expected_status=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def test_summary_counts_everything(self):
+        expected = {'on_sale': 15, 'sold': 3, 'purchased': 2, 'revenue': '33.00'}
+        self.assertEqual(self.get('/api/shop/my-items/')['summary'], expected)
+        self.assertEqual(self.get('/api/shop/my-items/?section=sold')['summary'], expected)
+
+    def test_summary_matches_sections_after_listings_are_deleted(self):
+        self.sold[0].delete()
+        self.bought[0].delete()
+        data = self.get('/api/shop/my-items/')
+        summary = data['summary']
+        # The purchase outlives the listing; the sale goes with it
+        self.assertEqual(summary, {'on_sale': 15, 'sold': 2, 'purchased': 2, 'revenue': '23.00'})
+        self.assertEqual(summary['sold'], len(data['sold']))
+        self.assertEqual(summary['purchased'], len(data['purchased']))
+        self.assertEqual(self.get('/api/shop/my-items/?section=sold')['count'], summary['sold'])
+        self.assertEqual(self.get('/api/shop/my-items/?section=purchased')['count'], summary['purchased'])
+
+    def test_section_is_paginated(self):
+        data = self.get('/api/shop/my-items/?section=on_sale&page_size=10')
+        self.assertEqual(data['section'], 'on_sale')
+        self.assertEqual(data['count'], 15)
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNotNone(data['next'])
+        second = self.get('/api/shop/my-items/?section=on_sale&page_size=10&page=2')
+        ids = [item['id'] for item in data['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted(item.pk for item in self.on_sale))
+
+        self.assertEqual(self.get('/api/shop/my-items/?section=purchased')['count'], 2)
+
+    def test_combined_shape_is_capped(self):
+        data = self.get('/api/shop/my-items/')
+        self.assertEqual((len(data['on_sale']), len(data['sold']), len(data['purchased'])), (15, 3, 2))
+        with mock.patch.object(MyItemsAPIView, 'combined_limit', 5):
+            data = self.get('/api/shop/my-items/')
+        self.assertEqual(len(data['on_sale']), 5)
+        self.assertEqual(data['summary']['on_sale'], 15)
+
+    def test_unknown_section(self):
+        self.assertIn('error', self.get('/api/shop/my-items/?section=drafts', expected_status=400))
+
+
+class ArchiveTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+        self.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.other = User.objects.create_user(username='other', password='pass12345')
+        long_ago = timezone.now() - timedelta(days=400)
+        self.old = self.create_items(3, self.seller, buyer=self.buyer, status='sold', date_sold=long_ago)
+        self.recent = self.create_items(1, self.seller, buyer=self.buyer, status='sold', date_sold=timezone.now())
+        self.on_sale = self.create_items(2, self.seller)
+        Purchase.objects.bulk_create([
+            Purchase.for_item(item, buyer=self.buyer, purchase_price=item.price) for item in self.old + self.recent
+        ])
+        CartItem.objects.create(user=self.other, item=self.old[0])
+        self.client = APIClient()
+
+    def archive(self, **options):
+        out = StringIO()
+        call_command('archive_sold_items', older_than_days=30, stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_old_sold_items(self):
+        self.archive(batch_size=2)
+        old_ids = sorted(item.pk for item in self.old)
+        self.assertEqual(sorted(ArchivedItem.objects.values_list('id', flat=True)), old_ids)
+        self.assertFalse(Item.objects.filter(pk__in=old_ids).exists())
+        self.assertEqual(Item.objects.count(), 3)
+        archived = ArchivedItem.objects.get(pk=self.old[1].pk)
+        self.assertEqual((archived.title, archived.price, archived.buyer_id), ('Item 1', Decimal('11.00'), self.buyer.pk))
+        self.assertEqual(
+            sorted(Purchase.objects.filter(item__isnull=True).values_list('archived_item_id', flat=True)), old_ids
+        )
+        self.assertFalse(CartItem.objects.filter(user=self.other).exists())
+        self.assertIn('Archived 0 items', self.archive())
+
+    def test_stops_and_resumes(self):
+        self.assertIn('would be archived', self.archive(dry_run=True))
+        self.assertEqual(ArchivedItem.objects.count(), 0)
+        self.archive(batch_size=2, max_batches=1)
+        self.assertEqual(ArchivedItem.objects.count(), 2)
+        self.archive(batch_size=2)
+        self.assertEqual(ArchivedItem.objects.count(), 3)
+
+    def test_batch_query_count_does_not_grow(self):
+        CartItem.objects.all().delete()  # a cart line costs one more query in its batch
+        cutoff = timezone.now() - timedelta(days=30)
+        self.create_items(20, self.seller, buyer=self.buyer, status='sold', date_sold=cutoff - timedelta(days=1))
+        counts = []
+        for size in (1, 20):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(archive_batch(cutoff, size), size)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_history_and_my_items_span_both_tables(self):
+        self.client.force_authenticate(self.buyer)
+        history = self.client.get('/api/shop/purchases/').json()
+        self.client.force_authenticate(self.seller)
+        sold = self.client.get('/api/shop/my-items/?section=sold').json()
+        combined = self.client.get('/api/shop/my-items/').json()
+        self.archive()
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get('/api/shop/purchases/').json(), history)
+        self.client.force_authenticate(self.seller)
+        after = self.client.get('/api/shop/my-items/?section=sold&page_size=2').json()
+        self.assertEqual((after['count'], after['summary']), (sold['count'], sold['summary']))
+        self.assertEqual(after['results'][0]['id'], self.recent[0].pk)
+        rest = self.client.get('/api/shop/my-items/?section=sold&page_size=2&page=2').json()['results']
+        by_id = lambda items: sorted(items, key=lambda item: item['id'])
+        self.assertEqual(by_id(after['results'] + rest), by_id(sold['results']))
+        self.assertEqual(by_id(self.client.get('/api/shop/my-items/').json()['sold']), by_id(combined['sold']))
+
+
+class PopulateTestDataTests(TestCase):
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('id').values_list('id', 'username', 'password', 'date_joined')),
+            list(Item.objects.order_by('id').values_list(
+                'id', 'title', 'price', 'category', 'seller_id', 'buyer_id', 'status', 'date_added', 'date_sold'
+            )),
+            list(Purchase.objects.order_by('id').values_list('id', 'buyer_id', 'item_id', 'purchase_price')),
+        )
+
+    def test_profile_generates_realistic_catalogue(self):
+        call_command('populate_test_data', profile='skewed', count=2000, users=50, stdout=StringIO())
+
+        self.assertEqual(Item.objects.count(), 2000)
+        self.assertEqual(Item.objects.filter(status='sold').count(), 800)
+        self.assertEqual(Purchase.objects.count(), 800)
+        self.assertEqual(
+            set(Item.objects.values_list('category', flat=True)), {key for key, _ in Item.CATEGORY_CHOICES}
+        )
+        hottest = Item.objects.values('category').annotate(n=Count('id')).order_by('-n').first()
+        self.assertEqual(hottest['category'], 'clothing')
+        # Long tail: the busiest tenth of sellers hold most of the listings
+        per_seller = sorted(Item.objects.values('seller').annotate(n=Count('id')).values_list('n', flat=True))
+        self.assertGreater(sum(per_seller[-5:]), 1000)
+        self.assertTrue(User.objects.get(username='skewed_user0').check_password('testpass123'))
+
+    def test_export_and_reload(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('populate_test_data', count=300, users=10, export=directory, stdout=StringIO())
+            generated = self.snapshot()
+
+            Purchase.objects.all().delete()
+            Item.objects.all().delete()
+            User.objects.all().delete()
+            call_command('populate_test_data', load=directory, stdout=StringIO())
+
+        self.assertEqual(self.snapshot(), generated)
+        self.assertEqual(len(generated[1]), 300)
+
+    def test_profile_loads_once(self):
+        call_command('populate_test_data', count=10, users=2, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('populate_test_data', count=10, users=2, stdout=StringIO())
+
+
+class UpdateCategoriesTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass12345')
+
+    def add(self, title, category):
+        return Item.objects.create(title=title, description='', price=Decimal('10.00'), category=category, seller=self.seller)
+
+    def run_command(self, *args):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('update_categories', *args, stdout=out)
+        return out.getvalue(), [query['sql'] for query in ctx.captured_queries]
+
+    def test_reclassifies_by_title(self):
+        boots = self.add('Leather Boots', 'clothing')
+        tote = self.add('Canvas tote', 'shoes')
+        vase = self.add('Ceramic vase', 'bags')
+        shirt = self.add('Linen shirt', 'clothing')
+
+        output, _ = self.run_command('--dry-run')
+        self.assertIn('2 items would change', output)
+        self.assertEqual(Item.objects.get(pk=boots.pk).category, 'clothing')
+
+        output, _ = self.run_command()
+        self.assertIn('updated 2 items', output)
+        categories = dict(Item.objects.values_list('id', 'category'))
+        self.assertEqual(categories, {boots.pk: 'shoes', tote.pk: 'bags', vase.pk: 'bags', shirt.pk: 'clothing'})
+
+        output, _ = self.run_command()
+        self.assertIn('updated 0 items', output)
+
+    def test_writes_one_update_per_category_per_batch(self):
+        self.create_items(30, self.seller, category='clothing')
+        Item.objects.filter(id__in=Item.objects.order_by('id').values('id')[:10]).update(title='Boot')
+        Item.objects.filter(id__in=Item.objects.order_by('id').values('id')[10:20]).update(title='Backpack')
+
+        _, queries = self.run_command('--dry-run', '--batch-size', '100')
+        # count + one read batch + the empty batch that ends the scan
+        self.assertEqual(len(queries), 3)
+
+        _, queries = self.run_command('--batch-size', '100')
+        updates = [sql for sql in queries if sql.startswith('UPDATE "shop_item"')]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all('SET "category"' in sql for sql in updates))
+        self.assertEqual(Item.objects.filter(category='shoes').count(), 10)
+        self.assertEqual(Item.objects.filter(category='bags').count(), 10)
@@ -1,23 +1,40 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'shop'
 
+# Served through ASGI, the catalogue reads and the payment views run as async views
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    item_list = async_views.item_list
+    item_detail = async_views.item_detail
+    create_payment_intent = async_views.create_payment_intent
+    pay_cart = async_views.pay_cart
+else:
+    item_list = views.ItemListCreateAPIView.as_view()
+    item_detail = views.ItemDetailAPIView.as_view()
+    create_payment_intent = views.create_payment_intent
+    pay_cart = views.pay_cart
+
 urlpatterns = [
     # API endpoints
-    path('items/', views.ItemListCreateAPIView.as_view(), name='api_item_list'),
-    path('items/<int:pk>/', views.ItemDetailAPIView.as_view(), name='api_item_detail'),
+    path('items/', item_list, name='api_item_list'),
+    path('items/<int:pk>/', item_detail, name='api_item_detail'),
     path('items/create/', views.ItemListCreateAPIView.as_view(), name='api_item_create'),
     path('items/<int:pk>/update/', views.ItemDetailAPIView.as_view(), name='api_item_update'),
     path('my-items/', views.MyItemsAPIView.as_view(), name='api_my_items'),
     path('purchases/', views.PurchaseHistoryAPIView.as_view(), name='api_purchase_history'),
     path('cart/', views.CartAPIView.as_view(), name='api_cart'),
+    path('cart/summary/', views.cart_summary_view, name='api_cart_summary'),
+    path('cart/batch/', views.cart_batch, name='api_cart_batch'),
     
     # Existing API endpoints
     path('cart/add/<int:item_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
-    path('cart/pay/', views.pay_cart, name='pay_cart'),
-    path('create-payment-intent/', views.create_payment_intent, name='create_payment_intent'),
+    path('cart/pay/', pay_cart, name='pay_cart'),
+    path('create-payment-intent/', create_payment_intent, name='create_payment_intent'),
     
     # Legacy HTML views (for backward compatibility)
     path('html/items/', views.ItemListView.as_view(), name='item_list'),
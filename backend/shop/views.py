@@ -2,40 +2,84 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
-from django.http import JsonResponse
-from django.conf import settings
-from django.views.decorators.csrf import csrf_exempt
-from rest_framework.decorators import api_view, permission_classes
+from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage
+from django.db.models import F, Func, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status, generics, filters
 from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import BrowsableAPIRenderer
 from decimal import Decimal
-import stripe
 import json
-from .models import Item, CartItem, Purchase
-from .serializers import ItemSerializer, ItemCreateSerializer, PurchaseSerializer, CartItemSerializer
-
-# Configure Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
+from backend import metrics
+from .archive import sold_items
+from .models import ArchivedItem, Item, CartItem, Purchase
+from .cart import cart_summary, invalidate_cart, live_cart_summary, summarize, update_cart
+from .checkout import checkout_cart, CheckoutConflict, EmptyCart
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .payments import get_gateway
+from .response_cache import CachedResponseMixin, item_generation_key
+from .search import FullTextSearchFilter
+from .serializers import (
+    ItemSerializer, ItemCreateSerializer, PurchaseSerializer, CartItemSerializer, CartSummarySerializer,
+    CartBatchSerializer, MyItemsSummarySerializer,
+)
+
+# For the list endpoints, whose responses hold no floats (see FastJSONRenderer)
+FAST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer]
 
 class ItemPagination(PageNumberPagination):
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-
-class ItemListCreateAPIView(generics.ListCreateAPIView):
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset()`` with the count and the page read through the async ORM."""
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        # count is a cached_property; filling it in keeps page() from counting synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return self.page.object_list
+
+
+class ItemListCreateAPIView(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Item.objects.filter(status='on_sale').order_by('-date_added')
     serializer_class = ItemSerializer
     permission_classes = [AllowAny]
     pagination_class = ItemPagination
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    renderer_classes = FAST_RENDERERS
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ['date_added', 'price', 'title']
     ordering = ['-date_added']
-    search_fields = ['title', 'description']
+    cache_query_params = ('category', 'ordering', 'q', 'search', 'page', 'page_size', 'pagination', 'cursor')
+    
+    @property
+    def paginator(self):
+        # ``?pagination=cursor`` (or following a cursor link) opts into keyset paging
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -50,70 +94,122 @@ class ItemListCreateAPIView(generics.ListCreateAPIView):
         category = self.request.query_params.get('category')
         if category:
             queryset = queryset.filter(category=category)
-        return queryset.order_by('-date_added')
+        return ItemSerializer.setup_eager_loading(queryset).order_by('-date_added')
 
 
-class ItemDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Item.objects.all()
+class ItemDetailAPIView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = ItemSerializer.setup_eager_loading(Item.objects.all())
     serializer_class = ItemSerializer
     permission_classes = [AllowAny]
     
+    def get_cache_generations(self):
+        return [item_generation_key(self.kwargs['pk'])]
+    
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
             return [IsAuthenticated()]
         return [AllowAny()]
 
 
+def aggregate_subquery(queryset, function, field='id'):
+    """``function`` (``COUNT``, ``SUM``...) over ``field`` of ``queryset``'s rows, as a one-value subquery."""
+    return Subquery(queryset.order_by().annotate(value=Func(F(field), function=function)).values('value'))
+
+
 class MyItemsAPIView(APIView):
+    """
+    The user's listings and purchases.
+
+    ``?section=on_sale|sold|purchased`` returns that section on its own,
+    paginated like the item list. Without it the three sections come back
+    together as before, each capped at ``combined_limit`` rows. Either way
+    ``summary`` holds the full counts and revenue. Sold items and purchases
+    include those archived by ``shop.archive``.
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = FAST_RENDERERS
+    pagination_class = ItemPagination
+    combined_limit = 100
+    
+    def get_sections(self, user):
+        return {
+            # Items user is selling (on sale)
+            'on_sale': (ItemSerializer, ItemSerializer.setup_eager_loading(Item.objects.filter(
+                seller=user,
+                status='on_sale'
+            )).order_by('-date_added')),
+            # Items user has sold, archived ones included
+            'sold': (ItemSerializer, sold_items(user, ItemSerializer.setup_eager_loading)),
+            # Items user has purchased
+            'purchased': (PurchaseSerializer, PurchaseSerializer.setup_eager_loading(Purchase.objects.filter(
+                buyer=user
+            )).order_by('-purchase_date')),
+        }
+    
+    def get_summary(self, user):
+        """
+        Section sizes and revenue in one query, counted from the rows the sections
+        list: ``Item`` and ``ArchivedItem`` for listings, ``Purchase`` for purchases.
+        """
+        on_sale = Item.objects.filter(seller=user, status='on_sale')
+        sold = Item.objects.filter(seller=user, status='sold')
+        archived = ArchivedItem.objects.filter(seller=user)
+        summary = get_user_model().objects.filter(pk=user.pk).values(
+            on_sale=aggregate_subquery(on_sale, 'COUNT'),
+            sold=aggregate_subquery(sold, 'COUNT') + aggregate_subquery(archived, 'COUNT'),
+            purchased=aggregate_subquery(Purchase.objects.filter(buyer=user), 'COUNT'),
+            revenue=(
+                Coalesce(aggregate_subquery(sold, 'SUM', 'price'), Value(Decimal('0')))
+                + Coalesce(aggregate_subquery(archived, 'SUM', 'price'), Value(Decimal('0')))
+            ),
+        ).get()
+        return MyItemsSummarySerializer(summary).data
     
     def get(self, request):
-        user = request.user
-        
-        # Items user is selling (on sale)
-        on_sale_items = Item.objects.filter(
-            seller=user, 
-            status='on_sale'
-        ).order_by('-date_added')
-        
-        # Items user has sold
-        sold_items = Item.objects.filter(
-            seller=user, 
-            status='sold'
-        ).order_by('-date_added')
-        
-        # Items user has purchased
-        purchased_items = Purchase.objects.filter(
-            buyer=user
-        ).select_related('item').order_by('-purchase_date')
-        
-        # Serialize the data
-        on_sale_serializer = ItemSerializer(on_sale_items, many=True)
-        sold_serializer = ItemSerializer(sold_items, many=True)
-        purchased_serializer = PurchaseSerializer(purchased_items, many=True)
+        sections = self.get_sections(request.user)
+        section = request.query_params.get('section')
+        if section is None:
+            data = {
+                name: serializer_class(queryset[:self.combined_limit], many=True, context={'request': request}).data
+                for name, (serializer_class, queryset) in sections.items()
+            }
+            data['summary'] = self.get_summary(request.user)
+            return Response(data)
+        if section not in sections:
+            return Response(
+                {'error': f'section must be one of: {", ".join(sections)}'}, status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response({
-            'on_sale': on_sale_serializer.data,
-            'sold': sold_serializer.data,
-            'purchased': purchased_serializer.data
-        })
+        serializer_class, queryset = sections[section]
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        response = paginator.get_paginated_response(
+            serializer_class(page, many=True, context={'request': request}).data
+        )
+        response.data['section'] = section
+        response.data['summary'] = self.get_summary(request.user)
+        return response
 
 
 class PurchaseHistoryAPIView(generics.ListAPIView):
     serializer_class = PurchaseSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = ItemPagination
+    renderer_classes = FAST_RENDERERS
     
     def get_queryset(self):
-        return Purchase.objects.filter(buyer=self.request.user).order_by('-purchase_date')
+        queryset = Purchase.objects.filter(buyer=self.request.user)
+        return PurchaseSerializer.setup_eager_loading(queryset).order_by('-purchase_date')
 
 
 class CartAPIView(generics.ListAPIView):
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
+    renderer_classes = FAST_RENDERERS
     
     def get_queryset(self):
-        return CartItem.objects.filter(user=self.request.user)
+        queryset = CartItem.objects.filter(user=self.request.user)
+        return CartItemSerializer.setup_eager_loading(queryset).order_by('date_added')
 
 
 class ItemListView(ListView):
@@ -184,9 +280,12 @@ def add_to_cart(request, item_id):
     """Add an item to the user's cart"""
     try:
         item = get_object_or_404(Item, id=item_id, status='on_sale')
-        cart_item, created = CartItem.objects.get_or_create(user=request.user, item=item)
+        cart_item, created = CartItem.objects.get_or_create(
+            user=request.user, item=item, defaults={'added_price': item.price}
+        )
         
         if created:
+            invalidate_cart(request.user.pk)
             return Response({'message': 'Item added to cart'}, status=status.HTTP_201_CREATED)
         else:
             return Response({'message': 'Item already in cart'}, status=status.HTTP_200_OK)
@@ -201,28 +300,61 @@ def remove_from_cart(request, item_id):
     try:
         cart_item = get_object_or_404(CartItem, user=request.user, item_id=item_id)
         cart_item.delete()
+        invalidate_cart(request.user.pk)
         return Response({'message': 'Item removed from cart'}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(FAST_RENDERERS)
+def cart_batch(request):
+    """Add and remove several items at once and return the updated cart"""
+    serializer = CartBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    unavailable = update_cart(request.user, **serializer.validated_data)
+
+    cart_items = list(
+        CartItemSerializer.setup_eager_loading(CartItem.objects.filter(user=request.user)).order_by('date_added')
+    )
+    # The summary comes from the rows just loaded rather than another query
+    summary = summarize([
+        (cart_item.item_id, cart_item.item.price, cart_item.item.status, cart_item.added_price)
+        for cart_item in cart_items
+    ])
+    return Response({
+        'unavailable_items': unavailable,
+        'cart': CartItemSerializer(cart_items, many=True).data,
+        'summary': CartSummarySerializer(summary).data,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cart_summary_view(request):
+    """Total of the user's cart, and items that sold or changed price since they were added"""
+    return Response(CartSummarySerializer(cart_summary(request.user)).data)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_payment_intent(request):
     """Create a Stripe payment intent for cart items"""
     try:
-        cart_items = CartItem.objects.filter(user=request.user)
-        if not cart_items.exists():
+        # Not the cached summary: the amount charged must match what checkout will buy
+        summary = live_cart_summary(request.user)
+        if not summary['item_count']:
             return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+        if summary['unavailable_items']:
+            return Response({
+                'error': 'Some items in your cart have already been sold',
+                'unavailable_items': summary['unavailable_items']
+            }, status=status.HTTP_409_CONFLICT)
         
-        total_amount = sum(item.item.price for item in cart_items)
-        amount_in_cents = int(total_amount * 100)
-        
-        intent = stripe.PaymentIntent.create(
-            amount=amount_in_cents,
-            currency='eur',
-            metadata={'user_id': request.user.id}
-        )
+        total_amount = summary['total']
+        intent = get_gateway().create_intent(request.user, summary['lines'], total_amount)
         
         return Response({
             'client_secret': intent.client_secret,
@@ -244,34 +376,29 @@ def pay_cart(request):
         if not payment_intent_id:
             return Response({'error': 'Payment intent ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verify payment with Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        if intent.status != 'succeeded':
+        # Verify payment with the gateway
+        if not get_gateway().is_succeeded(payment_intent_id):
+            metrics.CHECKOUT_FAILURE.labels('payment_incomplete').inc()
             return Response({'error': 'Payment not completed'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Process cart items
-        cart_items = CartItem.objects.filter(user=request.user)
-        purchases = []
-        
-        for cart_item in cart_items:
-            item = cart_item.item
-            purchase = Purchase.objects.create(
-                buyer=request.user,
-                item=item,
-                purchase_price=item.price,
-                payment_intent_id=payment_intent_id
-            )
-            purchases.append(purchase)
-            
-            # Mark item as sold
-            item.buyer = request.user
-            item.status = 'sold'
-            item.save()
-        
-        # Clear cart
-        cart_items.delete()
+        try:
+            purchases = checkout_cart(request.user, payment_intent_id)
+        except EmptyCart:
+            metrics.CHECKOUT_FAILURE.labels('empty_cart').inc()
+            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+        except CheckoutConflict as e:
+            metrics.CHECKOUT_FAILURE.labels('conflict').inc()
+            return Response({
+                'error': 'Some items in your cart have already been sold',
+                'unavailable_items': e.item_ids
+            }, status=status.HTTP_409_CONFLICT)
         
-        return Response({'message': 'Payment successful'}, status=status.HTTP_200_OK)
+        metrics.CHECKOUT_SUCCESS.inc()
+        return Response({
+            'message': 'Payment successful',
+            'purchased_items': [purchase.item_id for purchase in purchases]
+        }, status=status.HTTP_200_OK)
         
     except Exception as e:
+        metrics.CHECKOUT_FAILURE.labels('error').inc()
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+JWT authentication with a short-lived cache of the authenticated user.
+
+simplejwt's ``JWTAuthentication`` validates the token without touching the
+database but then loads the user row on every request. ``CachedJWTAuthentication``
+keeps the few fields that authentication and permission checks read
+(``CACHED_FIELDS``) in Django's cache for ``AUTH_USER_CACHE_TTL`` seconds,
+keyed by user id, so an authenticated request whose view only needs
+``request.user.id`` (cart, purchases, my-items) runs no query for the user
+at all. A cached ``request.user`` has every other field deferred; views
+that read or save the whole user take ``full_user(request.user)``.
+
+Any save or delete of a user drops its entry (``users.signals``), which
+covers profile updates, password changes and deactivation; writes that
+bypass signals (``QuerySet.update``) must call ``forget_user()``. Like the
+response cache, the entry is dropped again when the writing transaction
+commits, so a request that read the old row meanwhile can't cache it.
+Those deletes only reach other server processes through a shared cache, so
+the cache is only used when ``SHARED_CACHE`` is set; otherwise a user
+deactivated in one worker would stay logged in on the others.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from backend import metrics
+
+KEY_PREFIX = 'auth:user'
+CACHED_FIELDS = ('id', 'username', 'is_active', 'is_staff')
+
+
+def user_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def forget_user(user_id):
+    key = user_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def full_user(user):
+    """``user`` with all of its fields loaded, in one query if some were deferred."""
+    if user.get_deferred_fields():
+        return type(user)._base_manager.get(pk=user.pk)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or settings.AUTH_USER_CACHE_TTL <= 0 or not settings.SHARED_CACHE:
+            return super().get_user(validated_token)
+
+        key = user_key(user_id)
+        fields = cache.get(key)
+        metrics.cache_lookup('auth_user', fields is not None)
+        if fields is None:
+            # Raises for unknown and inactive users, which are never cached
+            user = super().get_user(validated_token)
+            cache.set(key, {name: getattr(user, name) for name in CACHED_FIELDS}, settings.AUTH_USER_CACHE_TTL)
+            return user
+        User = get_user_model()
+        # from_db() takes the loaded fields in the model's field order; the rest are deferred
+        names = [field.attname for field in User._meta.concrete_fields if field.attname in fields]
+        return User.from_db(User.objects.db, names, [fields[name] for name in names])
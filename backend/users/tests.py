@@ -1,3 +1,80 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import user_key
+
+User = get_user_model()
+
+
+@override_settings(AUTH_USER_CACHE_TTL=60, SHARED_CACHE=True)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def test_cached_user_saves_a_query(self):
+        first = self.count_queries('/api/shop/cart/')
+        self.assertEqual(self.count_queries('/api/shop/cart/'), first - 1)
+        # The profile needs the whole row, which is loaded once either way
+        self.assertEqual(self.count_queries('/api/users/profile'), 1)
+
+    def test_caches_only_what_authentication_needs(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get('/api/shop/cart/')
+        self.assertEqual(
+            cache.get(user_key(self.user.pk)),
+            {'id': self.user.pk, 'username': 'alice', 'is_active': True, 'is_staff': True},
+        )
+        profile = self.client.get('/api/users/profile').json()
+        self.assertEqual((profile['id'], profile['username']), (self.user.pk, 'alice'))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_needs_a_shared_cache(self):
+        self.assertEqual(self.count_queries('/api/users/profile'), 1)
+        self.assertEqual(self.count_queries('/api/users/profile'), 1)
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+
+    @override_settings(AUTH_USER_CACHE_TTL=0)
+    def test_zero_ttl_disables_the_cache(self):
+        self.assertEqual(self.count_queries('/api/users/profile'), 1)
+        self.assertEqual(self.count_queries('/api/users/profile'), 1)
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+
+    def test_profile_update_is_seen_by_the_next_request(self):
+        self.client.get('/api/users/profile')
+        response = self.client.put('/api/users/profile', {'address': 'Main Street 1'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/users/profile').json()['address'], 'Main Street 1')
+
+    def test_password_change_drops_the_cached_user(self):
+        self.client.get('/api/users/profile')
+        self.assertIsNotNone(cache.get(user_key(self.user.pk)))
+        response = self.client.post(
+            '/api/users/change-password', {'old_password': 'pass12345', 'new_password': 'pass67890'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+        self.assertEqual(self.client.get('/api/users/profile').status_code, 200)
+        self.assertNotIn('password', cache.get(user_key(self.user.pk)))
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password('pass67890'))
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/users/profile')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/profile').status_code, 401)
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
@@ -7,6 +7,7 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from .authentication import full_user
 from .serializers import UserSerializer
 
 def home(request):
@@ -30,11 +31,11 @@ class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(full_user(request.user))
         return Response(serializer.data)
     
     def put(self, request):
-        serializer = UserSerializer(request.user, data=request.data, partial=True)
+        serializer = UserSerializer(full_user(request.user), data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response({
@@ -56,7 +57,7 @@ class ChangePasswordView(APIView):
                 'error': _('Both old and new passwords are required')
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        user = request.user
+        user = full_user(request.user)
         if not user.check_password(old_password):
             return Response({
                 'error': _('Old password is incorrect')
@@ -13,4 +13,7 @@ pip install -r requirements.txt
 python manage.py collectstatic --noinput
 
 # Run database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Backfill the analytics rollup tables on the first deploy; signals keep them current after that
+python manage.py rebuild_rollups --if-empty
\ No newline at end of file
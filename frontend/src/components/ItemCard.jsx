@@ -18,6 +18,7 @@ const ItemCard = ({
   showDescription = false,
   isMyItem = false,
   hideActions = false,
+  disableLink = false,
 }) => {
   const [imageError, setImageError] = useState(false);
   const [isHovered, setIsHovered] = useState(false);
@@ -29,6 +30,7 @@ const ItemCard = ({
   };
 
   const handleCardClick = () => {
+    if (disableLink) return;
     navigate(`/items/${item.id}`);
   };
 
@@ -128,13 +130,15 @@ const ItemCard = ({
             isHovered ? styles.visible : ""
           }`}
         >
-          <button
-            onClick={handleQuickView}
-            className={styles.actionBtn}
-            title="Quick View"
-          >
-            <LiaEyeSolid size={16} />
-          </button>
+          {!disableLink && (
+            <button
+              onClick={handleQuickView}
+              className={styles.actionBtn}
+              title="Quick View"
+            >
+              <LiaEyeSolid size={16} />
+            </button>
+          )}
           <button
             onClick={handleWishlist}
             className={styles.actionBtn}
@@ -99,6 +99,8 @@ const MyItems = () => {
                 onAddToCart={() => {}} // Disable add to cart for own items
                 isMyItem={type === "on_sale" || type === "sold"}
                 hideActions={type === "purchased"}
+                // A purchase keeps its item after the listing is deleted, with a null id
+                disableLink={actualItem.id === null}
               />
 
               {/* Additional info specific to MyItems */}
@@ -117,6 +119,9 @@ const MyItems = () => {
                           Seller: {actualItem.seller.username}
                         </span>
                       )}
+                      {actualItem.id === null && (
+                        <span className="item-date">Listing removed</span>
+                      )}
                     </>
                   ) : (
                     <>
@@ -5,4 +5,4 @@
 cd backend
 
 # Start the application with Gunicorn
-gunicorn backend.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file
+gunicorn -c gunicorn.conf.py --bind 0.0.0.0:$PORT
\ No newline at end of file